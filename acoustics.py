@@ -2,6 +2,10 @@ import logging
 import numpy as np
 from typing import Dict, Any
 
+from audio_utils import get_wav_duration
+from cancellation import check_cancelled
+from config import ACOUSTIC_CHUNK_SECONDS, ACOUSTIC_CHUNK_OVERLAP_SECONDS
+
 try:
     import opensmile
     import pandas as pd
@@ -10,36 +14,71 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
-def evaluate_acoustics(audio_path: str) -> Dict[str, float]:
-    """
-    Extracts acoustic features using OpenSMILE (eGeMAPSv02).
-    Calculates F1/F2 Standard Deviation (jaw/tongue mobility) and Mean HNR (voice clarity).
-    Filters out non-voiced frames before calculating variance.
-    """
+def create_smile():
+    """Builds the OpenSMILE eGeMAPSv02 Low-Level Descriptor extractor."""
     logger.info("Initializing OpenSMILE feature extractor (eGeMAPS Low-Level Descriptors)...")
-    smile = opensmile.Smile(
+    return opensmile.Smile(
         feature_set=opensmile.FeatureSet.eGeMAPSv02,
         feature_level=opensmile.FeatureLevel.LowLevelDescriptors,
     )
+
+# Fields of interest in eGeMAPS
+# F0semitoneFrom27.5Hz_sma3nz - Pitch (we use this to detect voiced frames)
+# F1frequency_sma3nz - Formant 1 frequency
+# F2frequency_sma3nz - Formant 2 frequency
+# HarmonicToNoiseRatio_sma3nz - Harmonics-to-Noise Ratio
+
+F0_COL = "F0semitoneFrom27.5Hz_sma3nz"
+F1_COL = "F1frequency_sma3nz"
+F2_COL = "F2frequency_sma3nz"
+HNR_COL = "HNRdBACF_sma3nz"
+
+def extract_lld_frames(audio_path: str, smile=None, cancel=None) -> "pd.DataFrame":
+    """
+    Runs OpenSMILE once and returns the eGeMAPS Low-Level Descriptor frames.
+    The frames can be summarized for the whole file and windowed without re-running OpenSMILE.
+    With ACOUSTIC_CHUNK_SECONDS set, the file is processed chunk by chunk and the `cancel`
+    token (cancellation.CancelToken) is checked between chunks.
+    """
+    if smile is None:
+        smile = create_smile()
     
     logger.info(f"Processing acoustics for {audio_path}...")
-    df = smile.process_file(audio_path)
-    
-    # Fields of interest in eGeMAPS
-    # F0semitoneFrom27.5Hz_sma3nz - Pitch (we use this to detect voiced frames)
-    # F1frequency_sma3nz - Formant 1 frequency
-    # F2frequency_sma3nz - Formant 2 frequency
-    # HarmonicToNoiseRatio_sma3nz - Harmonics-to-Noise Ratio
-    
-    f0_col = "F0semitoneFrom27.5Hz_sma3nz"
-    f1_col = "F1frequency_sma3nz"
-    f2_col = "F2frequency_sma3nz"
-    hnr_col = "HNRdBACF_sma3nz"
-    
+    check_cancelled(cancel)
+    if not ACOUSTIC_CHUNK_SECONDS:
+        return smile.process_file(audio_path)
+    return _extract_lld_chunked(audio_path, smile, cancel)
+
+def _extract_lld_chunked(audio_path: str, smile, cancel) -> "pd.DataFrame":
+    """
+    OpenSMILE over padded chunks of the file, each trimmed back to the frames that start inside
+    its own chunk. Frame times stay absolute, so the result lines up with a single-pass run.
+    """
+    duration = get_wav_duration(audio_path)
+    parts = []
+    chunk_start = 0.0
+    while chunk_start < duration:
+        check_cancelled(cancel)
+        chunk_end = min(duration, chunk_start + ACOUSTIC_CHUNK_SECONDS)
+        frames = smile.process_file(
+            audio_path,
+            start=max(0.0, chunk_start - ACOUSTIC_CHUNK_OVERLAP_SECONDS),
+            end=min(duration, chunk_end + ACOUSTIC_CHUNK_OVERLAP_SECONDS)
+        )
+        starts = frames.index.get_level_values("start")
+        keep = (starts >= pd.to_timedelta(chunk_start, unit="s")) & (starts < pd.to_timedelta(chunk_end, unit="s"))
+        parts.append(frames[keep])
+        chunk_start = chunk_end
+    return pd.concat(parts) if parts else smile.process_file(audio_path)
+
+def voiced_frame_mask(df: "pd.DataFrame") -> "pd.Series":
     # Filter voiced frames: frames where F0 (pitch) > 0 and F1/F2 > 0
     # Unvoiced frames usually have 0 or very low values for F1/F2 in opensmile
-    voiced_mask = (df[f0_col] > 0) & (df[f1_col] > 0) & (df[f2_col] > 0)
-    voiced_df = df[voiced_mask]
+    return (df[F0_COL] > 0) & (df[F1_COL] > 0) & (df[F2_COL] > 0)
+
+def summarize_acoustics(df: "pd.DataFrame") -> Dict[str, float]:
+    """Calculates F1/F2 SD and mean HNR over the voiced frames of an LLD frame table."""
+    voiced_df = df[voiced_frame_mask(df)]
     
     if len(voiced_df) == 0:
         logger.warning("No voiced frames found in the audio! Returning zeros.")
@@ -49,9 +88,9 @@ def evaluate_acoustics(audio_path: str) -> Dict[str, float]:
             "mean_hnr": 0.0
         }
         
-    f1_sd = float(np.std(voiced_df[f1_col]))
-    f2_sd = float(np.std(voiced_df[f2_col]))
-    mean_hnr = float(np.mean(voiced_df[hnr_col]))
+    f1_sd = float(np.std(voiced_df[F1_COL]))
+    f2_sd = float(np.std(voiced_df[F2_COL]))
+    mean_hnr = float(np.mean(voiced_df[HNR_COL]))
     
     result = {
         "f1_variance_sd": round(f1_sd, 2),
@@ -62,6 +101,27 @@ def evaluate_acoustics(audio_path: str) -> Dict[str, float]:
     logger.info(f"Acoustic evaluation complete. F1 SD: {result['f1_variance_sd']}, HNR: {result['mean_hnr']}")
     return result
 
+def voiced_frame_arrays(df: "pd.DataFrame") -> Dict[str, np.ndarray]:
+    """Voiced frames as float64 arrays: frame start time (s), F1, F2 and HNR."""
+    voiced_df = df[voiced_frame_mask(df)]
+    times = voiced_df.index.get_level_values("start").total_seconds()
+    return {
+        "time": np.asarray(times, dtype=np.float64),
+        "f1": voiced_df[F1_COL].to_numpy(dtype=np.float64),
+        "f2": voiced_df[F2_COL].to_numpy(dtype=np.float64),
+        "hnr": voiced_df[HNR_COL].to_numpy(dtype=np.float64),
+    }
+
+def evaluate_acoustics(audio_path: str, smile=None, cancel=None) -> Dict[str, float]:
+    """
+    Extracts acoustic features using OpenSMILE (eGeMAPSv02).
+    Calculates F1/F2 Standard Deviation (jaw/tongue mobility) and Mean HNR (voice clarity).
+    Filters out non-voiced frames before calculating variance.
+    Pass a pre-built `smile` extractor to skip re-initializing OpenSMILE on every call.
+    A `cancel` token aborts the extraction between chunks (see extract_lld_frames).
+    """
+    return summarize_acoustics(extract_lld_frames(audio_path, smile, cancel))
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     print("Acoustics Module - Ready")
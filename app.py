@@ -10,13 +10,16 @@ from pathlib import Path
 import streamlit.components.v1 as components
 
 # Importers from the existing backend
-from audio_utils import extract_audio_to_wav
-from transcription import evaluate_transcription
-from acoustics import evaluate_acoustics
-from output_manager import append_to_metrics, get_file_id, is_file_processed
+from daemon import WarmResources
+from output_manager import append_entry, append_to_metrics, get_file_id, is_file_processed, load_history_index
+from instrumentation import PipelineTimer
+import metrics_exporter
+from word_timeline import store_timeline
+from llm_payload import build_payload, estimate_tokens, render_payload
 import config
 import whisper
 from speech_analysis import process_and_analyze_file
+from cancellation import JobCancelled
 
 if "analysis_results" not in st.session_state:
     st.session_state.analysis_results = None
@@ -30,10 +33,29 @@ if "sa_last_analyzed_file" not in st.session_state:
 if "sa_is_processing" not in st.session_state:
     st.session_state.sa_is_processing = False
 
+# Upload of the analysis currently running in this session (per tab), and what to tell the
+# user after a cancel click stopped it
+if "running_upload" not in st.session_state:
+    st.session_state.running_upload = None
+if "sa_running_upload" not in st.session_state:
+    st.session_state.sa_running_upload = None
+if "cancel_notice" not in st.session_state:
+    st.session_state.cancel_notice = None
+
 @st.cache_resource
 def load_whisper_model():
     return whisper.load_model("base")
 
+@st.cache_resource
+def load_articulation_resources():
+    """
+    faster-whisper model and OpenSMILE extractor, created once per app process and shared by
+    every session; WarmResources serializes their use with its articulation lock.
+    """
+    resources = WarmResources()
+    resources.warm_articulation()
+    return resources
+
 st.set_page_config(
     page_title="ARTICULATION ANALYZER", 
     layout="centered",
@@ -216,25 +238,97 @@ HISTORY_FILE = "metrics_history.json"
 
 @st.cache_data
 def load_history_ids(history_file):
-    ids = set()
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, "r", encoding="utf-8") as f:
-                content = f.read()
-                if content.strip():
-                    history = json.loads(content)
-                    for entry in history:
-                        if "file_id" in entry:
-                            ids.add(entry["file_id"])
-                        if "source_file" in entry:
-                            ids.add(entry["source_file"])
-        except Exception:
-            pass
-    return ids
+    try:
+        return load_history_index(history_file)
+    except Exception:
+        return set()
+
+@st.cache_data(max_entries=4)
+def load_llm_payload(history_file, history_stamp):
+    """
+    The rendered LLM payload of a history. Streamlit reruns the script on every interaction,
+    so it is built once per `history_stamp` (size and mtime) instead of re-reading the history.
+    """
+    return render_payload(build_payload(history_file))
+
+def history_stamp(history_file):
+    try:
+        st_result = os.stat(history_file)
+    except OSError:
+        return None
+    return st_result.st_size, st_result.st_mtime
+
+# Pipeline stage names (instrumentation.report_progress events) as shown while a file runs
+STAGE_LABELS = {
+    "decode": "DECODING AUDIO",
+    "model_load": "LOADING MODELS",
+    "transcription": "TRANSCRIBING",
+    "refinement": "REFINING WEAK SPANS",
+    "acoustics": "MEASURING ACOUSTICS",
+    "windowed_metrics": "BUILDING TIMELINE",
+    "text_analysis": "ANALYZING TEXT",
+}
+
+def progress_display(placeholder, loading_msg):
+    """
+    Progress callback for the analysis pipelines that redraws `placeholder` on every event:
+    the current stage, how much of the audio it has covered, an ETA from the stage's rate so
+    far, and the tail of the transcript as it comes in.
+    """
+    current = {"stage": None, "since": time.time(), "text": ""}
+
+    def render(event):
+        if event["stage"] != current["stage"]:
+            current.update(stage=event["stage"], since=time.time())
+        if "text" in event:
+            current["text"] = event["text"]
+        label = STAGE_LABELS.get(event["stage"], event["stage"].upper())
+        with placeholder.container():
+            st.markdown(f'<div class="loading-container"><div class="loading-text">{loading_msg}<br>{label}</div></div>', unsafe_allow_html=True)
+            done, total = event.get("done_sec"), event.get("total_sec")
+            if done is not None and total:
+                st.progress(int(100 * min(1.0, done / total)))
+                elapsed = time.time() - current["since"]
+                eta = f" - ~{(total - done) * elapsed / done:.0f}s LEFT" if done > 0 and elapsed > 1 else ""
+                st.caption(f"{done:.0f}s / {total:.0f}s OF AUDIO{eta}")
+            if current["text"]:
+                st.caption(f"...{current['text'][-300:]}")
+
+    return render
+
+def discard_upload(upload_key):
+    """Deletes the saved upload of a stopped analysis, so it never lingers in the resources queue."""
+    upload = st.session_state[upload_key]
+    st.session_state[upload_key] = None
+    if upload and os.path.exists(upload):
+        os.remove(upload)
+    if upload_key == "sa_running_upload":
+        st.session_state.sa_is_processing = False
+
+def cancel_running_analysis(upload_key):
+    """
+    on_click of the CANCEL buttons. Clicking stops the running script at its next progress
+    update, and the pipeline's cleanup (ffmpeg kill, temp audio, model lock) runs on the way
+    out; by the time this callback runs the old run is gone, so only its upload is left to drop.
+    """
+    discard_upload(upload_key)
+    st.session_state.cancel_notice = "ANALYSIS CANCELLED. UPLOAD DISCARDED."
+
+def cancel_button(upload_key):
+    placeholder = st.empty()
+    try:
+        placeholder.button("CANCEL ANALYSIS", key=f"cancel_{upload_key}", on_click=cancel_running_analysis, args=(upload_key,), use_container_width=True)
+    except TypeError:
+        placeholder.button("CANCEL ANALYSIS", key=f"cancel_{upload_key}", on_click=cancel_running_analysis, args=(upload_key,))
+    return placeholder
 
 # --- UPLOADER ---
 uploaded_file = st.file_uploader("UPLOAD MEDIA", type=["m4a", "mp4", "mov", "mkv", "wav"])
 
+if st.session_state.cancel_notice:
+    st.warning(st.session_state.cancel_notice)
+    st.session_state.cancel_notice = None
+
 if uploaded_file is not None:
     # Reset state if a new file is uploaded
     if st.session_state.last_analyzed_file != uploaded_file.name:
@@ -280,30 +374,30 @@ if uploaded_file is not None:
                 # Initiate pipeline
                 loading_placeholder = st.empty()
                 loading_placeholder.markdown(f'<div class="loading-container"><div class="loading-text">{loading_msg}</div></div>', unsafe_allow_html=True)
-                time.sleep(0.1)  # Brief pause to ensure UI renders before blocking thread
                 
-                wav_path = None
+                st.session_state.running_upload = str(file_path)
+                cancel_placeholder = cancel_button("running_upload")
+                
                 try:
                     start_time = time.time()
+                    timer = PipelineTimer(uploaded_file.name)
                     file_id = memory_id  # uses the original filename/size hash instead of the random uuid file path
                     
-                    # Audio pass
-                    wav_path = extract_audio_to_wav(str(file_path))
+                    # Decode, transcribe and measure with the app-lifetime handles (no per-click model loads)
+                    resources = load_articulation_resources()
+                    progress = progress_display(loading_placeholder, loading_msg)
+                    final_metrics = resources.run_articulation({"path": str(file_path)}, timer, progress)
+                    st.session_state.running_upload = None
+                    cancel_placeholder.empty()
                     
-                    # Compute
-                    transcription_metrics = evaluate_transcription(
-                        wav_path,
-                        conf_threshold=config.WEAK_WORD_CONFIDENCE_THRESHOLD,
-                        pause_threshold=config.PAUSE_THRESHOLD_SECONDS
-                    )
-                    acoustic_metrics = evaluate_acoustics(wav_path)
-                    
-                    # Merge dictionaries strictly
-                    final_metrics = {**transcription_metrics, **acoustic_metrics}
-                    
-                    # Dispatch to JSON history
-                    append_to_metrics(HISTORY_FILE, uploaded_file.name, file_id, final_metrics)
+                    # Dispatch to JSON history, full word list to a columnar sidecar
+                    with timer.stage("history_write"):
+                        final_metrics["word_timeline"] = store_timeline(HISTORY_FILE, file_id, final_metrics.pop("words"))
+                        append_to_metrics(HISTORY_FILE, uploaded_file.name, file_id, final_metrics)
                     load_history_ids.clear() # Invalidate cache so new file is tracked
+                    if config.APP_TIMINGS_LOG:
+                        timer.emit(config.TIMINGS_LOG_FILE)
+                    metrics_exporter.observe_file("articulation", timer.summary(), True)
                     
                     elapsed = time.time() - start_time
                     loading_placeholder.empty()
@@ -323,13 +417,19 @@ if uploaded_file is not None:
                     except AttributeError:
                         st.experimental_rerun()
                     
+                except JobCancelled as e:
+                    # Ran past its timeout budget (see config.JOB_TIMEOUT_*): drop the upload like a cancel
+                    loading_placeholder.empty()
+                    cancel_placeholder.empty()
+                    discard_upload("running_upload")
+                    metrics_exporter.observe_file("articulation", timer.summary(), False)
+                    st.warning(f"{str(e).upper()}. UPLOAD DISCARDED.")
                 except Exception as e:
                     loading_placeholder.empty()
+                    cancel_placeholder.empty()
+                    st.session_state.running_upload = None
+                    metrics_exporter.observe_file("articulation", timer.summary(), False)
                     st.error(f"CRITICAL FAILURE: {str(e)}")
-                finally:
-                    # Strict disk hygiene
-                    if wav_path and os.path.exists(wav_path):
-                        os.remove(wav_path)
 
 # Always render output if present in state, surviving page interactions
 if st.session_state.analysis_results:
@@ -380,6 +480,10 @@ if st.session_state.analysis_results:
     
     with st.expander("VIEW FULL PAYLOAD"):
         st.code(json_str, language="json")
+    
+    llm_str = load_llm_payload(HISTORY_FILE, history_stamp(HISTORY_FILE))
+    with st.expander(f"LLM PAYLOAD (~{estimate_tokens(llm_str)} TOKENS, RECENT SESSIONS + TRENDS)"):
+        st.code(llm_str, language="json")
         
     try:
         reset_clicked_p1 = st.button("RESET MEMORY & ANALYZE NEW FILE", use_container_width=True)
@@ -403,6 +507,17 @@ SA_RESOURCES_DIR = Path("resources/speech_analysis")
 SA_RESOURCES_DIR.mkdir(parents=True, exist_ok=True)
 SA_HISTORY_FILE = "speech_analysis_history.json"
 
+@st.cache_resource
+def start_metrics_exporter(port):
+    # Cached so the exporter starts once per server process, not on every rerun
+    media_exts = {".m4a", ".mp4", ".mov", ".mkv", ".wav"}
+    metrics_exporter.track_queue(str(RESOURCES_DIR), media_exts, HISTORY_FILE)
+    metrics_exporter.track_queue(str(SA_RESOURCES_DIR), media_exts, SA_HISTORY_FILE)
+    return metrics_exporter.start_http_server(port)
+
+if config.APP_METRICS_PORT:
+    start_metrics_exporter(config.APP_METRICS_PORT)
+
 sa_uploaded_file = st.file_uploader("UPLOAD MEDIA", type=["m4a", "mp4", "mov", "mkv", "wav"], key="sa_uploader")
 
 
@@ -475,12 +590,18 @@ if sa_uploaded_file is not None:
                 loading_placeholder = st.empty()
                 loading_placeholder.markdown(f'<div class="loading-container"><div class="loading-text">{loading_msg}</div></div>', unsafe_allow_html=True)
                 
+                # openai-whisper cannot be interrupted mid-file, so a cancel lands at the next stage
+                st.session_state.sa_running_upload = str(file_path)
+                cancel_placeholder = cancel_button("sa_running_upload")
+                
                 try:
                     start_time = time.time()
+                    timer = PipelineTimer(sa_uploaded_file.name)
                     file_id = memory_id
                     
                     # Core ML Process
-                    model = load_whisper_model()
+                    with timer.stage("model_load"):
+                        model = load_whisper_model()
                     
                     transcript_path = None
                     is_text_file = False
@@ -490,9 +611,13 @@ if sa_uploaded_file is not None:
                         model, 
                         transcript_path, 
                         is_text_file, 
-                        False
+                        False,
+                        timer,
+                        progress=progress_display(loading_placeholder, loading_msg)
                     )
                     
+                    st.session_state.sa_running_upload = None
+                    cancel_placeholder.empty()
                     if analysis_results is None:
                         raise Exception("Analysis failed to complete internally.")
                     
@@ -508,20 +633,12 @@ if sa_uploaded_file is not None:
                         "metrics": analysis_results
                     }
                     
-                    # Local append logic to history
-                    path = Path(SA_HISTORY_FILE)
-                    history = []
-                    if path.exists():
-                        try:
-                            with open(path, "r", encoding="utf-8") as f:
-                                content = f.read()
-                                if content.strip():
-                                    history = json.loads(content)
-                        except json.JSONDecodeError:
-                            pass
-                    history.append(full_payload)
-                    with open(path, "w", encoding="utf-8") as f:
-                        json.dump(history, f, indent=2)
+                    # Streamed append: the existing history is never decoded
+                    with timer.stage("history_write"):
+                        append_entry(SA_HISTORY_FILE, full_payload)
+                    if config.APP_TIMINGS_LOG:
+                        timer.emit(config.TIMINGS_LOG_FILE)
+                    metrics_exporter.observe_file("speech_analysis", timer.summary(), True)
                     
                     load_history_ids.clear()
                     
@@ -538,6 +655,9 @@ if sa_uploaded_file is not None:
                     
                 except Exception as e:
                     loading_placeholder.empty()
+                    cancel_placeholder.empty()
+                    st.session_state.sa_running_upload = None
+                    metrics_exporter.observe_file("speech_analysis", timer.summary(), False)
                     st.session_state.sa_is_processing = False  # Unlock so user can retry
                     st.error(f"CRITICAL FAILURE: {str(e)}")
 
@@ -587,6 +707,10 @@ if st.session_state.sa_analysis_results:
     
     with st.expander("VIEW FULL PAYLOAD"):
         st.code(json_str, language="json")
+    
+    llm_str = load_llm_payload(SA_HISTORY_FILE, history_stamp(SA_HISTORY_FILE))
+    with st.expander(f"LLM PAYLOAD (~{estimate_tokens(llm_str)} TOKENS, RECENT SESSIONS + TRENDS)"):
+        st.code(llm_str, language="json")
         
     try:
         reset_clicked = st.button("RESET MEMORY & ANALYZE NEW FILE", use_container_width=True, key="sa_reset_btn")
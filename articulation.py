@@ -1,30 +1,353 @@
 import typer
+import hashlib
 import logging
 import os
 import time
 from pathlib import Path
 
-from typing import Optional
-from config import WEAK_WORD_CONFIDENCE_THRESHOLD, PAUSE_THRESHOLD_SECONDS
-from audio_utils import extract_audio_to_wav
-from transcription import evaluate_transcription
-from acoustics import evaluate_acoustics
-from output_manager import append_to_metrics, get_file_id, is_file_processed
+from typing import List, Optional, Tuple
+from config import WEAK_WORD_CONFIDENCE_THRESHOLD, PAUSE_THRESHOLD_SECONDS, WATCH_MAX_WORKERS, TIMINGS_LOG_FILE, WINDOW_SECONDS, WINDOW_STEP_SECONDS, WHISPER_BATCH_SIZE, CASCADE_DRAFT_MODEL, CASCADE_REFINE_MODEL, SCHEDULE_POLICY
+from audio_utils import extract_audio_to_wav, get_wav_duration
+from output_manager import append_to_metrics, get_file_id, is_file_processed, load_history_index
+from batch_manifest import BatchManifest, FileCheckpoint, UnfinishedBatchError, DECODING, TRANSCRIBING, ANALYZING, RECORDING, DONE, FAILED
+from instrumentation import PipelineTimer, ProgressCallback, optional_stage
+from cancellation import CancelToken, check_cancelled
+from word_timeline import store_timeline
+from metrics_timeline import build_metrics_timeline, timeline_to_lists, store_metrics_timeline
+import daemon
+import metrics_exporter
+import thread_budget
+from scheduler import POLICIES, BatchSchedule
+from job_queue import JobQueue
+from watcher import watch_directory
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 logger = logging.getLogger(__name__)
 
 app = typer.Typer(help="Articulation Analysis CLI")
 
+def analyze_media(media_path: str, whisper_model=None, smile=None, timer: Optional[PipelineTimer] = None, windowed: bool = False, start: Optional[float] = None, end: Optional[float] = None, checkpoint: Optional[FileCheckpoint] = None, cascade: bool = False, refine_model=None, progress: Optional[ProgressCallback] = None, cancel: Optional[CancelToken] = None) -> dict:
+    """
+    Runs the full articulation pipeline (ffmpeg -> Whisper -> OpenSMILE) on one media file.
+    Pre-loaded `whisper_model` / `smile` handles are reused when given (e.g. by the daemon).
+    Per-stage timings are recorded on `timer` when one is passed.
+    With `windowed` a sliding-window metrics timeline is added under "windows".
+    `start` / `end` (seconds) analyze only that part of the recording.
+    With a `checkpoint` the decoded WAV and the transcription result are kept until the file is
+    done, and stages whose output is already there (from an interrupted run) are skipped.
+    With `cascade` a small draft model transcribes the file and `refine_model` (loaded on first
+    need) re-transcribes only the low-confidence spans; `whisper_model` is then the draft model.
+    A `progress` callback hears about every stage start plus decode and transcription positions.
+    A `cancel` token aborts the run at its next checkpoint (JobCancelled), and once the audio
+    duration is known it also gets its timeout budget (JobTimedOut).
+    """
+    # Imported here: acoustics pulls in OpenSMILE and pandas, which a daemon client never needs
+    from transcription import evaluate_transcription, evaluate_transcription_cascade, load_faster_whisper_model
+    from acoustics import create_smile, extract_lld_frames, summarize_acoustics, voiced_frame_arrays
+
+    wav_path = None
+    keep_wav = False
+    try:
+        if checkpoint is not None and checkpoint.has_wav():
+            typer.secho("Reusing checkpointed audio.", fg=typer.colors.BLUE)
+            wav_path, keep_wav = str(checkpoint.wav_path), True
+        else:
+            if checkpoint is not None:
+                checkpoint.mark(DECODING)
+            with optional_stage(timer, "decode", progress):
+                wav_path = extract_audio_to_wav(media_path, start=start, end=end, timer=timer, progress=progress, cancel=cancel)
+            if checkpoint is not None:
+                wav_path, keep_wav = checkpoint.adopt_wav(wav_path), True
+        duration = get_wav_duration(wav_path)
+        if timer is not None:
+            timer.set_audio_duration(duration)
+        if cancel is not None:
+            cancel.set_budget(duration)
+            cancel.check()
+
+        transcription_metrics = checkpoint.load("transcription") if checkpoint is not None else None
+        if (whisper_model is None and transcription_metrics is None) or smile is None:
+            with optional_stage(timer, "model_load", progress):
+                if transcription_metrics is None:
+                    whisper_model = whisper_model or load_faster_whisper_model(CASCADE_DRAFT_MODEL if cascade else "base")
+                smile = smile or create_smile()
+
+        # 1. Transcription metrics (Whisper)
+        if transcription_metrics is not None:
+            typer.secho("Reusing checkpointed transcription.", fg=typer.colors.BLUE)
+        else:
+            if checkpoint is not None:
+                checkpoint.mark(TRANSCRIBING)
+            typer.secho("Running transcription analysis...", fg=typer.colors.BLUE)
+            with optional_stage(timer, "transcription", progress):
+                if cascade:
+                    transcription_metrics = evaluate_transcription_cascade(
+                        wav_path,
+                        conf_threshold=WEAK_WORD_CONFIDENCE_THRESHOLD,
+                        pause_threshold=PAUSE_THRESHOLD_SECONDS,
+                        draft_model=whisper_model,
+                        refine_model=refine_model,
+                        keep_words=True,
+                        progress=progress,
+                        cancel=cancel
+                    )
+                else:
+                    transcription_metrics = evaluate_transcription(
+                        wav_path, 
+                        conf_threshold=WEAK_WORD_CONFIDENCE_THRESHOLD, 
+                        pause_threshold=PAUSE_THRESHOLD_SECONDS,
+                        model=whisper_model,
+                        keep_words=True,
+                        progress=progress,
+                        cancel=cancel
+                    )
+            if checkpoint is not None:
+                checkpoint.save("transcription", transcription_metrics)
+
+        # 2. Acoustic metrics (OpenSmile)
+        if checkpoint is not None:
+            checkpoint.mark(ANALYZING)
+        typer.secho("Running acoustic analysis...", fg=typer.colors.BLUE)
+        with optional_stage(timer, "acoustics", progress):
+            lld_frames = extract_lld_frames(wav_path, smile=smile, cancel=cancel)
+            acoustic_metrics = summarize_acoustics(lld_frames)
+
+        # 3. Merge metrics
+        final_metrics = {**transcription_metrics, **acoustic_metrics}
+
+        # 4. Optional windowed timeline, reusing the same words and LLD frames
+        check_cancelled(cancel)
+        if windowed:
+            with optional_stage(timer, "windowed_metrics", progress):
+                final_metrics["windows"] = timeline_to_lists(build_metrics_timeline(
+                    transcription_metrics["words"], voiced_frame_arrays(lld_frames),
+                    WINDOW_SECONDS, WINDOW_STEP_SECONDS,
+                    PAUSE_THRESHOLD_SECONDS, WEAK_WORD_CONFIDENCE_THRESHOLD
+                ))
+        return final_metrics
+    finally:
+        # Cleanup (a checkpointed WAV stays until the file is done)
+        if wav_path and not keep_wav and os.path.exists(wav_path):
+            os.remove(wav_path)
+
+def history_key(current_file: Path, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[str, str]:
+    """(source_name, file_id) a file is recorded under; a start/end range gets its own name and ID."""
+    file_id = get_file_id(str(current_file))
+    source_name = current_file.name
+    if start is not None or end is not None:
+        source_name = f"{current_file.name} [{start or 0:g}-{'end' if end is None else f'{end:g}'}s]"
+        file_id = hashlib.md5(f"{file_id}:{source_name}".encode()).hexdigest()
+    return source_name, file_id
+
+def batch_transcribe(files: List[Path], history_file: str, manifest: BatchManifest, batch_size: int, start: Optional[float] = None, end: Optional[float] = None):
+    """
+    Decodes the files that still need a transcription into their checkpoints and transcribes
+    them together in Whisper batches (see transcription.evaluate_transcriptions). The per-file
+    loop afterwards finds the checkpointed WAV and transcription and only runs the acoustics.
+    Any failure here just leaves the file to the per-file path.
+    """
+    from transcription import evaluate_transcriptions
+
+    known = load_history_index(history_file)
+    ready = []
+    for current_file in files:
+        # Batched transcription is never combined with --cascade
+        checkpoint = manifest.checkpoint(str(current_file), start=start, end=end, cascade=False)
+        if any(key in known for key in history_key(current_file, start, end)) or checkpoint.load("transcription") is not None:
+            continue
+        if not checkpoint.has_wav():
+            checkpoint.mark(DECODING)
+            try:
+                checkpoint.adopt_wav(extract_audio_to_wav(str(current_file), start=start, end=end))
+            except Exception as e:
+                typer.secho(f"Could not decode {current_file.name} for batched transcription: {e}", fg=typer.colors.YELLOW)
+                continue
+        ready.append(checkpoint)
+    if len(ready) < 2:
+        return
+
+    typer.secho(f"Batch-transcribing {len(ready)} file(s) (batch size {batch_size})...", fg=typer.colors.BLUE)
+    for checkpoint in ready:
+        checkpoint.mark(TRANSCRIBING)
+    try:
+        results = evaluate_transcriptions(
+            [str(checkpoint.wav_path) for checkpoint in ready],
+            conf_threshold=WEAK_WORD_CONFIDENCE_THRESHOLD,
+            pause_threshold=PAUSE_THRESHOLD_SECONDS,
+            keep_words=True,
+            batch_size=batch_size
+        )
+    except Exception as e:
+        typer.secho(f"Batched transcription failed ({e}); transcribing file by file.", fg=typer.colors.YELLOW)
+        return
+    for checkpoint, result in zip(ready, results):
+        checkpoint.save("transcription", result)
+
+def process_file(current_file: Path, history_file: str, no_daemon: bool = False, timings: bool = False, store_timings: bool = False, metrics_file: Optional[str] = None, store_words: bool = True, windowed: bool = False, start: Optional[float] = None, end: Optional[float] = None, manifest: Optional[BatchManifest] = None, cascade: bool = False, cancel: Optional[CancelToken] = None, resources: Optional[daemon.WarmResources] = None) -> bool:
+    """
+    Analyzes one file, appends it to the history and prints the summary.
+    With `timings` the per-stage instrumentation is appended to TIMINGS_LOG_FILE as a JSON line;
+    with `store_timings` it is also stored in the history entry (taken before the entry is written,
+    so the stored copy lacks the history_write stage the JSON line has). Throughput metrics are always
+    fed to the exporter and dumped to `metrics_file` when given. With `store_words` every word
+    is kept in a WordTimeline sidecar referenced from the history entry; with `windowed` a
+    sliding-window metrics timeline sidecar is stored as well. A `start` / `end` range is
+    recorded as its own history entry ("name.m4a [30-90s]"), separate from the whole file.
+    With a batch `manifest` every stage transition is recorded and finished stages are checkpointed.
+    With `cascade` the transcription uses the draft/refine model cascade.
+    A `cancel` token (e.g. from a job queue claim) stops the analysis and is checked once more
+    right before the history write; without one each file still gets its own timeout token.
+    In-process runs use the model handles of `resources` when given, so the files of one
+    invocation share a single faster-whisper / OpenSMILE load and use it one at a time.
+    Returns True if the file is now recorded in the history (analyzed or already there).
+    """
+    source_name, file_id = history_key(current_file, start, end)
+    if is_file_processed(history_file, source_name, file_id):
+        typer.secho(f"Skipping '{source_name}' (already processed with ID: {file_id}).", fg=typer.colors.YELLOW)
+        if manifest is not None:
+            manifest.mark(str(current_file), DONE)
+        return True
+        
+    typer.secho(f"\nStarting analysis for: {source_name}", fg=typer.colors.CYAN, bold=True)
+    start_time = time.time()
+    timer = PipelineTimer(source_name)
+    checkpoint = manifest.checkpoint(str(current_file), start=start, end=end, cascade=cascade) if manifest is not None else None
+
+    try:
+        # Prefer the warm daemon; fall back to in-process execution when none is running
+        payload = {"path": str(current_file.resolve()), "windowed": windowed, "start": start, "end": end, "cascade": cascade}
+        if checkpoint is not None:
+            # The daemon checkpoints the stages itself; the manifest only sees the file being analyzed
+            checkpoint.mark(ANALYZING)
+            payload["checkpoint_dir"] = str(checkpoint.directory.resolve())
+        final_metrics = None if no_daemon else daemon.request_analysis("articulation", payload, timer=timer)
+        if final_metrics is None:
+            # Times out by audio duration, and is cancelled when a watcher shuts down mid-file
+            if resources is not None:
+                final_metrics = resources.analyze_media(str(current_file), timer=timer, windowed=windowed, start=start, end=end, checkpoint=checkpoint, cascade=cascade, cancel=cancel)
+            else:
+                final_metrics = analyze_media(str(current_file), timer=timer, windowed=windowed, start=start, end=end, checkpoint=checkpoint, cascade=cascade, cancel=cancel or CancelToken())
+        else:
+            typer.secho("Analyzed by running daemon.", fg=typer.colors.BLUE)
+        
+        # 4. Save to history (the full word list goes to a compact columnar sidecar)
+        check_cancelled(cancel)
+        if checkpoint is not None:
+            checkpoint.mark(RECORDING)
+        with timer.stage("history_write"):
+            words = final_metrics.pop("words", None)
+            if words is not None and store_words:
+                final_metrics["word_timeline"] = store_timeline(history_file, file_id, words)
+            windows = final_metrics.pop("windows", None)
+            if windows is not None:
+                final_metrics["metrics_timeline"] = store_metrics_timeline(history_file, file_id, windows)
+            # The entry cannot time its own write: the stored summary stops before history_write
+            append_to_metrics(
+                history_file, source_name, file_id, final_metrics,
+                instrumentation=timer.summary() if store_timings else None
+            )
+        if checkpoint is not None:
+            checkpoint.mark(DONE)
+        if timings:
+            timer.emit(TIMINGS_LOG_FILE)
+        
+        elapsed = time.time() - start_time
+        typer.secho(f"\nAnalysis complete in {elapsed:.1f}s!", fg=typer.colors.GREEN, bold=True)
+        
+        # Display summary to terminal
+        typer.secho("--- ARTICULATION SUMMARY ---", bold=True)
+        typer.echo(f"Speech Rate: {final_metrics['speech_rate_sps']} syllables/sec")
+        typer.echo(f"Pauses (> {PAUSE_THRESHOLD_SECONDS}s): {final_metrics['pause_count']} (avg {final_metrics['avg_pause_duration_sec']}s)")
+        typer.echo(f"Jaw Mobility (F1 SD): {final_metrics['f1_variance_sd']}")
+        typer.echo(f"Tongue Mobility (F2 SD): {final_metrics['f2_variance_sd']}")
+        typer.echo(f"Voice Clarity (Mean HNR): {final_metrics['mean_hnr']}")
+        
+        weak_words = final_metrics['weak_words']
+        if weak_words:
+            typer.secho(f"\nWeak Words ({len(weak_words)} words below {WEAK_WORD_CONFIDENCE_THRESHOLD} conf):", fg=typer.colors.YELLOW)
+            for w in weak_words[:10]: # Limit console output to 10
+                typer.echo(f"  - '{w['word']}' (conf: {w['probability']:.2f}, at {w['start']:.1f}s)")
+            if len(weak_words) > 10:
+                typer.echo(f"  ... and {len(weak_words) - 10} more.")
+        else:
+            typer.secho("\nExcellent articulation! No weak words detected.", fg=typer.colors.GREEN)
+        metrics_exporter.observe_file("articulation", timer.summary(), True)
+        return True
+            
+    except Exception as e:
+        typer.secho(f"\nAnalysis failed for {current_file.name}: {str(e)}", fg=typer.colors.RED)
+        if checkpoint is not None:
+            checkpoint.mark(FAILED, error=str(e))
+        metrics_exporter.observe_file("articulation", timer.summary(), False)
+        return False
+
+    finally:
+        if metrics_file:
+            metrics_exporter.dump_to_file(metrics_file)
+
+def schedule_batch(files: List[Path], policy: str) -> BatchSchedule:
+    """Probes durations up front (cached), orders the batch by `policy` and prints the plan."""
+    plan = BatchSchedule(files, policy)
+    typer.secho(plan.summary(), fg=typer.colors.BLUE)
+    for line in plan.plan_lines():
+        typer.echo(line)
+    return plan
+
 @app.command()
 def main(
     input_file: Optional[Path] = typer.Argument(None, help="Path to the audio/video file. Defaults to parsing 'resources/articulations'"),
-    history_file: str = typer.Option("metrics_history.json", "--history", "-h", help="Path to the JSON history file to append to")
+    history_file: str = typer.Option("metrics_history.json", "--history", "-h", help="Path to the JSON history file to append to"),
+    no_daemon: bool = typer.Option(False, "--no-daemon", help="Always run in-process, even if an analysis daemon is running"),
+    watch: bool = typer.Option(False, "--watch", "-w", help="Keep running and analyze new files as they land in 'resources/articulations'"),
+    workers: int = typer.Option(WATCH_MAX_WORKERS, "--workers", help="Concurrent analyses in --watch mode"),
+    timings: bool = typer.Option(False, "--timings", help=f"Append per-stage timing/resource JSON lines to {TIMINGS_LOG_FILE}"),
+    store_timings: bool = typer.Option(False, "--store-timings", help="Also store per-stage timings in each history entry"),
+    metrics_port: Optional[int] = typer.Option(None, "--metrics-port", help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics"),
+    metrics_file: Optional[str] = typer.Option(None, "--metrics-file", help="Dump Prometheus metrics to this file after every analyzed file"),
+    no_timeline: bool = typer.Option(False, "--no-timeline", help="Do not store the full word timeline sidecar (.npz) for each file"),
+    windowed: bool = typer.Option(False, "--windowed", help=f"Also store per-window metrics ({WINDOW_SECONDS}s windows every {WINDOW_STEP_SECONDS}s)"),
+    start: Optional[float] = typer.Option(None, "--start", help="Analyze from this many seconds into the recording"),
+    end: Optional[float] = typer.Option(None, "--end", help="Stop analyzing at this many seconds into the recording"),
+    batch_size: Optional[int] = typer.Option(WHISPER_BATCH_SIZE, "--batch-size", help="Transcribe all files together in Whisper batches of this many VAD chunks (in-process; best for many short clips)"),
+    cascade: bool = typer.Option(False, "--cascade", help=f"Draft with the '{CASCADE_DRAFT_MODEL}' model and re-transcribe only low-confidence spans with '{CASCADE_REFINE_MODEL}'"),
+    resume: bool = typer.Option(False, "--resume", help="Continue an interrupted batch from its manifest (<history>.batch.json), skipping finished files and stages"),
+    new_batch: bool = typer.Option(False, "--new-batch", help="Start over even though the manifest still has unfinished files from an interrupted batch"),
+    schedule: str = typer.Option(SCHEDULE_POLICY, "--schedule", help=f"Batch order: {', '.join(POLICIES)} (shortest = shortest recordings first)"),
+    queue: Optional[str] = typer.Option(None, "--queue", help="Shared queue directory: run the same command on several machines and each file is analyzed once")
 ):
     """
     Analyze speech articulation metrics from an audio or video file.
     """
     valid_exts = {'.mp4', '.mov', '.mkv', '.wav', '.mp3', '.m4a'}
+    default_dir = Path("resources/articulations")
+
+    if (start is not None and start < 0) or (end is not None and end <= 0):
+        typer.secho("Error: --start must be 0 or more and --end greater than 0 (seconds into the recording).", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    if start is not None and end is not None and end <= start:
+        typer.secho(f"Error: --end ({end:g}s) must be after --start ({start:g}s).", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if metrics_port or metrics_file:
+        metrics_exporter.track_queue(str(default_dir), valid_exts, history_file)
+    if metrics_port:
+        metrics_exporter.start_http_server(metrics_port)
+
+    # Split the cores between concurrent jobs so Whisper, ffmpeg and BLAS don't oversubscribe them
+    thread_budget.configure(workers if watch else 1)
+    # Files analyzed in-process share one set of model handles, loaded on first need (not at all
+    # while a daemon does the work); watch workers take turns on them
+    resources = daemon.WarmResources()
+
+    if watch:
+        typer.secho(f"Watching '{default_dir}' for new recordings (Ctrl+C to stop)...", fg=typer.colors.CYAN, bold=True)
+        watch_directory(
+            str(default_dir), valid_exts,
+            lambda path: process_file(Path(path), history_file, no_daemon, timings, store_timings, metrics_file, not no_timeline, windowed, cascade=cascade, resources=resources),
+            history_file, max_workers=workers
+        )
+        return
+
     files_to_process = []
     
     if input_file is not None:
@@ -33,7 +356,6 @@ def main(
             raise typer.Exit(code=1)
         files_to_process.append(input_file)
     else:
-        default_dir = Path("resources/articulations")
         if default_dir.exists() and default_dir.is_dir():
             for f in default_dir.iterdir():
                 if f.is_file() and f.suffix.lower() in valid_exts:
@@ -42,67 +364,52 @@ def main(
             typer.secho(f"No valid media files found in default directory '{default_dir}'.", fg=typer.colors.YELLOW)
             raise typer.Exit(code=0)
 
-    for current_file in files_to_process:
-        file_id = get_file_id(str(current_file))
-        if is_file_processed(history_file, current_file.name, file_id):
-            typer.secho(f"Skipping '{current_file.name}' (already processed with ID: {file_id}).", fg=typer.colors.YELLOW)
-            continue
-            
-        typer.secho(f"\nStarting analysis for: {current_file.name}", fg=typer.colors.CYAN, bold=True)
-        start_time = time.time()
-    
-        # Process audio
-        wav_path = None
+    if schedule not in POLICIES:
+        typer.secho(f"Error: Unknown --schedule '{schedule}'. Choose from: {', '.join(POLICIES)}.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if queue:
+        # Claims in the shared queue take the place of the per-machine manifest (and are resumable by themselves)
+        files_to_process = schedule_batch(files_to_process, schedule).files if len(files_to_process) > 1 else files_to_process
+        job_queue = JobQueue(queue)
+        typer.secho(f"Draining {len(files_to_process)} file(s) through queue '{queue}' as {job_queue.node}...", fg=typer.colors.CYAN, bold=True)
+        counts = job_queue.drain(
+            files_to_process,
+            lambda current_file, cancel: process_file(current_file, history_file, no_daemon, timings, store_timings, metrics_file, not no_timeline, windowed, start, end, cascade=cascade, cancel=cancel, resources=resources)
+        )
+        typer.secho(f"Queue drained: {counts['analyzed']} analyzed here, {counts['by_other_nodes']} by other nodes, {counts['failed']} failed attempt(s).", fg=typer.colors.GREEN)
+        return
+
+    # Per-file progress and stage checkpoints, so an interrupted batch can be resumed
+    # (a one-off single-file run neither needs nor touches the batch manifest)
+    manifest = None
+    if len(files_to_process) > 1:
         try:
-            wav_path = extract_audio_to_wav(str(current_file))
-            
-            # 1. Transcription metrics (Whisper)
-            typer.secho("Running transcription analysis...", fg=typer.colors.BLUE)
-            transcription_metrics = evaluate_transcription(
-                wav_path, 
-                conf_threshold=WEAK_WORD_CONFIDENCE_THRESHOLD, 
-                pause_threshold=PAUSE_THRESHOLD_SECONDS
-            )
-            
-            # 2. Acoustic metrics (OpenSmile)
-            typer.secho("Running acoustic analysis...", fg=typer.colors.BLUE)
-            acoustic_metrics = evaluate_acoustics(wav_path)
-            
-            # 3. Merge metrics
-            final_metrics = {**transcription_metrics, **acoustic_metrics}
-            
-            # 4. Save to history
-            append_to_metrics(history_file, str(current_file.name), file_id, final_metrics)
-            
-            elapsed = time.time() - start_time
-            typer.secho(f"\nAnalysis complete in {elapsed:.1f}s!", fg=typer.colors.GREEN, bold=True)
-            
-            # Display summary to terminal
-            typer.secho("--- ARTICULATION SUMMARY ---", bold=True)
-            typer.echo(f"Speech Rate: {final_metrics['speech_rate_sps']} syllables/sec")
-            typer.echo(f"Pauses (> {PAUSE_THRESHOLD_SECONDS}s): {final_metrics['pause_count']} (avg {final_metrics['avg_pause_duration_sec']}s)")
-            typer.echo(f"Jaw Mobility (F1 SD): {final_metrics['f1_variance_sd']}")
-            typer.echo(f"Tongue Mobility (F2 SD): {final_metrics['f2_variance_sd']}")
-            typer.echo(f"Voice Clarity (Mean HNR): {final_metrics['mean_hnr']}")
-            
-            weak_words = final_metrics['weak_words']
-            if weak_words:
-                typer.secho(f"\nWeak Words ({len(weak_words)} words below {WEAK_WORD_CONFIDENCE_THRESHOLD} conf):", fg=typer.colors.YELLOW)
-                for w in weak_words[:10]: # Limit console output to 10
-                    typer.echo(f"  - '{w['word']}' (conf: {w['probability']:.2f}, at {w['start']:.1f}s)")
-                if len(weak_words) > 10:
-                    typer.echo(f"  ... and {len(weak_words) - 10} more.")
-            else:
-                typer.secho("\nExcellent articulation! No weak words detected.", fg=typer.colors.GREEN)
-                
-        except Exception as e:
-            typer.secho(f"\nAnalysis failed for {current_file.name}: {str(e)}", fg=typer.colors.RED)
-            continue
-            
-        finally:
-            # Cleanup
-            if wav_path and os.path.exists(wav_path):
-                os.remove(wav_path)
+            manifest = BatchManifest.for_history(history_file, resume=resume, new_batch=new_batch)
+        except UnfinishedBatchError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        manifest.add(str(f) for f in files_to_process)
+        if resume:
+            finished = [f for f in files_to_process if manifest.state(str(f)) == DONE]
+            if finished:
+                typer.secho(f"Resuming batch: {len(finished)} of {len(files_to_process)} file(s) already done.", fg=typer.colors.BLUE)
+            files_to_process = [f for f in files_to_process if f not in finished]
+
+    plan = None
+    if len(files_to_process) > 1:
+        plan = schedule_batch(files_to_process, schedule)
+        files_to_process = plan.files
+
+    if batch_size and cascade:
+        typer.secho("--cascade transcribes file by file; ignoring --batch-size.", fg=typer.colors.YELLOW)
+    elif batch_size and len(files_to_process) > 1:
+        batch_transcribe(files_to_process, history_file, manifest, batch_size, start, end)
+
+    for index, current_file in enumerate(files_to_process):
+        if plan is not None:
+            typer.secho(plan.progress_line(index), fg=typer.colors.BLUE)
+        process_file(current_file, history_file, no_daemon, timings, store_timings, metrics_file, not no_timeline, windowed, start, end, manifest=manifest, cascade=cascade, resources=resources)
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -1,19 +1,92 @@
 import logging
 import tempfile
+import wave
 import ffmpeg
+import numpy as np
 import os
 from pathlib import Path
+from typing import Any, Dict, Optional
+
+import thread_budget
+from config import TARGET_SAMPLE_RATE, FFMPEG_FAST_RESAMPLER
+from cancellation import JobCancelled, check_cancelled
+from instrumentation import report_progress
+
+# Frames per read/write when copying WAV ranges (~4 s at 16 kHz)
+WAV_COPY_CHUNK_FRAMES = 65536
 
 logger = logging.getLogger(__name__)
 
-def extract_audio_to_wav(input_path: str) -> str:
+def probe_media(input_path: str) -> Optional[Dict[str, Any]]:
+    """
+    ffprobe summary of a media file: whether it has audio/video, and the first audio stream's
+    codec, sample rate and channel count. Returns None when ffprobe is unavailable or fails.
+    """
+    try:
+        info = ffmpeg.probe(input_path)
+    except (ffmpeg.Error, FileNotFoundError, OSError) as e:
+        logger.debug(f"ffprobe failed for {input_path}: {e}")
+        return None
+    streams = info.get("streams", [])
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+    return {
+        "has_audio": audio is not None,
+        "has_video": any(st.get("codec_type") == "video" for st in streams),
+        "codec": audio.get("codec_name") if audio else None,
+        "sample_rate": int(audio.get("sample_rate", 0)) if audio else None,
+        "channels": audio.get("channels") if audio else None,
+        "duration": float(info.get("format", {}).get("duration", 0) or 0),
+    }
+
+def is_target_wav(input_path: str) -> bool:
+    """True for a 16-bit PCM mono WAV at TARGET_SAMPLE_RATE, i.e. already what the analyzers expect."""
+    if Path(input_path).suffix.lower() != ".wav":
+        return False
+    try:
+        with wave.open(input_path, "rb") as wf:
+            return wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == TARGET_SAMPLE_RATE
+    except (wave.Error, EOFError, OSError):
+        # e.g. WAVE_FORMAT_EXTENSIBLE headers; ffmpeg handles those
+        return False
+
+def _copy_wav_range(input_path: str, output_path: str, start: Optional[float], end: Optional[float]):
+    """Copies (a time range of) a PCM WAV frame-for-frame, without decoding or resampling."""
+    with wave.open(input_path, "rb") as src:
+        rate, total = src.getframerate(), src.getnframes()
+        first = min(total, int(round((start or 0.0) * rate)))
+        last = total if end is None else min(total, int(round(end * rate)))
+        src.setpos(first)
+        with wave.open(output_path, "wb") as dst:
+            dst.setparams(src.getparams())
+            remaining = max(0, last - first)
+            while remaining:
+                chunk = src.readframes(min(remaining, WAV_COPY_CHUNK_FRAMES))
+                if not chunk:
+                    break
+                dst.writeframes(chunk)
+                remaining -= len(chunk) // (src.getsampwidth() * src.getnchannels())
+
+def extract_audio_to_wav(input_path: str, start: Optional[float] = None, end: Optional[float] = None, timer=None, progress=None, cancel=None) -> str:
     """
     Extracts audio from any video or audio file and converts it 
     to a 16kHz mono WAV file suitable for opensmile and whisper.
-    Returns the path to the temporary WAV file.
+    Returns the path to the temporary WAV file (always a new file the caller deletes).
+
+    `start` / `end` (seconds) restrict the output to that range. Inputs that are already
+    16 kHz mono PCM WAV are copied without running ffmpeg; everything else is decoded with
+    only the first audio stream mapped, so video is never demuxed. The chosen path is
+    recorded as "decode_path" on `timer` (an instrumentation.PipelineTimer) when given.
+    A `progress` callback (instrumentation.ProgressCallback) receives the decoded seconds.
+    With a `cancel` token (cancellation.CancelToken) ffmpeg is killed as soon as it is cancelled.
     """
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"Input file not found: {input_path}")
+    if start is not None and start < 0:
+        raise ValueError(f"Start ({start}s) must not be negative")
+    if end is not None and end <= 0:
+        raise ValueError(f"End ({end}s) must be after the beginning of the recording")
+    if start is not None and end is not None and end <= start:
+        raise ValueError(f"End ({end}s) must be after start ({start}s)")
         
     logger.info(f"Extracting audio from {input_path}...")
     
@@ -21,15 +94,47 @@ def extract_audio_to_wav(input_path: str) -> str:
     temp_fd, temp_path = tempfile.mkstemp(suffix=".wav")
     os.close(temp_fd) # Close file descriptor so ffmpeg can write to it
     
+    if is_target_wav(input_path):
+        _copy_wav_range(input_path, temp_path, start, end)
+        _check_range(temp_path, input_path, start, end)
+        _record_decode(timer, "wav_copy", start, end)
+        duration = get_wav_duration(temp_path)
+        report_progress(progress, "decode", duration, duration)
+        logger.info(f"Input already 16kHz mono WAV, copied without transcoding: {temp_path}")
+        return temp_path
+
+    probe = probe_media(input_path)
+    if probe is not None and not probe["has_audio"]:
+        os.remove(temp_path)
+        raise RuntimeError(f"No audio stream found in {input_path}")
+
+    input_args = {"threads": thread_budget.ffmpeg_threads()}
+    if start:
+        # Input-side seek: ffmpeg jumps to the nearest keyframe instead of decoding up to `start`
+        input_args["ss"] = start
+    output_args = {"acodec": "pcm_s16le", "ac": 1, "ar": str(TARGET_SAMPLE_RATE), "map": "0:a:0", "vn": None}
+    if end is not None:
+        output_args["t"] = end - (start or 0.0)
+    if FFMPEG_FAST_RESAMPLER:
+        output_args["af"] = FFMPEG_FAST_RESAMPLER
+
     try:
         # Run ffmpeg wrapper directly capturing standard output/error to avoid spam
-        (
+        stream = (
             ffmpeg
-            .input(input_path)
-            .output(temp_path, acodec='pcm_s16le', ac=1, ar='16000')
+            .input(input_path, **input_args)
+            .output(temp_path, **output_args)
             .overwrite_output()
-            .run(quiet=True)
         )
+        if progress is None and cancel is None:
+            stream.run(quiet=True)
+        else:
+            total = (probe or {}).get("duration") or None
+            if total is not None:
+                total = max(0.0, min(total, end if end is not None else total) - (start or 0.0))
+            _run_monitored(stream, progress, total, cancel)
+        _check_range(temp_path, input_path, start, end)
+        _record_decode(timer, "transcode_fast_resampler" if FFMPEG_FAST_RESAMPLER else "transcode", start, end, probe)
         logger.info(f"Audio extracted to temporary 16kHz WAV: {temp_path}")
         return temp_path
     except ffmpeg.Error as e:
@@ -38,6 +143,79 @@ def extract_audio_to_wav(input_path: str) -> str:
         if os.path.exists(temp_path):
             os.remove(temp_path)
         raise RuntimeError("Failed to extract audio using ffmpeg")
+    except OSError:
+        # ffmpeg binary missing from PATH
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise RuntimeError("ffmpeg is not installed or not on PATH")
+    except JobCancelled:
+        # ffmpeg was killed mid-file; its partial output is of no use
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _run_monitored(stream, progress, total_sec: Optional[float], cancel):
+    """
+    Runs an ffmpeg-python stream with `-progress pipe:1`, forwarding the decoded position to
+    `progress` and checking `cancel` each time ffmpeg reports (about twice a second). ffmpeg
+    is killed if the run stops early, whether cancelled, timed out or interrupted.
+    """
+    process = (
+        stream
+        .global_args("-progress", "pipe:1", "-nostats", "-loglevel", "error")
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+    try:
+        position = 0.0
+        for line in process.stdout:
+            key, _, value = line.decode("utf-8", "replace").strip().partition("=")
+            # Both keys hold microseconds (out_time_ms is misnamed; newer builds add out_time_us)
+            if key in ("out_time_us", "out_time_ms") and value.isdigit():
+                position = int(value) / 1_000_000
+            elif key == "progress":
+                check_cancelled(cancel)
+                report_progress(progress, "decode", position, total_sec)
+        # -loglevel error keeps stderr small enough to read after stdout without blocking
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise ffmpeg.Error("ffmpeg", None, stderr)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def _check_range(wav_path: str, input_path: str, start: Optional[float], end: Optional[float]):
+    """Deletes the output and raises ValueError when a start/end range held no audio (it lies past the end)."""
+    if (start is None and end is None) or get_wav_duration(wav_path) > 0:
+        return
+    os.remove(wav_path)
+    raise ValueError(f"Range {start or 0:g}-{'end' if end is None else f'{end:g}'}s lies outside the recording {input_path}")
+
+def _record_decode(timer, decode_path: str, start: Optional[float], end: Optional[float], probe: Optional[Dict[str, Any]] = None):
+    if timer is None:
+        return
+    timer.extra["decode_path"] = decode_path
+    if start is not None or end is not None:
+        timer.extra["decode_range"] = [start, end]
+    if probe is not None:
+        timer.extra["source_audio"] = {k: probe[k] for k in ("codec", "sample_rate", "channels", "has_video")}
+
+def get_wav_duration(wav_path: str) -> float:
+    """Returns the duration in seconds of a PCM WAV file by reading its header."""
+    with wave.open(wav_path, "rb") as wf:
+        rate = wf.getframerate()
+        return wf.getnframes() / float(rate) if rate else 0.0
+
+def read_wav_samples(wav_path: str) -> np.ndarray:
+    """
+    Samples of a 16-bit PCM mono WAV (as written by extract_audio_to_wav) as float32 in [-1, 1),
+    the layout faster-whisper takes for in-memory audio.
+    """
+    with wave.open(wav_path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError(f"Expected 16-bit mono PCM WAV, got {wav_path}")
+        frames = wf.readframes(wf.getnframes())
+    return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
 
 if __name__ == "__main__":
     # Simple debug test
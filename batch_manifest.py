@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from config import BATCH_CHECKPOINT_DIR
+from output_manager import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Per-file states, in pipeline order
+PENDING, DECODING, TRANSCRIBING, ANALYZING, RECORDING, DONE, FAILED = (
+    "pending", "decoding", "transcribing", "analyzing", "recording", "done", "failed"
+)
+
+
+def manifest_path(history_file: str) -> str:
+    """The manifest lives next to its history: metrics_history.json -> metrics_history.batch.json"""
+    path = Path(history_file)
+    return str(path.with_name(f"{path.stem}.batch.json"))
+
+
+class UnfinishedBatchError(RuntimeError):
+    """A fresh run would overwrite the manifest of an interrupted batch that can still be resumed."""
+
+
+class BatchManifest:
+    """
+    Progress record for a batch run: one state per input file, rewritten atomically on every
+    transition, plus a checkpoint directory per file for the outputs of finished stages (the
+    decoded WAV, the transcription result). A run started with `resume=True` skips files that
+    are done and restarts the others from their last completed stage.
+    """
+
+    @classmethod
+    def for_history(cls, history_file: str, resume: bool = False, new_batch: bool = False) -> "BatchManifest":
+        """The manifest of batches that append to `history_file` (one per tool, so runs never clash)."""
+        return cls(manifest_path(history_file), str(Path(BATCH_CHECKPOINT_DIR) / Path(history_file).stem), resume, new_batch)
+
+    def __init__(self, path: str, checkpoint_root: str, resume: bool = False, new_batch: bool = False):
+        """
+        With `resume` the existing manifest is continued. Otherwise a new batch starts, which
+        discards the old manifest and its checkpoints - refused with UnfinishedBatchError while
+        that batch still has unfinished files, unless `new_batch` says so deliberately.
+        """
+        self.path = path
+        self.checkpoint_root = Path(checkpoint_root)
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        stored = self._read() if os.path.exists(path) else {}
+        if resume:
+            self.files = stored
+            return
+        # Failed files ended their run; pending or mid-stage files mean the batch was interrupted
+        unfinished = sum(1 for record in stored.values() if record.get("state") not in (DONE, FAILED))
+        if unfinished and not new_batch:
+            raise UnfinishedBatchError(
+                f"{path} has {unfinished} unfinished file(s) from an interrupted batch. "
+                f"Continue it with --resume, or pass --new-batch to discard it."
+            )
+        if os.path.exists(checkpoint_root):
+            # A new batch never reuses checkpoints left over from an older one
+            shutil.rmtree(checkpoint_root, ignore_errors=True)
+        if stored:
+            self._save()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read batch manifest {self.path} ({e}); starting a fresh run.")
+            return {}
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        return str(Path(file_path).resolve())
+
+    def add(self, file_paths: Iterable[str]):
+        """Registers files as pending (files already known to a resumed manifest keep their state)."""
+        with self.lock:
+            for file_path in file_paths:
+                self.files.setdefault(self.key(file_path), {"state": PENDING})
+            self._save()
+
+    def state(self, file_path: str) -> str:
+        return self.files.get(self.key(file_path), {}).get("state", PENDING)
+
+    def mark(self, file_path: str, state: str, error: Optional[str] = None):
+        with self.lock:
+            record = self.files.setdefault(self.key(file_path), {})
+            record["state"] = state
+            record["updated"] = datetime.now().isoformat()
+            if error:
+                record["error"] = error
+            else:
+                record.pop("error", None)
+            self._save()
+        if state == DONE:
+            shutil.rmtree(self.checkpoint_dir(file_path).parent, ignore_errors=True)
+
+    def checkpoint_dir(self, file_path: str, **params: Any) -> Path:
+        """
+        Where finished-stage outputs of one file are kept until it is done: a folder per input
+        path (same-named files in different folders never share one) with a subfolder per set of
+        analysis `params` (e.g. start/end, cascade, model), so a resume only reuses outputs
+        made with the same settings.
+        """
+        key = self.key(file_path)
+        folder = self.checkpoint_root / f"{Path(key).name}-{hashlib.md5(key.encode()).hexdigest()[:12]}"
+        return folder / hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+    def checkpoint(self, file_path: str, **params: Any) -> "FileCheckpoint":
+        return FileCheckpoint(str(self.checkpoint_dir(file_path, **params)), self, file_path)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for record in self.files.values():
+            counts[record["state"]] = counts.get(record["state"], 0) + 1
+        return counts
+
+    def _save(self):
+        atomic_write_json(self.path, {"updated": datetime.now().isoformat(), "files": self.files}, indent=2)
+
+
+class FileCheckpoint:
+    """
+    The view of a BatchManifest that one analysis sees: `mark` stage transitions, and
+    save/load stage outputs so a resumed run can skip the stages that already finished.
+    Without a manifest (the daemon side of a request) only the stage outputs are kept.
+    """
+
+    def __init__(self, directory: str, manifest: Optional[BatchManifest] = None, file_path: Optional[str] = None):
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self.file_path = file_path
+
+    def mark(self, state: str, error: Optional[str] = None):
+        if self.manifest is not None:
+            self.manifest.mark(self.file_path, state, error)
+
+    @property
+    def wav_path(self) -> Path:
+        return self.directory / "audio.wav"
+
+    def has_wav(self) -> bool:
+        return self.wav_path.exists()
+
+    def adopt_wav(self, wav_path: str) -> str:
+        """Moves a freshly decoded temp WAV into the checkpoint and returns its new path."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        shutil.move(wav_path, self.wav_path)
+        return str(self.wav_path)
+
+    def load(self, name: str) -> Optional[Any]:
+        path = self.directory / f"{name}.json"
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, name: str, data: Any):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(str(self.directory / f"{name}.json"), data)
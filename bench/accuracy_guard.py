@@ -0,0 +1,335 @@
+"""
+Accuracy guard for the pipeline's performance modes.
+
+    python -m bench.accuracy_guard                                     # committed recordings, every mode
+    python -m bench.accuracy_guard --mode float32 --mode cascade
+    python -m bench.accuracy_guard --update-golden                     # accept the current baseline
+
+A speedup must not move the numbers the longitudinal trends are built on. Every fixture is run
+through the baseline pipeline (per file, int8 Whisper 'base', ffmpeg's default resampler, one
+OpenSMILE pass) and through each performance mode. Each mode's tracked metrics are compared
+with the baseline's, and the baseline's with the golden outputs recorded by --update-golden,
+against config.ACCURACY_TOLERANCES. Exits with code 1 when anything drifted further, and also
+when the guard could not check what it is for: missing dependencies (unless --allow-skip),
+fixtures without speech, or fixtures without golden outputs.
+
+The fixtures are short real recordings with speech (FIXTURE_DIR); synthetic audio gives
+Whisper no words, which would leave the transcription metrics unguarded. 16 kHz mono WAVs are
+copied without ffmpeg, so fast_resampler needs at least one recording in another format.
+"""
+import importlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import typer
+
+from bench.run_bench import RESULTS_DIR, git_revision
+from config import (
+    ACCURACY_TOLERANCES, CASCADE_DRAFT_MODEL, CASCADE_REFINE_MODEL,
+    PAUSE_THRESHOLD_SECONDS, WEAK_WORD_CONFIDENCE_THRESHOLD
+)
+from output_manager import get_file_id
+
+GOLDEN_FILE = Path(__file__).parent / "golden" / "accuracy.json"
+FIXTURE_DIR = Path(__file__).parent / "golden" / "recordings"
+MEDIA_EXTS = {'.mp4', '.mov', '.mkv', '.wav', '.mp3', '.m4a'}
+# The faster resampler suggested for config.FFMPEG_FAST_RESAMPLER
+FAST_RESAMPLER = "aresample=resampler=swr:filter_size=8:phase_shift=6"
+ACOUSTIC_CHUNK_SECONDS = 30.0
+BATCH_SIZE = 8
+
+app = typer.Typer(help="Check that the performance modes leave the tracked metrics unchanged")
+
+
+@lru_cache(maxsize=None)
+def _whisper(model_size: str = "base", compute_type: str = "int8"):
+    from transcription import load_faster_whisper_model
+    return load_faster_whisper_model(model_size, compute_type=compute_type)
+
+
+@lru_cache(maxsize=None)
+def _smile():
+    from acoustics import create_smile
+    return create_smile()
+
+
+@contextmanager
+def _override(module_name: str, name: str, value):
+    """Temporarily replaces a config value a pipeline module imported by name."""
+    module = importlib.import_module(module_name)
+    previous = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, previous)
+
+
+def _per_file(media_files: List[str], models: Dict[str, Any], cascade: bool = False) -> Dict[str, Dict]:
+    """The production per-file path (articulation.analyze_media) with the given model handles."""
+    from articulation import analyze_media
+
+    results = {}
+    for path in media_files:
+        # analyze_media prints its stage banners; keep the report readable
+        with redirect_stdout(io.StringIO()):
+            results[path] = analyze_media(path, whisper_model=models["whisper"], smile=models["smile"], cascade=cascade, refine_model=models.get("refine"))
+    return results
+
+
+def _batched(media_files: List[str], models: Dict[str, Any]) -> Dict[str, Dict]:
+    """All fixtures transcribed together in Whisper batches, as articulation.py --batch-size does."""
+    from acoustics import evaluate_acoustics
+    from audio_utils import extract_audio_to_wav
+    from transcription import evaluate_transcriptions
+
+    wavs = []
+    try:
+        for path in media_files:
+            wavs.append(extract_audio_to_wav(path))
+        transcriptions = evaluate_transcriptions(
+            wavs, WEAK_WORD_CONFIDENCE_THRESHOLD, PAUSE_THRESHOLD_SECONDS, model=models["whisper"], batch_size=BATCH_SIZE
+        )
+        return {
+            path: {**transcription, **evaluate_acoustics(wav, smile=models["smile"])}
+            for path, wav, transcription in zip(media_files, wavs, transcriptions)
+        }
+    finally:
+        for wav in wavs:
+            if os.path.exists(wav):
+                os.remove(wav)
+
+
+def _fast_resampler(media_files: List[str], models: Dict[str, Any]) -> Dict[str, Dict]:
+    with _override("audio_utils", "FFMPEG_FAST_RESAMPLER", FAST_RESAMPLER):
+        return _per_file(media_files, models)
+
+
+def _acoustic_chunks(media_files: List[str], models: Dict[str, Any]) -> Dict[str, Dict]:
+    with _override("acoustics", "ACOUSTIC_CHUNK_SECONDS", ACOUSTIC_CHUNK_SECONDS):
+        return _per_file(media_files, models)
+
+
+def _transcoded(media_files: List[str]) -> List[str]:
+    """The fixtures ffmpeg decodes; 16 kHz mono WAVs are copied as they are and never resampled."""
+    from audio_utils import is_target_wav
+    return [path for path in media_files if not is_target_wav(path)]
+
+
+class Mode(NamedTuple):
+    description: str
+    # Model handles, loaded before the timed run so load times do not skew the comparison
+    models: Callable[[], Dict[str, Any]]
+    run: Callable[[List[str], Dict[str, Any]], Dict[str, Dict]]
+    # The fixtures the mode can change at all (None = every fixture)
+    applies_to: Optional[Callable[[List[str]], List[str]]] = None
+
+
+BASELINE = Mode(
+    "per file, int8 Whisper 'base', default resampler, one OpenSMILE pass",
+    lambda: {"whisper": _whisper(), "smile": _smile()},
+    _per_file
+)
+MODES: Dict[str, Mode] = {
+    "float32": Mode(
+        "unquantized float32 Whisper (how far the int8 baseline is from full precision)",
+        lambda: {"whisper": _whisper(compute_type="float32"), "smile": _smile()},
+        _per_file
+    ),
+    "fast_resampler": Mode(f"ffmpeg decodes with {FAST_RESAMPLER}", BASELINE.models, _fast_resampler, _transcoded),
+    "acoustic_chunks": Mode(f"OpenSMILE in {ACOUSTIC_CHUNK_SECONDS:g}s chunks", BASELINE.models, _acoustic_chunks),
+    "batched": Mode(f"VAD-chunked batched Whisper (batch size {BATCH_SIZE})", BASELINE.models, _batched),
+    "cascade": Mode(
+        f"'{CASCADE_DRAFT_MODEL}' draft refined by '{CASCADE_REFINE_MODEL}'",
+        lambda: {"whisper": _whisper(CASCADE_DRAFT_MODEL), "refine": _whisper(CASCADE_REFINE_MODEL), "smile": _smile()},
+        lambda media_files, models: _per_file(media_files, models, cascade=True)
+    ),
+}
+
+
+def missing_dependencies() -> Optional[str]:
+    """Why the pipeline cannot run here (None when it can)."""
+    for module in ("faster_whisper", "opensmile"):
+        if importlib.util.find_spec(module) is None:
+            return f"{module} not installed"
+    if shutil.which("ffmpeg") is None:
+        return "ffmpeg binary not on PATH"
+    return None
+
+
+def tracked_metrics(result: Dict[str, Any]) -> Dict[str, float]:
+    """The ACCURACY_TOLERANCES metrics of one pipeline result (lists such as weak_words as counts)."""
+    return {
+        metric: float(len(result[metric])) if isinstance(result[metric], list) else float(result[metric])
+        for metric in ACCURACY_TOLERANCES if result.get(metric) is not None
+    }
+
+
+def allowed_drift(metric: str, reference: float) -> float:
+    absolute, relative = ACCURACY_TOLERANCES[metric]
+    return max(absolute, relative * abs(reference))
+
+
+def drift_rows(reference: Dict[str, Dict], candidate: Dict[str, Dict]) -> List[Dict[str, Any]]:
+    """One row per fixture and metric present in both: the values, their delta and whether it is within tolerance."""
+    rows = []
+    for key, ref in reference.items():
+        if key not in candidate:
+            continue
+        for metric, ref_value in ref["metrics"].items():
+            value = candidate[key]["metrics"].get(metric)
+            if value is None:
+                continue
+            allowed = allowed_drift(metric, ref_value)
+            rows.append({
+                "fixture": ref["name"],
+                "metric": metric,
+                "reference": ref_value,
+                "value": value,
+                "delta": round(value - ref_value, 4),
+                "allowed": round(allowed, 4),
+                "ok": abs(value - ref_value) <= allowed,
+            })
+    return rows
+
+
+def print_drift(title: str, rows: List[Dict[str, Any]]) -> bool:
+    """Prints the worst delta of each metric (and every failing row); returns True if all are within tolerance."""
+    failing = [row for row in rows if not row["ok"]]
+    typer.secho(f"\n{title}: {'OK' if not failing else f'{len(failing)} metric(s) drifted'}", fg=typer.colors.GREEN if not failing else typer.colors.RED, bold=True)
+    for metric in ACCURACY_TOLERANCES:
+        metric_rows = [row for row in rows if row["metric"] == metric]
+        if not metric_rows:
+            continue
+        worst = max(metric_rows, key=lambda row: abs(row["delta"]) / row["allowed"] if row["allowed"] else abs(row["delta"]))
+        typer.secho(
+            f"  {metric:<24} max |delta| {abs(worst['delta']):<8g} allowed {worst['allowed']:<8g} ({worst['fixture']})",
+            fg=typer.colors.GREEN if worst["ok"] else typer.colors.RED
+        )
+    for row in failing:
+        typer.secho(f"    {row['fixture']}: {row['metric']} {row['reference']:g} -> {row['value']:g}", fg=typer.colors.RED)
+    return not failing
+
+
+def fixture_files(fixture_dir: Path) -> List[str]:
+    return sorted(str(f) for f in fixture_dir.iterdir() if f.is_file() and f.suffix.lower() in MEDIA_EXTS)
+
+
+def run_mode(mode: Mode, media_files: List[str]) -> Dict[str, Any]:
+    """{"seconds": wall time of the run, "results": {file_id: {"name", "metrics"}}}."""
+    models = mode.models()
+    start = time.perf_counter()
+    results = mode.run(media_files, models)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 3),
+        "results": {
+            get_file_id(path): {"name": Path(path).name, "metrics": tracked_metrics(result)}
+            for path, result in results.items()
+        },
+    }
+
+
+@app.command()
+def main(
+    fixture_dir: Path = typer.Option(FIXTURE_DIR, "--fixtures", "-f", help="Directory of short real recordings with speech"),
+    modes: List[str] = typer.Option(list(MODES), "--mode", "-m", help=f"Performance mode(s) to check: {', '.join(MODES)}"),
+    golden: Path = typer.Option(GOLDEN_FILE, "--golden", help="Golden baseline outputs to compare the baseline against"),
+    update_golden: bool = typer.Option(False, "--update-golden", help="Save this run's baseline as the new golden outputs"),
+    allow_skip: bool = typer.Option(False, "--allow-skip", help="Exit with 0 instead of failing when the pipeline's dependencies are missing"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Where to save the report (default: bench/results/accuracy-<commit>.json)")
+):
+    """
+    Run the fixtures through the baseline and each performance mode and fail on metric drift.
+    """
+    unknown = [name for name in modes if name not in MODES]
+    if unknown:
+        typer.secho(f"Error: Unknown mode(s) {', '.join(unknown)}. Choose from: {', '.join(MODES)}.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    media_files = fixture_files(fixture_dir) if fixture_dir.is_dir() else []
+    if not media_files:
+        typer.secho(f"Error: No recordings in '{fixture_dir}'. The guard needs a few short real recordings with speech.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    reason = missing_dependencies()
+    if reason is not None:
+        typer.secho(f"Accuracy guard could not run: {reason}.", fg=typer.colors.YELLOW if allow_skip else typer.colors.RED)
+        raise typer.Exit(code=0 if allow_skip else 1)
+
+    report: Dict[str, Any] = {"revision": git_revision(), "date": datetime.now().isoformat(), "tolerances": ACCURACY_TOLERANCES, "modes": {}}
+    passed = True
+    typer.secho(f"Running baseline ({BASELINE.description}) on {len(media_files)} fixture(s)...", fg=typer.colors.BLUE)
+    baseline = run_mode(BASELINE, media_files)
+    report["baseline"] = baseline
+
+    silent = [result["name"] for result in baseline["results"].values() if not result["metrics"].get("word_count")]
+    if silent:
+        typer.secho(f"\nNo words transcribed in: {', '.join(silent)}.", fg=typer.colors.YELLOW)
+    if len(silent) == len(baseline["results"]):
+        typer.secho("No fixture has speech, so the transcription metrics are unguarded.", fg=typer.colors.RED)
+        passed = False
+
+    if not update_golden:
+        if golden.exists():
+            with open(golden, "r", encoding="utf-8") as f:
+                golden_results = json.load(f)["results"]
+        else:
+            golden_results = {}
+        unrecorded = [result["name"] for key, result in baseline["results"].items() if key not in golden_results]
+        if unrecorded:
+            typer.secho(f"\nNo golden outputs in {golden} for: {', '.join(unrecorded)}. Record them with --update-golden.", fg=typer.colors.RED)
+            passed = False
+        rows = drift_rows(golden_results, baseline["results"])
+        report["golden_drift"] = rows
+        if rows:
+            passed &= print_drift(f"baseline vs golden ({golden})", rows)
+
+    for name in dict.fromkeys(modes):
+        mode = MODES[name]
+        mode_files = mode.applies_to(media_files) if mode.applies_to is not None else media_files
+        if not mode_files:
+            typer.secho(f"\n{name} cannot change any fixture, so it is unguarded. Add recordings it applies to (e.g. m4a or 44.1 kHz audio for fast_resampler).", fg=typer.colors.RED)
+            report["modes"][name] = {"error": "no applicable fixtures"}
+            passed = False
+            continue
+        typer.secho(f"\nRunning {name} ({mode.description}) on {len(mode_files)} fixture(s)...", fg=typer.colors.BLUE)
+        try:
+            run = run_mode(mode, mode_files)
+        except Exception as e:
+            typer.secho(f"  {name} failed: {e}", fg=typer.colors.RED)
+            report["modes"][name] = {"error": str(e)}
+            passed = False
+            continue
+        run["drift"] = drift_rows(baseline["results"], run["results"])
+        run["speedup"] = round(baseline["seconds"] / run["seconds"], 3) if run["seconds"] else None
+        report["modes"][name] = run
+        passed &= print_drift(f"{name} vs baseline ({baseline['seconds']:.1f}s -> {run['seconds']:.1f}s)", run["drift"])
+
+    # Outputs without any words would only pin the acoustic metrics, so they are never recorded
+    if update_golden and len(silent) < len(baseline["results"]):
+        golden.parent.mkdir(parents=True, exist_ok=True)
+        with open(golden, "w", encoding="utf-8") as f:
+            json.dump({"revision": report["revision"], "date": report["date"], "results": baseline["results"]}, f, indent=2)
+        typer.secho(f"\nSaved golden baseline outputs to {golden}", fg=typer.colors.GREEN)
+
+    output = output or RESULTS_DIR / f"accuracy-{report['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    typer.secho(f"Saved report to {output}", fg=typer.colors.GREEN)
+
+    if not passed:
+        typer.secho("Accuracy guard failed (see above).", fg=typer.colors.RED, bold=True)
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,166 @@
+"""
+Deterministic synthetic fixtures for the benchmark suite.
+
+Everything here is generated from a fixed seed so two runs (or two commits)
+benchmark exactly the same inputs, and nothing requires network access or
+real recordings.
+"""
+import json
+import wave
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_SEED = 1234
+
+VOCABULARY = [
+    "today", "we", "are", "going", "to", "talk", "about", "the", "project", "and",
+    "how", "it", "works", "this", "is", "important", "because", "our", "team", "needs",
+    "clear", "speech", "practice", "every", "morning", "with", "short", "recordings",
+    "articulation", "improves", "when", "you", "open", "your", "jaw", "slowly",
+]
+FILLERS = ["um", "uh", "like", "so", "basically", "actually", "you know", "i mean"]
+
+
+def synth_speech_like(duration_sec: float, sample_rate: int = 16000, seed: int = DEFAULT_SEED) -> np.ndarray:
+    """
+    Generates a speech-like float32 signal in [-1, 1]: voiced "syllables" (harmonic tones with
+    pitch drift and formant-ish weighting), short noise bursts standing in for fricatives,
+    and silences of varying length standing in for pauses.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration_sec * sample_rate)
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    while pos < total:
+        kind = rng.random()
+        if kind < 0.65:
+            # Voiced syllable: 120-220 ms harmonic tone with an envelope
+            n = int(rng.uniform(0.12, 0.22) * sample_rate)
+            t = np.arange(n) / sample_rate
+            f0 = rng.uniform(95, 180) * (1 + 0.05 * np.sin(2 * np.pi * 3 * t))
+            phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+            f1, f2 = rng.uniform(300, 800), rng.uniform(900, 2300)
+            seg = np.zeros(n)
+            for h in range(1, 12):
+                freq = h * f0.mean()
+                weight = np.exp(-((freq - f1) / 250) ** 2) + 0.6 * np.exp(-((freq - f2) / 350) ** 2) + 0.05
+                seg += weight * np.sin(h * phase)
+            seg *= np.hanning(n)
+        elif kind < 0.8:
+            # Unvoiced burst (fricative-like noise)
+            n = int(rng.uniform(0.04, 0.1) * sample_rate)
+            seg = rng.normal(0, 0.3, n) * np.hanning(n)
+        else:
+            # Pause: mostly short gaps, occasionally long ones beyond the pause threshold
+            n = int((rng.uniform(0.05, 0.3) if rng.random() < 0.7 else rng.uniform(0.4, 1.2)) * sample_rate)
+            seg = rng.normal(0, 0.002, n)
+        end = min(total, pos + n)
+        out[pos:end] = seg[: end - pos]
+        pos = end
+    peak = np.max(np.abs(out)) or 1.0
+    return (out / peak * 0.8).astype(np.float32)
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = 16000, channels: int = 1):
+    """Writes float samples in [-1, 1] as 16-bit PCM, duplicating the signal across `channels`."""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1).reshape(-1)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+
+def make_wav(path: str, duration_sec: float, sample_rate: int = 16000, channels: int = 1, seed: int = DEFAULT_SEED) -> str:
+    write_wav(path, synth_speech_like(duration_sec, sample_rate, seed), sample_rate, channels)
+    return path
+
+
+def make_word_timeline(word_count: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """Synthetic faster-whisper style word list: word/start/end/probability with realistic gaps."""
+    rng = np.random.default_rng(seed)
+    words = []
+    t = 0.0
+    for _ in range(word_count):
+        if rng.random() < 0.06:
+            word = FILLERS[rng.integers(len(FILLERS))]
+        else:
+            word = VOCABULARY[rng.integers(len(VOCABULARY))]
+        duration = rng.uniform(0.12, 0.5)
+        words.append({
+            "word": word,
+            "start": round(t, 3),
+            "end": round(t + duration, 3),
+            "probability": float(np.clip(rng.beta(8, 1.5), 0, 1)),
+        })
+        gap = rng.uniform(0.0, 0.15) if rng.random() < 0.88 else rng.uniform(0.4, 1.5)
+        t += duration + gap
+    return words
+
+
+def make_text(word_count: int, seed: int = DEFAULT_SEED) -> str:
+    """Synthetic transcript text with sentence breaks and a realistic share of filler words."""
+    words = [w["word"] for w in make_word_timeline(word_count, seed)]
+    sentences = []
+    for i in range(0, len(words), 14):
+        chunk = words[i:i + 14]
+        sentences.append(" ".join(chunk).capitalize() + ".")
+    return "\n".join(sentences)
+
+
+class StubWhisperModel:
+    """
+    Offline stand-in for faster_whisper.WhisperModel: `transcribe` returns a fixed synthetic
+    word timeline shaped like real segments, so the pause/weak-word logic can be benchmarked
+    without model weights.
+    """
+
+    def __init__(self, word_count: int, seed: int = DEFAULT_SEED, words_per_segment: int = 12):
+        self.words = make_word_timeline(word_count, seed)
+        self.words_per_segment = words_per_segment
+
+    def transcribe(self, audio_path, **kwargs):
+        def segments():
+            for i in range(0, len(self.words), self.words_per_segment):
+                chunk = self.words[i:i + self.words_per_segment]
+                yield SimpleNamespace(
+                    start=chunk[0]["start"],
+                    end=chunk[-1]["end"],
+                    text=" " + " ".join(w["word"] for w in chunk),
+                    words=[SimpleNamespace(word=" " + w["word"], start=w["start"], end=w["end"], probability=w["probability"]) for w in chunk],
+                )
+        duration = self.words[-1]["end"] if self.words else 0.0
+        return segments(), SimpleNamespace(language="en", duration=duration)
+
+
+def make_history(path: str, entry_count: int, words_per_entry: int = 300, seed: int = DEFAULT_SEED) -> str:
+    """Writes a metrics_history.json-shaped file with `entry_count` synthetic articulation entries."""
+    rng = np.random.default_rng(seed)
+    base_date = datetime(2025, 1, 1)
+    history = []
+    for i in range(entry_count):
+        words = make_word_timeline(words_per_entry, seed + i)
+        history.append({
+            "date": (base_date + timedelta(days=i)).isoformat(),
+            "source_file": f"synthetic_{i:05d}.m4a",
+            "file_id": f"{i:032x}",
+            "metrics": {
+                "text": " ".join(w["word"] for w in words),
+                "word_count": len(words),
+                "weak_words": [w for w in words if w["probability"] < 0.7],
+                "pause_count": int(rng.integers(5, 60)),
+                "avg_pause_duration_sec": round(float(rng.uniform(0.4, 1.2)), 3),
+                "speech_rate_sps": round(float(rng.uniform(2.5, 5.5)), 2),
+                "f1_variance_sd": round(float(rng.uniform(80, 200)), 2),
+                "f2_variance_sd": round(float(rng.uniform(150, 400)), 2),
+                "mean_hnr": round(float(rng.uniform(2, 12)), 2),
+            },
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    return path
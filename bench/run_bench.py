@@ -0,0 +1,284 @@
+"""
+Reproducible benchmark suite for the analysis pipeline.
+
+    python -m bench.run_bench                      # run everything, save bench/results/<commit>.json
+    python -m bench.run_bench --quick              # smaller sizes for a fast sanity pass
+    python -m bench.run_bench --compare bench/results/abc1234.json
+
+Runs fully offline: Whisper is replaced by a stub model and all audio/text/history
+fixtures are synthesized deterministically. Benchmarks whose optional dependency
+(ffmpeg binary, opensmile, NLTK data) is unavailable are recorded as skipped.
+"""
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import typer
+
+from bench import fixtures
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# A benchmark regresses when its median is this much slower than the baseline
+REGRESSION_TOLERANCE = 0.15
+
+app = typer.Typer(help="Offline benchmark suite for the analysis pipeline")
+
+
+def time_call(fn: Callable[[], object], repeats: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Runs fn `repeats` times (calling setup before each run, untimed) and returns timing stats in seconds."""
+    samples = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "min_sec": round(min(samples), 6),
+        "median_sec": round(statistics.median(samples), 6),
+        "max_sec": round(max(samples), 6),
+        "repeats": repeats,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def skipped(reason: str) -> Dict[str, str]:
+    return {"skipped": reason}
+
+
+def bench_extract_audio(workdir: str, durations: List[float], repeats: int) -> Dict[str, Dict]:
+    if shutil.which("ffmpeg") is None or importlib.util.find_spec("ffmpeg") is None:
+        return {"extract_audio_to_wav": skipped("ffmpeg binary or ffmpeg-python not available")}
+    from audio_utils import extract_audio_to_wav
+
+    results = {}
+    for duration in durations:
+        # 44.1 kHz stereo input so ffmpeg has to resample and downmix, like a phone recording
+        src = fixtures.make_wav(os.path.join(workdir, f"src_{int(duration)}s.wav"), duration, sample_rate=44100, channels=2)
+        produced = []
+
+        def run():
+            produced.append(extract_audio_to_wav(src))
+
+        results[f"extract_audio_to_wav[{int(duration)}s]"] = time_call(run, repeats)
+        for path in produced:
+            if os.path.exists(path):
+                os.remove(path)
+    return results
+
+
+def bench_acoustics(workdir: str, durations: List[float], repeats: int) -> Dict[str, Dict]:
+    if importlib.util.find_spec("opensmile") is None:
+        return {"evaluate_acoustics": skipped("opensmile not installed")}
+    from acoustics import create_smile, evaluate_acoustics
+
+    smile = create_smile()
+    results = {}
+    for duration in durations:
+        wav = fixtures.make_wav(os.path.join(workdir, f"mono_{int(duration)}s.wav"), duration)
+        results[f"evaluate_acoustics[{int(duration)}s]"] = time_call(lambda: evaluate_acoustics(wav, smile=smile), repeats)
+    return results
+
+
+def bench_transcription_logic(word_counts: List[int], repeats: int) -> Dict[str, Dict]:
+    from config import WEAK_WORD_CONFIDENCE_THRESHOLD, PAUSE_THRESHOLD_SECONDS
+    from transcription import evaluate_transcription
+
+    results = {}
+    for count in word_counts:
+        model = fixtures.StubWhisperModel(count)
+        results[f"evaluate_transcription[stub,{count}w]"] = time_call(
+            lambda: evaluate_transcription("stub.wav", WEAK_WORD_CONFIDENCE_THRESHOLD, PAUSE_THRESHOLD_SECONDS, model=model),
+            repeats
+        )
+    return results
+
+
+def bench_speech_analysis(word_counts: List[int], repeats: int) -> Dict[str, Dict]:
+    try:
+        import nltk
+        nltk.data.find("tokenizers/punkt")
+        nltk.data.find("corpora/stopwords")
+        from speech_analysis import perform_speech_analysis
+    except LookupError:
+        return {"perform_speech_analysis": skipped("NLTK punkt/stopwords data not downloaded")}
+    except ImportError as e:
+        return {"perform_speech_analysis": skipped(f"speech_analysis dependencies missing ({e})")}
+
+    results = {}
+    for count in word_counts:
+        text = fixtures.make_text(count)
+        results[f"perform_speech_analysis[{count}w]"] = time_call(lambda: perform_speech_analysis(text), repeats)
+    return results
+
+
+def bench_append_to_metrics(workdir: str, history_sizes: List[int], repeats: int) -> Dict[str, Dict]:
+    from output_manager import append_to_metrics
+
+    metrics = {"word_count": 300, "speech_rate_sps": 4.2, "weak_words": fixtures.make_word_timeline(40)}
+    results = {}
+    for size in history_sizes:
+        template = fixtures.make_history(os.path.join(workdir, f"history_template_{size}.json"), size)
+        target = os.path.join(workdir, f"history_{size}.json")
+
+        def reset():
+            shutil.copyfile(template, target)
+
+        def run():
+            # append_to_metrics prints a status line; keep benchmark output clean
+            with redirect_stdout(io.StringIO()):
+                append_to_metrics(target, "bench.m4a", "0" * 32, metrics)
+
+        results[f"append_to_metrics[{size} entries]"] = time_call(run, repeats, setup=reset)
+    return results
+
+
+# CPU-bound stand-in for one analysis job: BLAS matmuls (NumPy's pool) plus pure-Python work
+_SPLIT_WORKLOAD = """
+import numpy as np
+rng = np.random.default_rng(0)
+a = rng.random((SIZE, SIZE))
+for _ in range(ROUNDS):
+    a = np.tanh(a @ a / SIZE)
+"""
+
+
+def _run_split(jobs: int, threads: int, size: int, rounds: int) -> float:
+    """Runs `jobs` workload processes concurrently with `threads` BLAS threads each; returns wall seconds."""
+    from thread_budget import BLAS_ENV_VARS
+
+    env = dict(os.environ, **{var: str(threads) for var in BLAS_ENV_VARS})
+    code = _SPLIT_WORKLOAD.replace("SIZE", str(size)).replace("ROUNDS", str(rounds))
+    start = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, "-c", code], env=env) for _ in range(jobs)]
+    for proc in procs:
+        proc.wait()
+    return time.perf_counter() - start
+
+
+def bench_thread_splits(quick: bool) -> Dict[str, Dict]:
+    """
+    Throughput (jobs per second) of concurrent jobs under different worker x thread splits:
+    the thread_budget split (cores // jobs each) against every job using all cores.
+    """
+    from thread_budget import available_cores
+
+    cores = available_cores()
+    size, rounds = (256, 10) if quick else (512, 20)
+    job_counts = sorted({1, 2, cores} | ({cores // 2} if cores >= 4 else set()))
+    results = {}
+    for jobs in job_counts:
+        splits = {"budgeted": max(1, cores // jobs)}
+        if jobs > 1 and cores > 1:
+            splits["oversubscribed"] = cores
+        for label, threads in splits.items():
+            wall = _run_split(jobs, threads, size, rounds)
+            results[f"thread_split[{jobs}x{threads},{label}]"] = {
+                "wall_sec": round(wall, 4),
+                "jobs_per_sec": round(jobs / wall, 4),
+                "cores": cores,
+            }
+    return results
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Prints a comparison table and returns the names of benchmarks that regressed."""
+    regressions = []
+    typer.secho(f"\nComparison vs {baseline.get('revision', '?')} (tolerance {tolerance:.0%}):", bold=True)
+    for name, stats in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or "median_sec" not in base or "median_sec" not in stats:
+            continue
+        ratio = stats["median_sec"] / base["median_sec"] if base["median_sec"] else float("inf")
+        color = typer.colors.GREEN
+        if ratio > 1 + tolerance:
+            color = typer.colors.RED
+            regressions.append(name)
+        typer.secho(f"  {name:<45} {base['median_sec']:.4f}s -> {stats['median_sec']:.4f}s  (x{ratio:.2f})", fg=color)
+    return regressions
+
+
+@app.command()
+def main(
+    quick: bool = typer.Option(False, "--quick", help="Use small fixture sizes and fewer repeats"),
+    repeats: int = typer.Option(5, "--repeats", "-r", help="Timed runs per benchmark"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Where to save results (default: bench/results/<commit>.json)"),
+    baseline: Optional[Path] = typer.Option(None, "--compare", "-c", help="Previous results file to compare against"),
+    fail_on_regression: bool = typer.Option(False, "--fail-on-regression", help="Exit with code 1 if any benchmark regressed")
+):
+    """
+    Run the benchmark suite and save results for regression comparison between commits.
+    """
+    if quick:
+        durations, word_counts, history_sizes, repeats = [10.0, 60.0], [200, 2000], [10, 100], min(repeats, 3)
+    else:
+        durations, word_counts, history_sizes = [30.0, 120.0, 600.0], [200, 2000, 20000], [10, 100, 1000]
+
+    benchmarks: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        for label, run in [
+            ("audio extraction", lambda: bench_extract_audio(workdir, durations, repeats)),
+            ("acoustics", lambda: bench_acoustics(workdir, durations, repeats)),
+            ("transcription logic", lambda: bench_transcription_logic(word_counts, repeats)),
+            ("speech analysis", lambda: bench_speech_analysis(word_counts, repeats)),
+            ("history append", lambda: bench_append_to_metrics(workdir, history_sizes, repeats)),
+            ("thread splits", lambda: bench_thread_splits(quick)),
+        ]:
+            typer.secho(f"Benchmarking {label}...", fg=typer.colors.BLUE)
+            benchmarks.update(run())
+
+    revision = git_revision()
+    results = {
+        "revision": revision,
+        "date": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+        "benchmarks": benchmarks,
+    }
+
+    typer.secho("\n--- BENCHMARK RESULTS ---", bold=True)
+    for name, stats in benchmarks.items():
+        if "skipped" in stats:
+            typer.secho(f"  {name:<45} skipped ({stats['skipped']})", fg=typer.colors.YELLOW)
+        elif "jobs_per_sec" in stats:
+            typer.echo(f"  {name:<45} {stats['jobs_per_sec']:.3f} jobs/s  ({stats['wall_sec']:.2f}s on {stats['cores']} cores)")
+        else:
+            typer.echo(f"  {name:<45} median {stats['median_sec']:.4f}s  (min {stats['min_sec']:.4f}s)")
+
+    output = output or RESULTS_DIR / f"{revision}{'-quick' if quick else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    typer.secho(f"\nSaved results to {output}", fg=typer.colors.GREEN)
+
+    if baseline is not None:
+        with open(baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        if regressions and fail_on_regression:
+            typer.secho(f"{len(regressions)} benchmark(s) regressed.", fg=typer.colors.RED, bold=True)
+            raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,81 @@
+import threading
+import time
+import weakref
+from typing import Optional
+
+from config import JOB_TIMEOUT_BASE_SECONDS, JOB_TIMEOUT_REALTIME_FACTOR
+
+# Every live token, so a shutting-down watcher or daemon can stop the jobs still running
+_tokens: "weakref.WeakSet[CancelToken]" = weakref.WeakSet()
+_tokens_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised inside a pipeline at its next checkpoint after its CancelToken was cancelled."""
+
+
+class JobTimedOut(JobCancelled):
+    """Raised inside a pipeline that ran past its timeout budget."""
+
+
+def timeout_budget(audio_seconds: Optional[float]) -> Optional[float]:
+    """Seconds one file may take: JOB_TIMEOUT_BASE_SECONDS + JOB_TIMEOUT_REALTIME_FACTOR x its audio (None = no limit)."""
+    if not JOB_TIMEOUT_REALTIME_FACTOR or not audio_seconds:
+        return None
+    return JOB_TIMEOUT_BASE_SECONDS + JOB_TIMEOUT_REALTIME_FACTOR * audio_seconds
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for one analysis job. The pipeline calls `check()` between units
+    of work (Whisper segments, ffmpeg progress updates, acoustic chunks, stages), which raises
+    JobCancelled once `cancel()` was called from any thread, or JobTimedOut once the job has
+    run past the budget set by `set_budget()`. The exception unwinds through the pipeline's own
+    cleanup, so temp files are removed, ffmpeg is killed and model locks are released at once.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.deadline: Optional[float] = None
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        with _tokens_lock:
+            _tokens.add(self)
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def restart_clock(self):
+        """Counts the timeout budget from now, for a job that first queued for a shared model."""
+        self.started = time.monotonic()
+
+    def set_budget(self, audio_seconds: Optional[float]):
+        """Starts the timeout once the audio duration is known; the budget counts from job start."""
+        budget = timeout_budget(audio_seconds)
+        self.deadline = self.started + budget if budget is not None else None
+
+    def check(self):
+        if self._event.is_set():
+            raise JobCancelled(f"Analysis {self.reason}")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise JobTimedOut(f"Analysis timed out after {time.monotonic() - self.started:.0f}s")
+
+
+def check_cancelled(cancel: Optional[CancelToken]):
+    """`cancel.check()` - a no-op for pipelines run without a token."""
+    if cancel is not None:
+        cancel.check()
+
+
+def cancel_all(reason: str = "stopped"):
+    """Cancels every job of this process that is still running (on watcher / daemon shutdown)."""
+    with _tokens_lock:
+        tokens = list(_tokens)
+    for token in tokens:
+        token.cancel(reason)
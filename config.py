@@ -8,3 +8,157 @@ PAUSE_THRESHOLD_SECONDS = 0.4
 
 # Expected sample rate for output wav files (opensmile standard)
 TARGET_SAMPLE_RATE = 16000
+
+# Local analysis daemon (daemon.py) - bound to loopback only
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+
+# Watch-folder ingestion (watcher.py)
+WATCH_SETTLE_SECONDS = 2.0        # file size/mtime must be stable this long before analysis
+WATCH_POLL_INTERVAL_SECONDS = 1.0 # polling fallback interval / inotify read timeout
+WATCH_MAX_WORKERS = 1             # concurrent analyses (each in-process job holds its own models)
+
+# Per-stage instrumentation (instrumentation.py), written as JSON lines when --timings is passed.
+# The Streamlit app appends them too only with APP_TIMINGS_LOG, so the file never grows unasked.
+TIMINGS_LOG_FILE = "pipeline_timings.jsonl"
+APP_TIMINGS_LOG = False
+
+# Prometheus metrics exporter (metrics_exporter.py). Set a port to expose /metrics from the Streamlit app.
+APP_METRICS_PORT = None
+
+# Columnar word timeline sidecars (word_timeline.py), relative to the history file's directory
+WORD_TIMELINE_DIR = "word_timelines"
+
+# Pause sensitivity report: pause counts at each threshold, and gap histogram bin edges (seconds)
+PAUSE_SENSITIVITY_THRESHOLDS = (0.2, 0.4, 0.8)
+PAUSE_HISTOGRAM_EDGES = (0.2, 0.4, 0.8, 1.5, 3.0)
+
+# Windowed metrics timeline (metrics_timeline.py, --windowed)
+WINDOW_SECONDS = 60.0
+WINDOW_STEP_SECONDS = 15.0
+
+# Persistent per-word syllable memo shared by speech rate and readability (syllable_service.py)
+SYLLABLE_CACHE_FILE = "syllable_cache.json"
+
+# Batch scheduling (scheduler.py, --schedule): the order in which a batch run analyzes its files.
+#   "shortest" - shortest recordings first, so short daily clips never wait behind a long one
+#   "oldest"   - by modification time, oldest first
+#   "priority" - files tagged "[tag]" in their name by SCHEDULE_PRIORITY_TAGS rank (lower
+#                first, untagged last), shortest first within a rank
+#   "name"     - alphabetical
+# Durations come from ffprobe and are cached in MEDIA_DURATION_CACHE_FILE by path, size and mtime.
+SCHEDULE_POLICY = "shortest"
+SCHEDULE_PRIORITY_TAGS = {"urgent": 0, "daily": 1}
+MEDIA_DURATION_CACHE_FILE = "media_durations.json"
+# Completion estimates: processing seconds per second of audio (the median real_time_factor of
+# the recent TIMINGS_LOG_FILE lines, or SCHEDULE_DEFAULT_RTF before any were logged) plus a
+# fixed cost per file
+SCHEDULE_DEFAULT_RTF = 0.5
+SCHEDULE_FILE_OVERHEAD_SECONDS = 3.0
+
+# Parallel text-only batches in speech_analysis.py (--jobs); None uses every CPU core
+TEXT_BATCH_JOBS = None
+
+# Rolling trend statistics (trends.py), updated on every history append
+TREND_METRICS = (
+    "speech_rate_sps", "pause_count", "avg_pause_duration_sec", "mean_hnr",
+    "f1_variance_sd", "f2_variance_sd",
+    "statistics.filler_word_percentage", "readability.score",
+)
+TREND_TOP_N = 10
+
+# LLM payload builder (llm_payload.py)
+LLM_TOKEN_BUDGET = 3000
+LLM_MAX_SESSIONS = 7
+LLM_CHARS_PER_TOKEN = 4
+
+# Thread budgeting (thread_budget.py): cores are split evenly between concurrent jobs and
+# applied to WhisperModel(cpu_threads), ffmpeg -threads, torch and the BLAS/OpenMP pools.
+CPU_CORES = None       # None = detect (respects CPU affinity)
+THREADS_PER_JOB = None # None = CPU_CORES // concurrent jobs
+
+# ffmpeg resampling filter for decodes (audio_utils.py). None keeps ffmpeg's default resampler;
+# e.g. "aresample=resampler=swr:filter_size=8:phase_shift=6" is faster but slightly alters
+# spectral metrics such as HNR, so it is off by default to keep history entries comparable.
+FFMPEG_FAST_RESAMPLER = None
+
+# Resumable batches (batch_manifest.py): each history file gets a manifest next to it
+# (metrics_history.json -> metrics_history.batch.json) and a checkpoint folder under this
+# directory for finished-stage outputs (decoded WAV, transcription); used by --resume
+BATCH_CHECKPOINT_DIR = "batch_checkpoints"
+
+# Batched Whisper inference over many short clips (transcription.evaluate_transcriptions,
+# articulation.py --batch-size). VAD chunks are at most WHISPER_BATCH_CHUNK_SECONDS (Whisper's
+# window); clips are loaded and transcribed in groups of about WHISPER_BATCH_GROUP_SECONDS of
+# audio to bound memory. Batched chunks are decoded without the previous chunk's text as
+# context, so transcripts can differ slightly from per-file runs; off (None) by default.
+WHISPER_BATCH_SIZE = None
+WHISPER_BATCH_CHUNK_SECONDS = 30.0
+WHISPER_BATCH_GROUP_SECONDS = 600.0
+
+# Draft/refine transcription cascade (transcription.evaluate_transcription_cascade, --cascade):
+# the draft model transcribes everything, the refine model re-transcribes only the spans
+# around weak words (CASCADE_CONTEXT_WORDS draft words either side, merged when closer than
+# CASCADE_MERGE_GAP_SECONDS, at most CASCADE_MAX_SPAN_SECONDS per span)
+CASCADE_DRAFT_MODEL = "tiny"
+CASCADE_REFINE_MODEL = "large-v3"
+CASCADE_CONTEXT_WORDS = 2
+CASCADE_MERGE_GAP_SECONDS = 2.0
+CASCADE_MAX_SPAN_SECONDS = 30.0
+
+# History appends stream the existing file into the replacement in chunks of this size
+HISTORY_COPY_CHUNK_BYTES = 1 << 20
+
+# History compaction (history_compaction.py): bulky metrics fields are moved into
+# content-addressed, compressed blobs (zstd if `zstandard` is installed, else gzip) under
+# HISTORY_BLOB_DIR next to the history, and referenced by hash. Fields smaller than
+# HISTORY_BLOB_MIN_BYTES stay inline. With HISTORY_EXTERNALIZE_ON_WRITE new entries are written
+# slim straight away; off by default so the history stays self-contained for copy/paste use.
+# Blobs and archive segments are part of the history: commit them along with a tracked history.
+HISTORY_BLOB_DIR = "history_blobs"
+HISTORY_BLOB_FIELDS = ("text", "transcript", "weak_words", "word_frequency")
+HISTORY_BLOB_MIN_BYTES = 256
+HISTORY_EXTERNALIZE_ON_WRITE = False
+
+# Job timeouts (cancellation.py): one file's analysis is aborted once it has run longer than
+# JOB_TIMEOUT_BASE_SECONDS + JOB_TIMEOUT_REALTIME_FACTOR x its audio duration (a factor of 0
+# never times out). Aborted jobs kill ffmpeg, delete their temp audio and free the model locks.
+JOB_TIMEOUT_BASE_SECONDS = 300
+JOB_TIMEOUT_REALTIME_FACTOR = 5.0
+
+# OpenSMILE runs over the whole file in one call, which cannot be interrupted. With
+# ACOUSTIC_CHUNK_SECONDS > 0 it runs in chunks of that length (padded by
+# ACOUSTIC_CHUNK_OVERLAP_SECONDS either side, trimmed afterwards) and cancellation is checked
+# between chunks. Off by default: frames at chunk edges can differ slightly from one pass.
+ACOUSTIC_CHUNK_SECONDS = 0
+ACOUSTIC_CHUNK_OVERLAP_SECONDS = 1.0
+
+# Distributed batches (job_queue.py, --queue DIR): nodes sharing DIR (e.g. over NFS) claim files
+# with leases they renew every JOB_LEASE_SECONDS / 4; a claim left without a heartbeat for
+# JOB_LEASE_SECONDS (its node died) is taken over. A file is retried up to JOB_MAX_ATTEMPTS times
+# across all nodes. Nodes waiting on other nodes' claims re-check every JOB_QUEUE_POLL_SECONDS.
+JOB_LEASE_SECONDS = 120
+JOB_MAX_ATTEMPTS = 3
+JOB_QUEUE_POLL_SECONDS = 15
+# History appends hold a lease on <history>.lock, so processes and machines sharing a history
+# file never interleave their read-modify-write cycles (also outside --queue: the app, a CLI and
+# compaction can write the same history). Uncontended, the lease costs a few file operations per
+# append (well under a millisecond locally, a few round trips on NFS). A writer that finds the
+# lease held re-checks every HISTORY_LOCK_POLL_SECONDS, and a crashed holder blocks appends for
+# up to HISTORY_LOCK_LEASE_SECONDS before its lease is broken.
+HISTORY_LOCK_LEASE_SECONDS = 30
+HISTORY_LOCK_POLL_SECONDS = 0.05
+
+# Accuracy guard (bench/accuracy_guard.py): how far a performance mode (or the baseline against
+# its golden outputs) may move each tracked metric of a fixture, as (absolute, relative). A
+# delta within either bound passes; weak_words is compared as a count.
+ACCURACY_TOLERANCES = {
+    "speech_rate_sps": (0.1, 0.03),
+    "pause_count": (1, 0.05),
+    "avg_pause_duration_sec": (0.05, 0.05),
+    "weak_words": (2, 0.10),
+    "word_count": (2, 0.03),
+    "f1_variance_sd": (2.0, 0.02),
+    "f2_variance_sd": (3.0, 0.02),
+    "mean_hnr": (0.2, 0.03),
+}
@@ -0,0 +1,270 @@
+import json
+import logging
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import typer
+
+import syllable_service
+import thread_budget
+from config import DAEMON_HOST, DAEMON_PORT
+from cancellation import CancelToken, cancel_all
+from instrumentation import PipelineTimer, ProgressCallback, optional_stage
+
+logger = logging.getLogger(__name__)
+
+# Short timeout for the liveness probe so CLIs fall back to in-process quickly
+HEALTH_TIMEOUT_SECONDS = 0.3
+
+
+class WarmResources:
+    """
+    Holds the expensive handles (faster-whisper, OpenSMILE, openai-whisper, NLTK data)
+    for the lifetime of the daemon (or of the app, or of one articulation CLI run). Each
+    pipeline gets its own lock because the underlying models are not guaranteed to be thread-safe.
+    """
+
+    def __init__(self, speech_model_size: str = "base"):
+        self.articulation_lock = threading.Lock()
+        self.speech_lock = threading.Lock()
+        self.faster_whisper_model = None
+        self.smile = None
+        self.speech_models: Dict[str, Any] = {}
+        self.cascade_models = None
+        self.default_speech_model = speech_model_size
+
+    def warm_up(self):
+        from speech_analysis import setup_nltk
+
+        self.warm_articulation()
+        setup_nltk()
+        self.get_speech_model(self.default_speech_model)
+        logger.info("Daemon resources warm.")
+
+    def warm_articulation(self):
+        """Loads only the articulation handles (the Streamlit app warms just these)."""
+        with self.articulation_lock:
+            self._load_articulation(cascade=False)
+
+    def _articulation_warm(self, cascade: bool) -> bool:
+        return self.smile is not None and (self.cascade_models if cascade else self.faster_whisper_model) is not None
+
+    def _load_articulation(self, cascade: bool):
+        """Loads the handles an articulation run needs that are not warm yet (articulation_lock held)."""
+        from transcription import load_faster_whisper_model
+        from acoustics import create_smile
+
+        if cascade:
+            self.get_cascade_models()
+        elif self.faster_whisper_model is None:
+            self.faster_whisper_model = load_faster_whisper_model()
+        if self.smile is None:
+            self.smile = create_smile()
+
+    def get_speech_model(self, model_size: str):
+        if model_size not in self.speech_models:
+            from speech_analysis import load_whisper_model
+            self.speech_models[model_size] = load_whisper_model(model_size)
+        return self.speech_models[model_size]
+
+    def get_cascade_models(self):
+        """Draft and refine faster-whisper models for --cascade requests, loaded on first use."""
+        if self.cascade_models is None:
+            from transcription import load_faster_whisper_model
+            from config import CASCADE_DRAFT_MODEL, CASCADE_REFINE_MODEL
+            self.cascade_models = (load_faster_whisper_model(CASCADE_DRAFT_MODEL), load_faster_whisper_model(CASCADE_REFINE_MODEL))
+        return self.cascade_models
+
+    def run_articulation(self, payload: Dict[str, Any], timer: PipelineTimer, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        from batch_manifest import FileCheckpoint
+
+        # A batch client hands over its checkpoint directory so stage outputs survive a crash
+        checkpoint = FileCheckpoint(payload["checkpoint_dir"]) if payload.get("checkpoint_dir") else None
+        return self.analyze_media(
+            payload["path"], timer=timer, windowed=payload.get("windowed", False),
+            start=payload.get("start"), end=payload.get("end"), checkpoint=checkpoint,
+            cascade=payload.get("cascade", False), progress=progress
+        )
+
+    def analyze_media(self, media_path: str, timer: Optional[PipelineTimer] = None, progress: Optional[ProgressCallback] = None, cascade: bool = False, cancel: Optional[CancelToken] = None, **kwargs) -> Dict[str, Any]:
+        """
+        articulation.analyze_media with the warm handles (loaded on first use), one file at a
+        time. The timeout budget of `cancel` (a new token when None) starts once the lock is held.
+        """
+        from articulation import analyze_media
+
+        with self.articulation_lock:
+            # The timeout budget runs from here; time spent queued behind other files does not count
+            if cancel is None:
+                cancel = CancelToken()
+            else:
+                cancel.restart_clock()
+            if not self._articulation_warm(cascade):
+                with optional_stage(timer, "model_load", progress):
+                    self._load_articulation(cascade)
+            whisper_model, refine_model = self.cascade_models if cascade else (self.faster_whisper_model, None)
+            return analyze_media(
+                media_path, whisper_model=whisper_model, smile=self.smile, timer=timer,
+                cascade=cascade, refine_model=refine_model, progress=progress, cancel=cancel, **kwargs
+            )
+
+    def run_speech_analysis(self, payload: Dict[str, Any], timer: PipelineTimer) -> Dict[str, Any]:
+        from speech_analysis import process_and_analyze_file
+        from batch_manifest import FileCheckpoint
+
+        checkpoint = FileCheckpoint(payload["checkpoint_dir"]) if payload.get("checkpoint_dir") else None
+        with self.speech_lock:
+            model = self.get_speech_model(payload.get("model", self.default_speech_model))
+            result = process_and_analyze_file(
+                payload["path"],
+                model,
+                payload.get("transcript_path"),
+                payload.get("is_text", False),
+                payload.get("verbose", False),
+                timer=timer,
+                checkpoint=checkpoint
+            )
+        # None is reserved on the client side for "no daemon reachable"
+        if result is None:
+            raise RuntimeError("No text to analyze or transcription failed.")
+        return result
+
+
+def make_handler(resources: WarmResources):
+    routes = {
+        "/analyze/articulation": resources.run_articulation,
+        "/analyze/speech_analysis": resources.run_speech_analysis,
+    }
+
+    class DaemonHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            route = routes.get(self.path)
+            if route is None:
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                timer = PipelineTimer(payload.get("path"))
+                result = route(payload, timer)
+                self._send_json(200, {"result": result, "instrumentation": timer.summary()})
+            except Exception as e:
+                logger.error(f"Daemon request {self.path} failed: {e}")
+                self._send_json(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return DaemonHandler
+
+
+def _url(path: str, host: str, port: int) -> str:
+    return f"http://{host}:{port}{path}"
+
+
+def is_daemon_running(host: str = DAEMON_HOST, port: int = DAEMON_PORT) -> bool:
+    """Returns True if a daemon answers the health probe on host:port."""
+    try:
+        with urllib.request.urlopen(_url("/health", host, port), timeout=HEALTH_TIMEOUT_SECONDS) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def request_analysis(kind: str, payload: Dict[str, Any], host: str = DAEMON_HOST, port: int = DAEMON_PORT, timer: Optional[PipelineTimer] = None) -> Optional[Dict[str, Any]]:
+    """
+    Sends an analyze request to a running daemon.
+    Returns None when no daemon is reachable so callers can fall back to in-process execution.
+    Raises RuntimeError if the daemon was reached but the analysis itself failed.
+    The daemon's per-stage timings are merged into `timer` when one is passed.
+    """
+    if not is_daemon_running(host, port):
+        return None
+
+    req = urllib.request.Request(
+        _url(f"/analyze/{kind}", host, port),
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(req) as resp:
+            body = json.loads(resp.read())
+        if timer is not None and body.get("instrumentation"):
+            timer.merge(body["instrumentation"])
+        return body["result"]
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", str(e))
+        except ValueError:
+            message = str(e)
+        raise RuntimeError(f"Daemon analysis failed: {message}")
+    except (urllib.error.URLError, OSError):
+        # Daemon went away between the probe and the request
+        return None
+
+
+cli = typer.Typer(help="Resident analysis daemon keeping models warm between requests")
+
+@cli.command()
+def serve(
+    host: str = typer.Option(DAEMON_HOST, "--host", help="Interface to bind (loopback only by default)"),
+    port: int = typer.Option(DAEMON_PORT, "--port", help="Port to listen on"),
+    model: str = typer.Option("base", "--model", help="openai-whisper model to pre-load for speech analysis")
+):
+    """
+    Start the daemon, warm all models and serve analyze requests until interrupted.
+    """
+    # The articulation and speech pipelines each run one request at a time, but can overlap
+    thread_budget.configure(2)
+    resources = WarmResources(speech_model_size=model)
+    typer.secho("Warming models...", fg=typer.colors.BLUE)
+    resources.warm_up()
+
+    server = ThreadingHTTPServer((host, port), make_handler(resources))
+    typer.secho(f"Analysis daemon listening on http://{host}:{port}", fg=typer.colors.GREEN, bold=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # In-flight analyses stop at their next checkpoint and clean up their temp audio
+        cancel_all("stopped: daemon shutting down")
+        server.server_close()
+        syllable_service.save_memo()
+        typer.secho("Daemon stopped.", fg=typer.colors.YELLOW)
+
+@cli.command()
+def status(
+    host: str = typer.Option(DAEMON_HOST, "--host"),
+    port: int = typer.Option(DAEMON_PORT, "--port")
+):
+    """
+    Check whether a daemon is running.
+    """
+    if is_daemon_running(host, port):
+        typer.secho(f"Daemon is running on {host}:{port}.", fg=typer.colors.GREEN)
+    else:
+        typer.secho(f"No daemon on {host}:{port}.", fg=typer.colors.YELLOW)
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+    cli()
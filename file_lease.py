@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def node_name() -> str:
+    """This machine and process, as recorded in the leases it holds."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Lease:
+    """
+    Exclusive, expiring ownership of `path` among processes and machines sharing a directory
+    (including NFS), without a lock server:
+
+    - acquire: the lease file is written under a unique temp name and hard-linked to `path`.
+      Linking is atomic and fails if `path` exists; success is read from the temp file's link
+      count, which stays right on NFS even when the server's reply to link() is lost.
+    - heartbeat: the holder touches `path` every few seconds, so its mtime is the last sign
+      of life, and re-reads the token to notice when the lease was taken over.
+    - expiry: a lease untouched for `duration` seconds is renamed away (only one contender's
+      rename can succeed) and the path can be claimed again. Ages are measured against the
+      file server's clock, via the mtime of the contender's own temp file, so clock skew
+      between machines does not matter.
+    """
+
+    def __init__(self, path: str, duration: float, owner: Optional[str] = None):
+        self.path = Path(path)
+        self.duration = duration
+        self.owner = owner or node_name()
+        self.token = uuid.uuid4().hex
+        self.held = False
+
+    def try_acquire(self) -> bool:
+        """Takes the lease if it is free or expired; never blocks."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{self.token}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"owner": self.owner, "token": self.token, "acquired": datetime.now().isoformat()}, f)
+        try:
+            self.held = self._link(tmp_path)
+            if not self.held and self._break_if_expired(os.stat(tmp_path).st_mtime):
+                self.held = self._link(tmp_path)
+        finally:
+            os.remove(tmp_path)
+        return self.held
+
+    def acquire(self, poll_seconds: float = 0.1, timeout: Optional[float] = None) -> bool:
+        """Waits until the lease is taken (False if `timeout` seconds pass first)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(poll_seconds)
+        return True
+
+    def renew(self) -> bool:
+        """Heartbeat: refreshes the lease and returns False once it is no longer ours."""
+        try:
+            os.utime(self.path, None)
+            with open(self.path, "r", encoding="utf-8") as f:
+                # Touching a lease that was just taken over only keeps the new holder's alive
+                self.held = json.load(f).get("token") == self.token
+        except (OSError, ValueError):
+            self.held = False
+        return self.held
+
+    def release(self):
+        if not self.held:
+            return
+        self.held = False
+        # Renamed away first, so a lease taken over in the meantime is never deleted
+        released = self.path.with_name(f".{self.path.name}.{self.token}.released")
+        try:
+            os.rename(self.path, released)
+        except FileNotFoundError:
+            return
+        try:
+            with open(released, "r", encoding="utf-8") as f:
+                ours = json.load(f).get("token") == self.token
+        except (OSError, ValueError):
+            ours = True
+        if not ours:
+            # Someone else's lease: put it back (unless the path was claimed again already)
+            self._link(released)
+        os.remove(released)
+
+    @contextmanager
+    def heartbeat(self, on_lost: Optional[Callable[[], None]] = None):
+        """Renews the lease in the background while the block runs; calls `on_lost` if it is lost."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.duration / 4):
+                if not self.renew():
+                    logger.warning(f"Lost lease {self.path.name} to another node.")
+                    if on_lost is not None:
+                        on_lost()
+                    return
+
+        thread = threading.Thread(target=beat, name=f"lease-{self.path.name}", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    @contextmanager
+    def hold(self, poll_seconds: float = 0.05):
+        """`with lease.hold():` - blocks until acquired, heartbeats while held, releases after."""
+        self.acquire(poll_seconds)
+        try:
+            with self.heartbeat():
+                yield self
+        finally:
+            self.release()
+
+    def _link(self, source: Path) -> bool:
+        try:
+            os.link(source, self.path)
+        except FileExistsError:
+            return False
+        except OSError:
+            # NFS retransmits can report failure for a link that was made; the count decides
+            pass
+        return os.stat(source).st_nlink == 2
+
+    def _break_if_expired(self, server_now: float) -> bool:
+        """Renames an expired lease out of the way. True if `path` is free to claim now."""
+        try:
+            age = server_now - os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return True
+        if age <= self.duration:
+            return False
+        stale = self.path.with_name(f".{self.path.name}.{self.token}.stale")
+        try:
+            os.rename(self.path, stale)
+        except FileNotFoundError:
+            return True
+        if server_now - os.stat(stale).st_mtime <= self.duration:
+            # Renewed between the check and the rename: hand it back to its holder
+            self._link(stale)
+            os.remove(stale)
+            return False
+        logger.info(f"Broke expired lease {self.path.name} ({age:.0f}s without heartbeat).")
+        os.remove(stale)
+        return True
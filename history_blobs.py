@@ -0,0 +1,103 @@
+import functools
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from config import HISTORY_BLOB_DIR, HISTORY_BLOB_FIELDS, HISTORY_BLOB_MIN_BYTES
+
+# zstd compresses transcripts better and faster than gzip, but is an optional dependency
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# A bulky metrics field moved out of the history is replaced by {"$blob": "<relative path>"}
+BLOB_KEY = "$blob"
+_EXTENSIONS = (".json.zst", ".json.gz")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_KEY in value
+
+
+def _blob_root(history_file: str) -> Path:
+    return Path(os.path.dirname(os.path.abspath(history_file))) / HISTORY_BLOB_DIR
+
+
+def store_blob(history_file: str, value: Any) -> str:
+    """
+    Writes `value` as a compressed JSON blob named by the SHA-256 of its canonical encoding and
+    returns the path (relative to the history's directory) to reference it by. Identical
+    values - the same transcript analyzed twice - share one blob.
+    """
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    root = _blob_root(history_file)
+    for extension in _EXTENSIONS:
+        if (root / digest[:2] / f"{digest}{extension}").exists():
+            return f"{HISTORY_BLOB_DIR}/{digest[:2]}/{digest}{extension}"
+
+    if zstandard is not None:
+        extension, payload = ".json.zst", zstandard.ZstdCompressor(level=10).compress(data)
+    else:
+        # mtime=0 keeps the bytes reproducible for identical content
+        extension, payload = ".json.gz", gzip.compress(data, compresslevel=9, mtime=0)
+    path = root / digest[:2] / f"{digest}{extension}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    # Forward slashes keep history files portable between the macOS and Windows setups
+    return f"{HISTORY_BLOB_DIR}/{digest[:2]}/{digest}{extension}"
+
+
+@functools.lru_cache(maxsize=256)
+def _read_blob(path: str) -> bytes:
+    # Blobs are content-addressed and never rewritten, so caching by path is always safe
+    with open(path, "rb") as f:
+        payload = f.read()
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install 'zstandard' to read it.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return gzip.decompress(payload)
+
+
+def load_blob(history_file: str, ref: Dict[str, str]) -> Any:
+    path = os.path.join(os.path.dirname(os.path.abspath(history_file)), ref[BLOB_KEY])
+    return json.loads(_read_blob(path))
+
+
+def externalize_entry(history_file: str, entry: Dict[str, Any], fields: Sequence[str] = HISTORY_BLOB_FIELDS) -> Dict[str, Any]:
+    """
+    Copy of a history entry whose bulky metrics `fields` (transcript, word lists, word
+    frequencies) are stored as blobs and referenced by hash. Fields smaller than
+    HISTORY_BLOB_MIN_BYTES stay inline, where a reference would cost more than it saves.
+    """
+    metrics = entry.get("metrics")
+    if not isinstance(metrics, dict):
+        return entry
+    slim = dict(metrics)
+    for field in fields:
+        value = slim.get(field)
+        if value is None or is_blob_ref(value):
+            continue
+        if len(json.dumps(value, ensure_ascii=False)) >= HISTORY_BLOB_MIN_BYTES:
+            slim[field] = {BLOB_KEY: store_blob(history_file, value)}
+    return {**entry, "metrics": slim}
+
+
+def hydrate_entry(history_file: str, entry: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Copy of an entry with its blob references (or only those in `fields`) loaded back in place."""
+    metrics = entry.get("metrics")
+    if not isinstance(metrics, dict) or not any(is_blob_ref(v) for v in metrics.values()):
+        return entry
+    full = dict(metrics)
+    for field, value in metrics.items():
+        if is_blob_ref(value) and (fields is None or field in fields):
+            full[field] = load_blob(history_file, value)
+    return {**entry, "metrics": full}
@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import typer
+
+import trends
+from config import HISTORY_BLOB_DIR
+from history_blobs import externalize_entry
+from history_reader import archive_path, iter_entries
+from output_manager import history_lock, write_entries, stream_append
+
+
+def compact_history(history_file: str, archive_before: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Rewrites `history_file` with every bulky field moved into blobs (history_blobs.py) and,
+    with `archive_before`, moves older entries into monthly archive segments
+    (<history>.archive-YYYY-MM.json) that dedupe and trend rebuilds still read. The history is
+    streamed one entry at a time. Archives are written before the slim history replaces the
+    old one, so a crash can at worst leave an entry in both places, never in neither.
+    """
+    path = Path(history_file)
+    # Appends from other jobs or machines wait until the compacted file is in place
+    with history_lock(history_file):
+        bytes_before = path.stat().st_size
+        state = trends.load_state(history_file)
+        in_sync = state is not None and state.get("history_bytes") == bytes_before
+
+        archived: Dict[str, List[Dict[str, Any]]] = {}
+        stats = {"entries": 0, "archived": 0}
+
+        def kept_entries():
+            for entry in iter_entries(history_file):
+                stats["entries"] += 1
+                slim = externalize_entry(history_file, entry)
+                if archive_before is not None and datetime.fromisoformat(entry["date"]) < archive_before:
+                    archived.setdefault(entry["date"][:7], []).append(slim)
+                    stats["archived"] += 1
+                else:
+                    yield slim
+
+        tmp_path = path.with_name(f".{path.name}.compact.tmp")
+        try:
+            with open(tmp_path, "wb") as out:
+                write_entries(out, kept_entries())
+                out.flush()
+                os.fsync(out.fileno())
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        for segment, entries in sorted(archived.items()):
+            stream_append(archive_path(history_file, segment), entries)
+        os.replace(tmp_path, path)
+
+        # The entries did not change, only where their bulky fields live: an up-to-date trend
+        # state stays valid and just needs to learn the new file size
+        if in_sync:
+            trends.save_state(history_file, state)
+        stats.update(bytes_before=bytes_before, bytes_after=path.stat().st_size, segments=sorted(archived))
+    return stats
+
+
+def git_tracked(path: str) -> bool:
+    """True if `path` is tracked in the git repository it lives in."""
+    try:
+        subprocess.run(
+            ["git", "ls-files", "--error-unmatch", os.path.basename(path)],
+            cwd=os.path.dirname(os.path.abspath(path)), check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+cli = typer.Typer(help="Slim down history files by moving bulky fields into compressed blobs")
+
+@cli.command()
+def main(
+    history: str = typer.Option("metrics_history.json", "--history", "-h", help="History JSON file"),
+    archive_days: Optional[int] = typer.Option(None, "--archive-older-than", help="Also move entries older than this many days into monthly archive segments")
+):
+    """
+    Move transcripts, word lists and word frequencies out of the history into content-addressed blobs.
+    """
+    if not os.path.exists(history):
+        typer.secho(f"Error: History '{history}' not found.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    archive_before = datetime.now() - timedelta(days=archive_days) if archive_days is not None else None
+    try:
+        stats = compact_history(history, archive_before)
+    except json.JSONDecodeError as e:
+        typer.secho(f"Error: Could not decode {history}: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    typer.secho(
+        f"Compacted {stats['entries']} entries: {stats['bytes_before'] / 1024:.0f} KB -> {stats['bytes_after'] / 1024:.0f} KB",
+        fg=typer.colors.GREEN
+    )
+    if stats["archived"]:
+        typer.echo(f"Archived {stats['archived']} entries into {len(stats['segments'])} segment(s): {', '.join(stats['segments'])}")
+    if git_tracked(history):
+        # A compacted history only holds references; without these files a clone loses the data
+        sidecars = [os.path.join(os.path.dirname(history), HISTORY_BLOB_DIR)] + [archive_path(history, segment) for segment in stats["segments"]]
+        typer.secho(
+            f"Warning: {history} is tracked in git. Commit {', '.join(sidecars)} together with it, "
+            "or every clone loses the moved transcripts, word lists and archived entries.",
+            fg=typer.colors.YELLOW
+        )
+
+if __name__ == "__main__":
+    cli()
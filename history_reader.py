@@ -0,0 +1,206 @@
+import glob
+import json
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Streaming access to the JSON-array history files. The file is memory-mapped and scanned
+# entry by entry, so only one entry (or just the requested fields of it) is ever decoded;
+# transcripts and word lists of the other entries are skipped over without being parsed.
+
+_WS = re.compile(rb"[ \t\r\n]*")
+_SCALAR = re.compile(rb"-?[0-9][0-9.eE+-]*|true|false|null")
+# Next quote or bracket; strings are then skipped whole so brackets inside them never count
+_STRUCTURAL = re.compile(rb'["\[\]{}]')
+
+# Layout written by json.dump(history, indent=2): an entry opens with '{', a newline and its
+# first key at 4 spaces, and closes with a newline, 2 spaces and '}'. JSON strings never hold a
+# raw newline and nested values are indented deeper, so these byte patterns only occur at the
+# entry's own top level and can be found with a plain (memchr-speed) bytes.find.
+_INDENTED_ENTRY_START = b'{\n    "'
+_INDENTED_ENTRY_END = b"\n  }"
+
+
+def _error(message: str, pos: int) -> json.JSONDecodeError:
+    return json.JSONDecodeError(message, "", pos)
+
+
+@contextmanager
+def mapped_history(history_file: str):
+    """The history file as a read-only memory map, or None when it is missing or empty."""
+    if not os.path.exists(history_file) or os.path.getsize(history_file) == 0:
+        yield None
+        return
+    with open(history_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        yield buf
+
+
+def _skip_ws(buf, pos: int) -> int:
+    return _WS.match(buf, pos).end()
+
+
+def _skip_ws_back(buf, pos: int) -> int:
+    while pos > 0 and buf[pos - 1:pos] in (b" ", b"\t", b"\r", b"\n"):
+        pos -= 1
+    return pos
+
+
+def _string_end(buf, pos: int) -> int:
+    """End offset of the string whose opening quote is at `pos` (memchr-speed find, not a regex)."""
+    search = pos + 1
+    while True:
+        quote = buf.find(b'"', search)
+        if quote < 0:
+            raise _error("Unterminated string", pos)
+        backslashes = 0
+        while buf[quote - 1 - backslashes] == 0x5C:
+            backslashes += 1
+        # An even run of backslashes escapes itself, not the quote
+        if backslashes % 2 == 0:
+            return quote + 1
+        search = quote + 1
+
+
+def _value_end(buf, pos: int) -> int:
+    """End offset of the JSON value starting at `pos`, found without decoding it."""
+    first = buf[pos:pos + 1]
+    if first == b'"':
+        return _string_end(buf, pos)
+    if first in (b"{", b"["):
+        depth = 0
+        match = _STRUCTURAL.search(buf, pos)
+        while match is not None:
+            token = match.group()
+            if token == b'"':
+                match = _STRUCTURAL.search(buf, _string_end(buf, match.start()))
+                continue
+            depth += 1 if token in (b"{", b"[") else -1
+            if depth == 0:
+                return match.end()
+            match = _STRUCTURAL.search(buf, match.end())
+        raise _error("Unterminated object or array", pos)
+    match = _SCALAR.match(buf, pos)
+    if match is None:
+        raise _error("Expecting value", pos)
+    return match.end()
+
+
+def _is_indented(buf, start: int) -> bool:
+    return buf[start:start + len(_INDENTED_ENTRY_START)] == _INDENTED_ENTRY_START
+
+
+def _entry_end(buf, pos: int) -> int:
+    if _is_indented(buf, pos):
+        end = buf.find(_INDENTED_ENTRY_END, pos)
+        if end >= 0:
+            return end + len(_INDENTED_ENTRY_END)
+    return _value_end(buf, pos)
+
+
+def iter_entry_spans(buf) -> Iterator[Tuple[int, int]]:
+    """(start, end) byte offsets of each top-level entry of a JSON array held in `buf`."""
+    pos = _skip_ws(buf, 0)
+    if pos == len(buf):
+        return
+    if buf[pos:pos + 1] != b"[":
+        raise _error("History is not a JSON array", pos)
+    pos = _skip_ws(buf, pos + 1)
+    if buf[pos:pos + 1] == b"]":
+        return
+    while True:
+        end = _entry_end(buf, pos)
+        yield pos, end
+        pos = _skip_ws(buf, end)
+        separator = buf[pos:pos + 1]
+        if separator == b"]":
+            return
+        if separator != b",":
+            raise _error("Expecting ',' delimiter", pos)
+        pos = _skip_ws(buf, pos + 1)
+
+
+def _pick_fields(buf, start: int, end: int, fields: Sequence[str]) -> Dict[str, Any]:
+    """Decodes only the top-level `fields` of the object at buf[start:end]."""
+    picked: Dict[str, Any] = {}
+    if _is_indented(buf, start):
+        for field in fields:
+            key = b"\n    " + json.dumps(field).encode("utf-8") + b": "
+            key_pos = buf.find(key, start, end)
+            if key_pos >= 0:
+                value_start = key_pos + len(key)
+                picked[field] = json.loads(buf[value_start:_value_end(buf, value_start)])
+        return picked
+    if buf[start:start + 1] != b"{":
+        raise _error("History entry is not an object", start)
+    pos = _skip_ws(buf, start + 1)
+    while pos < end and buf[pos:pos + 1] != b"}":
+        if buf[pos:pos + 1] != b'"':
+            raise _error("Expecting property name", pos)
+        key_end = _string_end(buf, pos)
+        key = json.loads(buf[pos:key_end])
+        pos = _skip_ws(buf, key_end)
+        if buf[pos:pos + 1] != b":":
+            raise _error("Expecting ':' delimiter", pos)
+        value_start = _skip_ws(buf, pos + 1)
+        value_end = _value_end(buf, value_start)
+        if key in fields:
+            picked[key] = json.loads(buf[value_start:value_end])
+        pos = _skip_ws(buf, value_end)
+        if buf[pos:pos + 1] == b",":
+            pos = _skip_ws(buf, pos + 1)
+    return picked
+
+
+def iter_entries(history_file: str, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the history entries one at a time. With `fields` only those top-level keys are
+    decoded (e.g. ("source_file", "file_id") for dedupe checks). Stopping the iteration early
+    stops reading the file. Raises json.JSONDecodeError on a malformed history.
+    """
+    with mapped_history(history_file) as buf:
+        if buf is None:
+            return
+        for start, end in iter_entry_spans(buf):
+            if fields is None:
+                yield json.loads(buf[start:end])
+            else:
+                yield _pick_fields(buf, start, end, fields)
+
+
+def archive_path(history_file: str, segment: str) -> str:
+    """Archive segment next to its history: metrics_history.json -> metrics_history.archive-2026-01.json"""
+    path = Path(history_file)
+    return str(path.with_name(f"{path.stem}.archive-{segment}.json"))
+
+
+def history_segments(history_file: str) -> List[str]:
+    """Archive segments (oldest first) followed by the live history file."""
+    path = Path(history_file)
+    archives = sorted(str(p) for p in path.parent.glob(f"{glob.escape(path.stem)}.archive-*.json"))
+    return archives + [history_file]
+
+
+def iter_history(history_file: str, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    """iter_entries over the archive segments and then the live history, in chronological order."""
+    for segment in history_segments(history_file):
+        yield from iter_entries(segment, fields)
+
+
+def append_offset(buf) -> Tuple[int, bool]:
+    """
+    Where new entries go in the JSON array held in `buf`: (offset just past the last entry, or
+    past '[' for an empty array; whether the array already has entries). Only the tail is
+    inspected, so a truncated file (no closing bracket) is caught but the body is not validated.
+    """
+    end = _skip_ws_back(buf, len(buf))
+    if buf[end - 1:end] != b"]":
+        raise _error("History does not end with ']'", end)
+    last = _skip_ws_back(buf, end - 1)
+    if buf[last - 1:last] == b"[" and _skip_ws(buf, 0) == last - 1:
+        return last, False
+    if buf[last - 1:last] != b"}":
+        raise _error("History entries must be objects", last - 1)
+    return last, True
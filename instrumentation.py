@@ -0,0 +1,136 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is simply not reported there
+    resource = None
+
+_log_lock = threading.Lock()
+
+# Receives progress events while a file is analyzed (see report_progress); the Streamlit app
+# renders them, the CLIs pass nothing
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+class PipelineTimer:
+    """
+    Collects per-stage wall time, CPU time and peak RSS for one analyzed file.
+
+    Usage:
+        timer = PipelineTimer("clip.m4a")
+        with timer.stage("decode"):
+            ...
+        timer.set_audio_duration(42.0)
+        timer.summary()  # -> dict suitable for JSON lines / history entries
+    """
+
+    def __init__(self, source_file: Optional[str] = None):
+        self.source_file = source_file
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.audio_duration_sec: Optional[float] = None
+        self.extra: Dict[str, Any] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield self
+        finally:
+            self.record(name, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+    def record(self, name: str, wall_sec: float, cpu_sec: float, rss_mb: Optional[float] = None):
+        """Records a finished stage. Repeated stage names accumulate their times."""
+        entry = self.stages.setdefault(name, {"wall_sec": 0.0, "cpu_sec": 0.0, "peak_rss_mb": None})
+        entry["wall_sec"] = round(entry["wall_sec"] + wall_sec, 4)
+        entry["cpu_sec"] = round(entry["cpu_sec"] + cpu_sec, 4)
+        entry["peak_rss_mb"] = rss_mb if rss_mb is not None else peak_rss_mb()
+
+    def set_audio_duration(self, seconds: Optional[float]):
+        self.audio_duration_sec = round(seconds, 3) if seconds else None
+
+    def merge(self, summary: Dict[str, Any]):
+        """Folds a summary produced elsewhere (e.g. by the daemon) into this timer."""
+        for name, stage in summary.get("stages", {}).items():
+            self.record(name, stage["wall_sec"], stage["cpu_sec"], stage.get("peak_rss_mb"))
+        if summary.get("audio_duration_sec"):
+            self.set_audio_duration(summary["audio_duration_sec"])
+        self.extra.update(summary.get("extra", {}))
+
+    def summary(self) -> Dict[str, Any]:
+        total_wall = sum(s["wall_sec"] for s in self.stages.values())
+        rtf = None
+        if self.audio_duration_sec:
+            # Real-time factor: processing seconds per second of audio (< 1.0 is faster than real time)
+            rtf = round(total_wall / self.audio_duration_sec, 4)
+        result = {
+            "stages": self.stages,
+            "total_wall_sec": round(total_wall, 4),
+            "audio_duration_sec": self.audio_duration_sec,
+            "real_time_factor": rtf,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if self.extra:
+            result["extra"] = self.extra
+        return result
+
+    def emit(self, log_file: str):
+        """Appends this file's summary as one JSON line to log_file."""
+        line = {
+            "date": datetime.now().isoformat(),
+            "source_file": self.source_file,
+            **self.summary()
+        }
+        with _log_lock:
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line) + "\n")
+
+
+def report_progress(progress: Optional[ProgressCallback], stage: str, done_sec: Optional[float] = None, total_sec: Optional[float] = None, text: Optional[str] = None):
+    """
+    Sends one progress event to `progress` (a no-op without a callback):
+    {"stage": "transcription", "done_sec": 12.5, "total_sec": 60.0, "text": "partial transcript"}.
+    `done_sec` / `total_sec` are seconds of audio, so they are absent where a stage has no
+    measurable position; `text` only comes with transcription events.
+    """
+    if progress is None:
+        return
+    event: Dict[str, Any] = {"stage": stage}
+    if done_sec is not None:
+        event["done_sec"] = round(float(done_sec), 2)
+    if total_sec:
+        event["total_sec"] = round(float(total_sec), 2)
+    if text is not None:
+        event["text"] = text
+    progress(event)
+
+
+@contextmanager
+def optional_stage(timer: Optional[PipelineTimer], name: str, progress: Optional[ProgressCallback] = None):
+    """
+    `with optional_stage(timer, "decode"):` - a no-op when no timer is being collected.
+    A `progress` callback is told that the stage started.
+    """
+    report_progress(progress, name)
+    if timer is None:
+        yield None
+    else:
+        with timer.stage(name):
+            yield timer
@@ -0,0 +1,129 @@
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from cancellation import CancelToken
+from config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_QUEUE_POLL_SECONDS
+from file_lease import Lease, node_name
+from output_manager import atomic_write_json, get_file_id
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Work claims in a shared directory, so several machines running the same batch command
+    analyze every file exactly once:
+
+        <queue>/claims/<job>.lease   held by the node analyzing the file (file_lease.Lease)
+        <queue>/done/<job>.json      the file is recorded; nobody picks it up again
+        <queue>/failed/<job>.json    failed attempts so far (retried up to JOB_MAX_ATTEMPTS)
+
+    Jobs are keyed by file name and size (output_manager.get_file_id), the same on every node
+    whatever path the share is mounted at. A node that dies mid-file stops renewing its claim;
+    once the lease expires another node takes the file over.
+    """
+
+    def __init__(self, queue_dir: str, lease_seconds: float = JOB_LEASE_SECONDS, node: Optional[str] = None):
+        self.dir = Path(queue_dir)
+        self.lease_seconds = lease_seconds
+        self.node = node or node_name()
+        for sub in ("claims", "done", "failed"):
+            (self.dir / sub).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def job_key(file_path: str) -> str:
+        return get_file_id(str(file_path))
+
+    def is_done(self, file_path: str) -> bool:
+        return (self.dir / "done" / f"{self.job_key(file_path)}.json").exists()
+
+    def attempts(self, file_path: str) -> int:
+        path = self.dir / "failed" / f"{self.job_key(file_path)}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("attempts", 0)
+        except (OSError, ValueError):
+            return 0
+
+    def claim(self, file_path: str) -> Optional[Lease]:
+        """The lease on this file's job, or None when another node holds it (or it is finished)."""
+        if self.is_done(file_path) or self.attempts(file_path) >= JOB_MAX_ATTEMPTS:
+            return None
+        lease = Lease(str(self.dir / "claims" / f"{self.job_key(file_path)}.lease"), self.lease_seconds, self.node)
+        if not lease.try_acquire():
+            return None
+        if self.is_done(file_path):
+            # Finished by the previous holder between our check and the claim
+            lease.release()
+            return None
+        return lease
+
+    def complete(self, file_path: str, lease: Lease):
+        atomic_write_json(
+            str(self.dir / "done" / f"{self.job_key(file_path)}.json"),
+            {"file": Path(file_path).name, "node": self.node, "finished": datetime.now().isoformat()}
+        )
+        lease.release()
+
+    def fail(self, file_path: str, lease: Lease, error: Optional[str] = None):
+        # Only the lease holder writes this file, so the read-modify-write needs no further lock
+        attempts = self.attempts(file_path) + 1
+        atomic_write_json(
+            str(self.dir / "failed" / f"{self.job_key(file_path)}.json"),
+            {"file": Path(file_path).name, "attempts": attempts, "node": self.node, "error": error, "updated": datetime.now().isoformat()}
+        )
+        lease.release()
+
+    def drain(self, files: Iterable, handle: Callable[[Any, CancelToken], bool], poll_seconds: float = JOB_QUEUE_POLL_SECONDS) -> Dict[str, int]:
+        """
+        Works through `files` in order together with the other nodes: claims each unclaimed
+        file and runs `handle(file, cancel)`, which returns True once the file is recorded.
+        The `cancel` token is cancelled if the claim is lost, so the handler can stop before
+        recording a result another node now owns. Returns when every file is done or out of
+        attempts, waiting for files other nodes are still working on.
+        """
+        files = list(files)
+        counts = {"analyzed": 0, "failed": 0, "by_other_nodes": 0}
+        pending = files
+        while pending:
+            waiting = []
+            for file in pending:
+                if self.is_done(file) or self.attempts(file) >= JOB_MAX_ATTEMPTS:
+                    continue
+                lease = self.claim(file)
+                if lease is None:
+                    waiting.append(file)
+                    continue
+                cancel = CancelToken()
+                succeeded = False
+                error = None
+                try:
+                    with lease.heartbeat(on_lost=lambda: cancel.cancel("stopped: claim lost to another node")):
+                        succeeded = handle(file, cancel)
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"Queue job failed for {Path(file).name}: {e}")
+                except BaseException:
+                    # Ctrl+C: hand the file straight back instead of making others wait out the lease
+                    lease.release()
+                    raise
+                if cancel.cancelled:
+                    # The new claim holder decides the outcome
+                    continue
+                if succeeded:
+                    self.complete(file, lease)
+                    counts["analyzed"] += 1
+                else:
+                    self.fail(file, lease, error)
+                    counts["failed"] += 1
+                    waiting.append(file)
+            pending = [f for f in waiting if not self.is_done(f) and self.attempts(f) < JOB_MAX_ATTEMPTS]
+            if pending:
+                logger.info(f"{len(pending)} file(s) claimed by other nodes or awaiting retry; checking again in {poll_seconds:g}s.")
+                time.sleep(poll_seconds)
+        counts["by_other_nodes"] = sum(1 for f in files if self.is_done(f)) - counts["analyzed"]
+        return counts
@@ -0,0 +1,213 @@
+import collections
+import json
+from typing import Any, Dict, List, Optional
+
+import typer
+
+import trends
+from config import LLM_CHARS_PER_TOKEN, LLM_MAX_SESSIONS, LLM_TOKEN_BUDGET
+from history_blobs import hydrate_entry
+from history_reader import iter_history
+
+# Compression levels tried in order until the requested sessions fit the budget:
+# (transcript excerpt characters, top-N weak words / fillers / frequent words)
+COMPRESSION_LEVELS = ((600, 10), (300, 5), (120, 3), (0, 3))
+
+# Bulky or machine-only fields that never go into a prompt
+_DROPPED_KEYS = {"word_timeline", "metrics_timeline", "windows", "words"}
+
+
+def _dumps(obj: Any) -> str:
+    # Compact separators: indentation costs tokens without helping the model
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose and JSON); avoids a tokenizer dependency."""
+    return -(-len(text) // LLM_CHARS_PER_TOKEN)
+
+
+def _excerpt(text: str, max_chars: int) -> Optional[str]:
+    text = " ".join(text.split())
+    if max_chars <= 0 or not text:
+        return None
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def compact_entry(entry: Dict[str, Any], excerpt_chars: int, top_n: int) -> Dict[str, Any]:
+    """
+    One history entry reduced to what a coaching prompt needs: scalar metrics, the top-N weakest
+    words, summarized filler counts, the top-N frequent words and a truncated transcript excerpt.
+    """
+    metrics = entry.get("metrics", {})
+    compact: Dict[str, Any] = {}
+    for key, value in metrics.items():
+        if key in _DROPPED_KEYS or key in ("text", "transcript", "weak_words", "filler_words", "word_frequency"):
+            continue
+        if key == "pause_distribution" and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k != "histogram"}
+        if isinstance(value, (int, float, str, dict)) and not isinstance(value, bool):
+            compact[key] = value
+
+    weak_words = metrics.get("weak_words")
+    if weak_words:
+        weakest = sorted(weak_words, key=lambda w: w.get("probability", 1.0))[:top_n]
+        compact["weak_words"] = {"count": len(weak_words), "weakest": [[w["word"], round(w.get("probability", 0.0), 2)] for w in weakest]}
+    fillers = metrics.get("filler_words")
+    if fillers:
+        top = sorted(fillers.items(), key=lambda kv: kv[1], reverse=True)[:top_n]
+        compact["filler_words"] = {"total": sum(fillers.values()), "top": dict(top)}
+    if metrics.get("word_frequency"):
+        compact["top_words"] = [w for w, _ in metrics["word_frequency"][:top_n]]
+    excerpt = _excerpt(metrics.get("transcript") or metrics.get("text") or "", excerpt_chars)
+    if excerpt:
+        compact["transcript_excerpt"] = excerpt
+
+    result = {"date": entry.get("date", "")[:10], "source_file": entry.get("source_file")}
+    if entry.get("manual_observations"):
+        result["manual_observations"] = entry["manual_observations"]
+    result["metrics"] = compact
+    return result
+
+
+def _trend_digest(history_file: str, top_n: int) -> Optional[Dict[str, Any]]:
+    """Week-over-week means and deltas from the rolling trend state (never reads the history itself)."""
+    state = trends.load_state(history_file)
+    if not state or not state["weeks"]:
+        return None
+    summary = trends.weekly_summary(state)
+    return {
+        "week": summary["week"],
+        "previous_week": summary["previous_week"],
+        "sessions": summary["sessions"],
+        "metrics": {
+            name: {k: v for k, v in stats.items() if k in ("mean", "delta_mean")}
+            for name, stats in summary["metrics"].items()
+        },
+        "recurring_weak_words": [w for w, _ in summary["all_time"]["top_weak_words"][:top_n]],
+        "recurring_fillers": [w for w, _ in summary["all_time"]["top_filler_words"][:top_n]],
+    }
+
+
+def _trim_digest(digest: Dict[str, Any], top_n: int) -> Dict[str, Any]:
+    """A digest built for a larger top-N, cut down to `top_n` recurring words."""
+    return {
+        **digest,
+        "recurring_weak_words": digest["recurring_weak_words"][:top_n],
+        "recurring_fillers": digest["recurring_fillers"][:top_n],
+    }
+
+
+def load_recent_entries(history_file: str, count: int) -> List[Dict[str, Any]]:
+    # Streamed, so only the last `count` entries are ever held (and have their blobs loaded)
+    return [hydrate_entry(history_file, entry) for entry in collections.deque(iter_history(history_file), maxlen=count)]
+
+
+def _fixed_part(instructions: Optional[str], digest: Optional[Dict[str, Any]], session_count: int, budget_chars: int) -> Dict[str, Any]:
+    """
+    The payload without its sessions, cut to `budget_chars`: the trend digest is dropped first
+    ("omitted_trend"), then the instructions are shortened ("truncated_instructions").
+    Raises ValueError when not even the empty payload fits.
+    """
+    payload: Dict[str, Any] = {}
+    if instructions:
+        payload["instructions"] = instructions
+    if digest:
+        payload["trend"] = digest
+    payload["sessions"] = []
+    # The largest count it can take, so filling in the real one never adds characters
+    payload["omitted_sessions"] = session_count
+    if len(_dumps(payload)) > budget_chars and digest:
+        del payload["trend"]
+        payload["omitted_trend"] = True
+    if len(_dumps(payload)) > budget_chars and instructions:
+        payload["truncated_instructions"] = True
+        # Longest prefix that fits (escaped newlines and quotes make the encoded length uneven)
+        shortest, longest = 0, len(instructions)
+        while shortest < longest:
+            keep = (shortest + longest + 1) // 2
+            payload["instructions"] = instructions[:keep] + " ..."
+            if len(_dumps(payload)) <= budget_chars:
+                shortest = keep
+            else:
+                longest = keep - 1
+        if shortest:
+            payload["instructions"] = instructions[:shortest] + " ..."
+        else:
+            del payload["instructions"]
+    if len(_dumps(payload)) > budget_chars:
+        raise ValueError(f"A budget of {budget_chars // LLM_CHARS_PER_TOKEN} tokens cannot hold even an empty payload")
+    return payload
+
+
+def build_payload(
+    history_file: str,
+    budget_tokens: int = LLM_TOKEN_BUDGET,
+    max_sessions: int = LLM_MAX_SESSIONS,
+    instructions: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Builds a prompt payload of at most ~budget_tokens: the trend digest plus up to
+    `max_sessions` of the newest entries. Each compression level is tried in turn, and
+    at the leanest level the oldest sessions are dropped until the rest fit. When the
+    instructions and digest alone exceed the budget they are cut as well (see _fixed_part).
+    """
+    entries = load_recent_entries(history_file, max_sessions)
+    # Built once at the largest top-N; each level only trims its word lists
+    digest = _trend_digest(history_file, max(top_n for _, top_n in COMPRESSION_LEVELS))
+    # Measured on the rendered text, so the estimate of the whole payload stays within budget
+    budget_chars = budget_tokens * LLM_CHARS_PER_TOKEN
+    payload: Dict[str, Any] = {}
+    for excerpt_chars, top_n in COMPRESSION_LEVELS:
+        payload = _fixed_part(instructions, _trim_digest(digest, top_n) if digest else None, len(entries), budget_chars)
+        used = len(_dumps(payload))
+        # Newest first, so a tight budget keeps the most recent sessions
+        for entry in reversed(entries):
+            compact = compact_entry(entry, excerpt_chars, top_n)
+            # Plus the separating comma
+            cost = len(_dumps(compact)) + 1
+            if used + cost > budget_chars:
+                break
+            payload["sessions"].insert(0, compact)
+            used += cost
+        if len(payload["sessions"]) == len(entries):
+            break
+    payload["omitted_sessions"] = len(entries) - len(payload["sessions"])
+    return payload
+
+
+def render_payload(payload: Dict[str, Any]) -> str:
+    return _dumps(payload)
+
+
+cli = typer.Typer(help="Token-budgeted LLM payloads built from the history files")
+
+@cli.command()
+def main(
+    history: str = typer.Option("metrics_history.json", "--history", "-h", help="History JSON file"),
+    budget: int = typer.Option(LLM_TOKEN_BUDGET, "--budget", "-b", help="Approximate token budget for the payload"),
+    sessions: int = typer.Option(LLM_MAX_SESSIONS, "--sessions", "-n", help="Most recent sessions to include"),
+    with_prompt: bool = typer.Option(False, "--with-prompt", help="Embed the speech-improvement prompt as 'instructions'")
+):
+    """
+    Print a compact payload (trend digest + recent sessions) that fits the token budget.
+    """
+    instructions = None
+    if with_prompt:
+        from speech_analysis import get_llm_prompt_template
+        instructions = get_llm_prompt_template()
+    try:
+        payload = build_payload(history, budget, sessions, instructions)
+    except ValueError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    text = render_payload(payload)
+    typer.echo(text)
+    typer.secho(f"~{estimate_tokens(text)} tokens (budget {budget})", fg=typer.colors.BLUE, err=True)
+    if payload.get("omitted_trend") or payload.get("truncated_instructions"):
+        typer.secho("The budget is too small for the trend digest or instructions; they were cut to fit.", fg=typer.colors.YELLOW, err=True)
+
+if __name__ == "__main__":
+    cli()
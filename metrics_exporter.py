@@ -0,0 +1,229 @@
+import abc
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, spanning a quick text analysis up to a long Whisper run
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """The exposition lines of this metric, without its HELP / TYPE header."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in self.values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.values: Dict[LabelKey, float] = {}
+        self.callbacks: List[Callable[[], Dict[LabelKey, float]]] = []
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[_label_key(labels)] = float(value)
+
+    def set_function(self, fn: Callable[[], Dict[LabelKey, float]]):
+        """Registers a callback evaluated at scrape time, returning {label_key: value}."""
+        self.callbacks.append(fn)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            values = dict(self.values)
+        for fn in self.callbacks:
+            try:
+                values.update(fn())
+            except Exception as e:
+                logger.debug(f"Gauge callback for {self.name} failed: {e}")
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label key -> [bucket counts..., sum, count]
+        self.values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            state = self.values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for key, state in self.values.items():
+                for bound, count in zip(self.buckets, state):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {_format_value(count)}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+FILES_PROCESSED = REGISTRY.register(Counter("speech_suite_files_processed_total", "Files analyzed and recorded in the history."))
+FILES_FAILED = REGISTRY.register(Counter("speech_suite_files_failed_total", "Files whose analysis failed."))
+STAGE_SECONDS = REGISTRY.register(Histogram("speech_suite_stage_duration_seconds", "Wall time per pipeline stage."))
+FILE_SECONDS = REGISTRY.register(Histogram("speech_suite_file_duration_seconds", "Total wall time per analyzed file."))
+REAL_TIME_FACTOR = REGISTRY.register(Histogram("speech_suite_real_time_factor", "Processing seconds per second of audio.", RTF_BUCKETS))
+AUDIO_SECONDS = REGISTRY.register(Counter("speech_suite_audio_seconds_total", "Seconds of audio analyzed."))
+MODEL_MEMORY = REGISTRY.register(Gauge("speech_suite_model_memory_mb", "Peak process RSS observed after loading models, in MB."))
+PEAK_RSS = REGISTRY.register(Gauge("speech_suite_peak_rss_mb", "Peak process RSS so far, in MB."))
+QUEUE_LENGTH = REGISTRY.register(Gauge("speech_suite_queue_length", "Media files waiting in a resources folder that are not yet in the history."))
+
+
+def observe_file(pipeline: str, summary: Optional[Dict], succeeded: bool):
+    """Feeds one analyzed file (an instrumentation.PipelineTimer summary) into the metrics."""
+    if succeeded:
+        FILES_PROCESSED.inc(pipeline=pipeline)
+    else:
+        FILES_FAILED.inc(pipeline=pipeline)
+    if not summary:
+        return
+    for stage, stats in summary.get("stages", {}).items():
+        STAGE_SECONDS.observe(stats["wall_sec"], pipeline=pipeline, stage=stage)
+        if stage == "model_load" and stats.get("peak_rss_mb") is not None:
+            MODEL_MEMORY.set(stats["peak_rss_mb"], pipeline=pipeline)
+    if succeeded:
+        FILE_SECONDS.observe(summary.get("total_wall_sec", 0.0), pipeline=pipeline)
+        if summary.get("real_time_factor") is not None:
+            REAL_TIME_FACTOR.observe(summary["real_time_factor"], pipeline=pipeline)
+        if summary.get("audio_duration_sec"):
+            AUDIO_SECONDS.inc(summary["audio_duration_sec"], pipeline=pipeline)
+    if summary.get("peak_rss_mb") is not None:
+        PEAK_RSS.set(summary["peak_rss_mb"])
+
+
+def track_queue(directory: str, valid_exts: Iterable[str], history_file: str):
+    """Reports the backlog of `directory` (files not yet in history_file) as a gauge at scrape time."""
+    from output_manager import get_file_id, load_history_index
+
+    exts = {e.lower() for e in valid_exts}
+
+    def backlog():
+        if not os.path.isdir(directory):
+            return {_label_key({"directory": directory}): 0}
+        known = load_history_index(history_file)
+        waiting = 0
+        for entry in os.scandir(directory):
+            path = Path(entry.path)
+            if entry.is_file() and path.suffix.lower() in exts and path.name not in known and get_file_id(entry.path) not in known:
+                waiting += 1
+        return {_label_key({"directory": directory}): waiting}
+
+    QUEUE_LENGTH.set_function(backlog)
+
+
+def dump_to_file(path: str):
+    """Writes the current metrics in text exposition format (e.g. for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves /metrics on host:port from a background thread and returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True)
+    thread.start()
+    logger.info(f"Metrics exporter listening on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,138 @@
+import logging
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+from config import WORD_TIMELINE_DIR
+from syllable_service import count_words
+from word_timeline import resolve_timeline_path, windowed_sum, word_gaps
+
+logger = logging.getLogger(__name__)
+
+
+def _window_grid(duration: float, window_sec: float, step_sec: float):
+    """
+    Full-length [start, end) windows every step_sec, plus one final window flush with the end
+    of the recording so the tail is covered. Recordings shorter than a window get one window.
+    """
+    if duration <= window_sec:
+        return np.zeros(1), np.array([max(duration, 0.0)])
+    count = int(np.floor((duration - window_sec) / step_sec)) + 1
+    starts = np.arange(count) * step_sec
+    if starts[-1] + window_sec < duration:
+        starts = np.append(starts, duration - window_sec)
+    return starts, starts + window_sec
+
+
+def _interval_overlap(intervals_start: np.ndarray, intervals_end: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Total overlap of sorted, non-overlapping intervals with each window. Uses the cumulative
+    covered-time function C(t) (piecewise linear), so overlap = C(end) - C(start).
+    """
+    if len(intervals_start) == 0:
+        return np.zeros(len(starts))
+    xs = np.column_stack((intervals_start, intervals_end)).ravel()
+    lengths = intervals_end - intervals_start
+    ys = np.column_stack((np.cumsum(lengths) - lengths, np.cumsum(lengths))).ravel()
+    return np.interp(ends, xs, ys) - np.interp(starts, xs, ys)
+
+
+def build_metrics_timeline(
+    words_data: List[Dict[str, Any]],
+    frames: Dict[str, np.ndarray],
+    window_sec: float,
+    step_sec: float,
+    pause_threshold: float,
+    conf_threshold: float
+) -> Dict[str, np.ndarray]:
+    """
+    Computes per-window speech rate, pause density, weak-word rate, F1/F2 SD and mean HNR in
+    one pass over the already extracted word list and voiced LLD frames (see
+    acoustics.voiced_frame_arrays), so neither Whisper nor OpenSMILE is re-run per window.
+
+    Words are assigned to a window by start time, pauses by the end of the word preceding them.
+    Speech rate uses the same definition as the whole-file metric: syllables per second of
+    active speech (window time inside the spoken span, minus pauses).
+    Windows with fewer than two voiced frames report NaN for the acoustic columns.
+    """
+    starts_w = np.array([w["start"] for w in words_data], dtype=np.float64)
+    ends_w = np.array([w["end"] for w in words_data], dtype=np.float64)
+    probs = np.array([w["probability"] for w in words_data], dtype=np.float64)
+    syllable_counts = count_words(w["word"] for w in words_data).astype(np.float64)
+
+    frame_times = frames.get("time", np.zeros(0))
+    duration = max(ends_w[-1] if len(ends_w) else 0.0, frame_times[-1] if len(frame_times) else 0.0)
+    win_start, win_end = _window_grid(duration, window_sec, step_sec)
+    win_len = win_end - win_start
+
+    # Word-level columns
+    word_count = windowed_sum(starts_w, np.ones(len(starts_w)), win_start, win_end)
+    syllable_sum = windowed_sum(starts_w, syllable_counts, win_start, win_end)
+    weak_count = windowed_sum(starts_w, (probs < conf_threshold).astype(np.float64), win_start, win_end)
+
+    gaps = word_gaps(starts_w, ends_w)
+    is_pause = gaps >= pause_threshold
+    pause_starts, pause_ends = ends_w[:-1][is_pause], starts_w[1:][is_pause]
+    pause_count = windowed_sum(pause_starts, np.ones(len(pause_starts)), win_start, win_end)
+
+    if len(starts_w):
+        span = _interval_overlap(starts_w[:1], ends_w[-1:], win_start, win_end)
+        active = span - _interval_overlap(pause_starts, pause_ends, win_start, win_end)
+    else:
+        active = np.zeros(len(win_start))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speech_rate = np.where(active > 0, syllable_sum / active, 0.0)
+        weak_rate = np.where(word_count > 0, weak_count / word_count, 0.0)
+        pause_density = np.where(win_len > 0, pause_count / win_len * 60.0, 0.0)
+
+        # Acoustic columns from running sums of x and x^2 over voiced frames
+        n = windowed_sum(frame_times, np.ones(len(frame_times)), win_start, win_end)
+        columns = {}
+        for name in ("f1", "f2"):
+            x = frames.get(name, np.zeros(0))
+            s1 = windowed_sum(frame_times, x, win_start, win_end)
+            s2 = windowed_sum(frame_times, x * x, win_start, win_end)
+            variance = np.maximum(s2 / n - (s1 / n) ** 2, 0.0)
+            columns[f"{name}_sd"] = np.where(n >= 2, np.sqrt(variance), np.nan)
+        hnr_sum = windowed_sum(frame_times, frames.get("hnr", np.zeros(0)), win_start, win_end)
+        mean_hnr = np.where(n >= 2, hnr_sum / n, np.nan)
+
+    return {
+        "window_start": win_start,
+        "window_end": win_end,
+        "word_count": word_count.astype(np.int32),
+        "speech_rate_sps": speech_rate,
+        "pause_count": pause_count.astype(np.int32),
+        "pause_density_per_min": pause_density,
+        "weak_word_rate": weak_rate,
+        "f1_sd": columns["f1_sd"],
+        "f2_sd": columns["f2_sd"],
+        "mean_hnr": mean_hnr,
+        "voiced_frames": n.astype(np.int32),
+    }
+
+
+def timeline_to_lists(timeline: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """JSON-friendly form (used by the daemon transport)."""
+    return {k: np.asarray(v).tolist() for k, v in timeline.items()}
+
+
+def store_metrics_timeline(history_file: str, file_id: str, timeline: Dict[str, Any]) -> str:
+    """Saves the windowed timeline as a float32 .npz sidecar and returns its path relative to history_file."""
+    relative_path = f"{WORD_TIMELINE_DIR}/{file_id}.windows.npz"
+    arrays = {
+        k: np.asarray(v, dtype=np.int32 if k in ("word_count", "pause_count", "voiced_frames") else np.float32)
+        for k, v in timeline.items()
+    }
+    full_path = resolve_timeline_path(history_file, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    np.savez_compressed(full_path, **arrays)
+    logger.info(f"Stored {len(arrays['window_start'])}-window metrics timeline at {relative_path}")
+    return relative_path
+
+
+def load_metrics_timeline(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
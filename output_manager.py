@@ -1,8 +1,31 @@
 import json
 import os
 import hashlib
+import textwrap
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import Any
+
+import trends
+from config import HISTORY_COPY_CHUNK_BYTES, HISTORY_EXTERNALIZE_ON_WRITE, HISTORY_LOCK_LEASE_SECONDS, HISTORY_LOCK_POLL_SECONDS
+from file_lease import Lease
+from history_blobs import externalize_entry
+from history_reader import append_offset, iter_history, mapped_history
+
+# Serializes read-modify-write cycles on history files when several jobs finish concurrently
+_history_lock = threading.Lock()
+
+@contextmanager
+def history_lock(history_file: str):
+    """
+    Exclusive access to a history file for one read-modify-write cycle: the in-process lock
+    for concurrent jobs, plus a lease on <history>.lock for other processes and machines
+    (the app and a CLI, or several nodes draining a shared queue).
+    """
+    with _history_lock, Lease(f"{history_file}.lock", HISTORY_LOCK_LEASE_SECONDS).hold(HISTORY_LOCK_POLL_SECONDS):
+        yield
 
 def get_file_id(file_path: str) -> str:
     """Generates a fast, unique MD5 hash based on the file name and size."""
@@ -15,30 +38,66 @@ def get_file_id(file_path: str) -> str:
 
 def is_file_processed(history_file: str, source_file: str, file_id: str) -> bool:
     """Checks if a file with the given source_file or file_id already exists in the JSON history."""
-    path = Path(history_file)
-    if not path.exists():
-        return False
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-            if content.strip():
-                history = json.loads(content)
-                for entry in history:
-                    if entry.get("source_file") == source_file:
-                        return True
-                    if entry.get("file_id") == file_id:
-                        return True
+        # Streams the history (and its archive segments) and stops at the first match;
+        # transcripts are never decoded
+        for entry in iter_history(history_file, fields=("source_file", "file_id")):
+            if entry.get("source_file") == source_file:
+                return True
+            if entry.get("file_id") == file_id:
+                return True
     except json.JSONDecodeError:
         pass
     return False
 
-def append_to_metrics(history_file: str, source_file: str, file_id: str, metrics: dict):
+def load_history_index(history_file: str) -> set:
+    """Returns every source_file and file_id recorded in history_file, for fast repeated dedupe checks."""
+    ids = set()
+    try:
+        for entry in iter_history(history_file, fields=("source_file", "file_id")):
+            if "file_id" in entry:
+                ids.add(entry["file_id"])
+            if "source_file" in entry:
+                ids.add(entry["source_file"])
+    except json.JSONDecodeError:
+        pass
+    return ids
+
+def atomic_write_json(path: str, data: Any, **dump_kwargs):
+    """
+    Writes JSON to a temp file in the same directory, fsyncs it and renames it over `path`,
+    so a crash mid-write leaves either the old file or the new one, never a truncated mix.
+    """
+    target = Path(path)
+    tmp_path = target.with_name(f".{target.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, **dump_kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, target)
+
+def append_to_metrics(history_file: str, source_file: str, file_id: str, metrics: dict, instrumentation: dict = None):
     """
     Appends the new metrics dict to a JSON array in history_file.
     Creates the file if it doesn't exist.
+    Per-stage timings are stored alongside the metrics when `instrumentation` is given.
     """
-    path = Path(history_file)
-    
+    with history_lock(history_file):
+        _append_entries(history_file, [_make_entry(source_file, file_id, metrics, instrumentation)])
+    print(f"Successfully appended metrics to {history_file}")
+
+def append_many_to_metrics(history_file: str, results: list):
+    """
+    Appends several results at once, as (source_file, file_id, metrics, instrumentation) tuples.
+    The history is read and rewritten a single time, however many results there are.
+    """
+    if not results:
+        return
+    with history_lock(history_file):
+        _append_entries(history_file, [_make_entry(*result) for result in results])
+    print(f"Successfully appended {len(results)} entries to {history_file}")
+
+def _make_entry(source_file: str, file_id: str, metrics: dict, instrumentation: dict = None) -> dict:
     # Structure of the new entry
     entry = {
         "date": datetime.now().isoformat(),
@@ -46,26 +105,67 @@ def append_to_metrics(history_file: str, source_file: str, file_id: str, metrics
         "file_id": file_id,
         "metrics": metrics
     }
-    
-    history = []
-    if path.exists():
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if content.strip():
-                    history = json.loads(content)
-        except json.JSONDecodeError:
-            backup_path = path.with_suffix(".json.bak")
-            os.rename(path, backup_path)
-            history = []
-            print(f"Warning: Could not decode {history_file}. Backed up corrupted file to {backup_path}.")
-            
-    history.append(entry)
-    
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
-        
-    print(f"Successfully appended metrics to {history_file}")
+    if instrumentation:
+        entry["instrumentation"] = instrumentation
+    return entry
+
+def append_entry(history_file: str, entry: dict):
+    """Appends a ready-made entry (e.g. one carrying manual observations) to history_file."""
+    with history_lock(history_file):
+        _append_entries(history_file, [entry])
+
+def write_entries(out, entries, opened: bool = False, has_entries: bool = False):
+    """Writes entries to a binary stream in json.dump(..., indent=2) layout and closes the array."""
+    if not opened:
+        out.write(b"[")
+    for entry in entries:
+        out.write(b",\n" if has_entries else b"\n")
+        out.write(textwrap.indent(json.dumps(entry, indent=2), "  ").encode("utf-8"))
+        has_entries = True
+    out.write(b"\n]" if has_entries else b"]")
+
+def stream_append(history_file: str, entries: list) -> int:
+    """
+    Appends entries without decoding the existing history: its bytes are streamed into a temp
+    file up to the closing bracket, the new entries are added in the same indent=2 layout, and
+    the temp file is renamed over the history. Memory use does not grow with the history.
+    Returns the size the file had before. Raises json.JSONDecodeError if it is not a JSON array.
+    """
+    path = Path(history_file)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    previous_bytes = path.stat().st_size if path.exists() else 0
+    try:
+        with mapped_history(history_file) as buf, open(tmp_path, "wb") as out:
+            prefix_end, has_entries = append_offset(buf) if buf is not None else (0, False)
+            for pos in range(0, prefix_end, HISTORY_COPY_CHUNK_BYTES):
+                out.write(buf[pos:min(pos + HISTORY_COPY_CHUNK_BYTES, prefix_end)])
+            write_entries(out, entries, opened=prefix_end > 0, has_entries=has_entries)
+            out.flush()
+            os.fsync(out.fileno())
+    except json.JSONDecodeError:
+        os.remove(tmp_path)
+        raise
+    # Write-then-rename: a crash mid-write can no longer leave a truncated history behind
+    os.replace(tmp_path, path)
+    return previous_bytes
+
+def _append_entries(history_file: str, entries: list):
+    # Slim mode: bulky fields go to blobs; the trend statistics still see the full entries
+    stored = [externalize_entry(history_file, entry) for entry in entries] if HISTORY_EXTERNALIZE_ON_WRITE else entries
+    try:
+        previous_bytes = stream_append(history_file, stored)
+    except json.JSONDecodeError:
+        path = Path(history_file)
+        backup_path = path.with_suffix(".json.bak")
+        os.rename(path, backup_path)
+        print(f"Warning: Could not decode {history_file}. Backed up corrupted file to {backup_path}.")
+        previous_bytes = stream_append(history_file, stored)
+
+    # Keep the rolling trend statistics in step; they can always be rebuilt, so never fail the append
+    try:
+        trends.record_entries(history_file, entries, previous_bytes)
+    except Exception as e:
+        print(f"Warning: Could not update trend statistics for {history_file}: {e}")
 
 if __name__ == "__main__":
     # Debug test
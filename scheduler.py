@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import re
+import statistics
+import time
+import wave
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from audio_utils import get_wav_duration, probe_media
+from config import (
+    MEDIA_DURATION_CACHE_FILE, SCHEDULE_PRIORITY_TAGS, SCHEDULE_DEFAULT_RTF,
+    SCHEDULE_FILE_OVERHEAD_SECONDS, TIMINGS_LOG_FILE
+)
+from output_manager import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("shortest", "oldest", "priority", "name")
+# Transcripts take no decoding or Whisper time; they are scheduled as zero-length
+TEXT_EXTS = {".txt", ".md", ".text"}
+_TAG = re.compile(r"\[([A-Za-z0-9_-]+)\]")
+# Only the tail of the timings log is read for the real-time factor
+_TIMINGS_TAIL_BYTES = 64 * 1024
+
+
+def load_duration_cache(path: str = MEDIA_DURATION_CACHE_FILE) -> Dict[str, Dict[str, float]]:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable duration cache {path}: {e}")
+        return {}
+
+
+def media_duration(file_path: str, cache: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """
+    Audio duration of a media file in seconds (None when it cannot be probed). Results are
+    kept in `cache` under the absolute path, valid while the file's size and mtime are unchanged.
+    """
+    path = os.path.abspath(file_path)
+    if Path(path).suffix.lower() in TEXT_EXTS:
+        return 0.0
+    st = os.stat(path)
+    cached = cache.get(path)
+    if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime:
+        return cached["duration"]
+    probe = probe_media(path)
+    duration = probe["duration"] if probe is not None and probe["duration"] else None
+    if duration is None and Path(path).suffix.lower() == ".wav":
+        # No ffprobe on PATH: PCM WAVs still have their length in the header
+        try:
+            duration = get_wav_duration(path)
+        except (wave.Error, EOFError, OSError):
+            duration = None
+    if duration is not None:
+        cache[path] = {"size": st.st_size, "mtime": st.st_mtime, "duration": duration}
+    return duration
+
+
+def priority_rank(file_path: str) -> int:
+    """Best SCHEDULE_PRIORITY_TAGS rank among the "[tag]"s in the file name; untagged files rank last."""
+    ranks = [SCHEDULE_PRIORITY_TAGS[tag.lower()] for tag in _TAG.findall(Path(file_path).name) if tag.lower() in SCHEDULE_PRIORITY_TAGS]
+    return min(ranks) if ranks else len(SCHEDULE_PRIORITY_TAGS)
+
+
+def recent_real_time_factor(log_file: str = TIMINGS_LOG_FILE, samples: int = 50) -> float:
+    """Median real-time factor of the last `samples` files in the timings log (SCHEDULE_DEFAULT_RTF without any)."""
+    if not os.path.exists(log_file):
+        return SCHEDULE_DEFAULT_RTF
+    size = os.path.getsize(log_file)
+    with open(log_file, "rb") as f:
+        f.seek(max(0, size - _TIMINGS_TAIL_BYTES))
+        lines = f.read().splitlines()
+    if size > _TIMINGS_TAIL_BYTES:
+        lines = lines[1:]  # most likely cut mid-line
+    factors = []
+    for line in reversed(lines):
+        try:
+            rtf = json.loads(line).get("real_time_factor")
+        except ValueError:
+            continue
+        if rtf:
+            factors.append(rtf)
+            if len(factors) == samples:
+                break
+    return statistics.median(factors) if factors else SCHEDULE_DEFAULT_RTF
+
+
+class BatchSchedule:
+    """
+    The files of a batch run in the order `policy` picks, with their probed durations and the
+    estimated processing time of each, so the run can report when each file and the whole
+    batch should be done. Files whose duration cannot be probed go after the others (by size).
+    """
+
+    def __init__(self, files: Sequence, policy: str, cache_file: str = MEDIA_DURATION_CACHE_FILE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown schedule policy '{policy}'. Expected one of {POLICIES}.")
+        self.policy = policy
+        cache = load_duration_cache(cache_file)
+        before = json.dumps(cache, sort_keys=True)
+        self.durations: Dict[str, Optional[float]] = {str(f): media_duration(str(f), cache) for f in files}
+        if cache_file and json.dumps(cache, sort_keys=True) != before:
+            atomic_write_json(cache_file, cache)
+
+        def shortest(f):
+            duration = self.durations[str(f)]
+            return (duration is None, duration or 0.0, os.path.getsize(f))
+
+        if policy == "shortest":
+            key = shortest
+        elif policy == "oldest":
+            key = lambda f: os.path.getmtime(f)
+        elif policy == "priority":
+            key = lambda f: (priority_rank(str(f)), shortest(f))
+        else:
+            key = lambda f: Path(f).name.lower()
+        self.files: List = sorted(files, key=key)
+        self.rtf = recent_real_time_factor()
+
+    def estimated_seconds(self, file) -> float:
+        """Expected processing time of one file (the median duration stands in for unprobed ones)."""
+        duration = self.durations[str(file)]
+        if duration is None:
+            known = [d for d in self.durations.values() if d]
+            duration = statistics.median(known) if known else 0.0
+        return duration * self.rtf + SCHEDULE_FILE_OVERHEAD_SECONDS
+
+    def remaining_seconds(self, start_index: int = 0) -> float:
+        return sum(self.estimated_seconds(f) for f in self.files[start_index:])
+
+    def plan_lines(self, limit: int = 20) -> List[str]:
+        """One line per file (the first `limit`): position, name, audio length and estimated completion time."""
+        clock = datetime.now()
+        lines = []
+        for i, f in enumerate(self.files[:limit], 1):
+            clock += timedelta(seconds=self.estimated_seconds(f))
+            duration = self.durations[str(f)]
+            length = time.strftime("%H:%M:%S", time.gmtime(duration)) if duration is not None else "unknown"
+            lines.append(f"  {i:>3}. {Path(f).name} ({length}) - done ~{clock:%H:%M:%S}")
+        if len(self.files) > limit:
+            lines.append(f"  ... and {len(self.files) - limit} more")
+        return lines
+
+    def summary(self) -> str:
+        total_audio = sum(d for d in self.durations.values() if d)
+        finish = datetime.now() + timedelta(seconds=self.remaining_seconds())
+        return (
+            f"Scheduled {len(self.files)} file(s) by '{self.policy}', {total_audio / 60:.1f} min of audio; "
+            f"estimated completion {finish:%H:%M:%S} (real-time factor {self.rtf:.2f})"
+        )
+
+    def progress_line(self, index: int) -> str:
+        """Shown before file `index` (0-based) starts: batch position and re-based completion estimate."""
+        finish = datetime.now() + timedelta(seconds=self.remaining_seconds(index))
+        return f"[{index + 1}/{len(self.files)}] batch done ~{finish:%H:%M:%S}"
@@ -14,21 +14,47 @@ import json
 
 import hashlib
 
+import threading
+
+from contextlib import nullcontext
+
+from concurrent.futures import ProcessPoolExecutor
+
 from datetime import datetime
 
-from output_manager import append_to_metrics, get_file_id, is_file_processed
+from output_manager import append_to_metrics, append_many_to_metrics, get_file_id, is_file_processed, load_history_index
+
+import daemon
+
+import metrics_exporter
+
+from watcher import watch_directory
+
+from config import WATCH_MAX_WORKERS, TIMINGS_LOG_FILE, TEXT_BATCH_JOBS, SCHEDULE_POLICY
+
+from scheduler import POLICIES, BatchSchedule
+
+from job_queue import JobQueue
+
+from cancellation import check_cancelled
+
+from batch_manifest import BatchManifest, UnfinishedBatchError, TRANSCRIBING, ANALYZING, RECORDING, DONE, FAILED
+
+from instrumentation import PipelineTimer, optional_stage
+
+from llm_payload import build_payload, render_payload
+
+import thread_budget
 
 import re
 
 import warnings
 
-import whisper
-
 import nltk
 
 import matplotlib.pyplot as plt
 
-import textstat
+import syllable_service
 
 # --- Constants ---
 
@@ -196,7 +222,14 @@ def format_text_without_timestamps(result):
 
     return '\n'.join(lines)
 
-def transcribe_video(video_path, model, verbose):
+def load_whisper_model(model_name):
+    """Loads an openai-whisper model. Imported lazily so daemon clients never pay the torch import."""
+    import torch
+    import whisper
+    torch.set_num_threads(thread_budget.torch_threads())
+    return whisper.load_model(model_name)
+
+def transcribe_video(video_path, model, verbose, timer=None):
 
     """Transcribes a single video file and returns the text content."""
 
@@ -208,6 +241,10 @@ def transcribe_video(video_path, model, verbose):
 
         result = model.transcribe(video_path)
 
+        if timer is not None and result.get('segments'):
+
+            timer.set_audio_duration(result['segments'][-1]['end'])
+
         return format_text_without_timestamps(result)
 
     except Exception as e:
@@ -256,7 +293,7 @@ def calculate_readability(text_content):
 
     """Calculates the Flesch-Kincaid grade level of the text."""
 
-    return textstat.flesch_kincaid_grade(text_content)
+    return syllable_service.flesch_kincaid_grade(text_content)
 
 def display_frequency_graph(frequency_data, filename, show=False):
 
@@ -451,9 +488,13 @@ def get_llm_prompt_template():
     )
 
 
-def process_and_analyze_file(file_path, model, transcript_path, is_text_file, verbose):
+def process_and_analyze_file(file_path, model, transcript_path, is_text_file, verbose, timer=None, checkpoint=None, progress=None):
     """
     Processes a single file (video or text) and outputs the analysis.
+    Per-stage timings are recorded on `timer` (an instrumentation.PipelineTimer) when given.
+    With a batch `checkpoint` (batch_manifest.FileCheckpoint) the transcript of a media file is
+    kept until the file is done, so a resumed run goes straight to the text analysis.
+    A `progress` callback is told when each stage starts (openai-whisper reports no positions).
     Returns: dict with analysis results or None on error
     """
     filename = os.path.basename(file_path)
@@ -468,8 +509,18 @@ def process_and_analyze_file(file_path, model, transcript_path, is_text_file, ve
         except Exception as e:
             print(f"Error reading text file: {e}", file=sys.stderr)
             return None
+    elif checkpoint is not None and checkpoint.load("transcript"):
+        transcript_text = checkpoint.load("transcript")
+        if verbose:
+            print("Reusing checkpointed transcript.")
     else:
-        transcript_text = transcribe_video(file_path, model, verbose)
+        if checkpoint is not None:
+            checkpoint.mark(TRANSCRIBING)
+        # openai-whisper decodes through ffmpeg internally, so decode time is part of this stage
+        with optional_stage(timer, "transcription", progress):
+            transcript_text = transcribe_video(file_path, model, verbose, timer)
+        if transcript_text and checkpoint is not None:
+            checkpoint.save("transcript", transcript_text)
         if transcript_text and transcript_path:
             with open(transcript_path, "w", encoding="utf-8") as f:
                 f.write(transcript_text)
@@ -479,7 +530,10 @@ def process_and_analyze_file(file_path, model, transcript_path, is_text_file, ve
         print("Error: No text to analyze.", file=sys.stderr)
         return None
     
-    analysis_results = perform_speech_analysis(transcript_text)
+    if checkpoint is not None:
+        checkpoint.mark(ANALYZING)
+    with optional_stage(timer, "text_analysis", progress):
+        analysis_results = perform_speech_analysis(transcript_text)
     
     final_json_output = {
         "transcript": transcript_text,
@@ -488,6 +542,89 @@ def process_and_analyze_file(file_path, model, transcript_path, is_text_file, ve
     
     return final_json_output
 
+def analyze_text_file(file_path):
+    """
+    Process-pool worker for text batches: analyzes one transcript without any Whisper model.
+    Returns (analysis results or None, instrumentation summary, syllable counts made here).
+    Pool workers exit without running atexit, so the parent saves their syllable counts.
+    """
+    timer = PipelineTimer(os.path.basename(file_path))
+    try:
+        analysis_results = process_and_analyze_file(file_path, None, None, True, False, timer)
+    except Exception as e:
+        # One unreadable transcript must not take down the rest of the batch
+        print(f"Error analyzing '{file_path}': {e}", file=sys.stderr)
+        analysis_results = None
+    return analysis_results, timer.summary(), syllable_service.take_new_counts()
+
+def analyze_text_batch(file_paths, history_file, jobs=None, store_timings=False, timings=False, manifest=None):
+    """
+    Analyzes many transcripts in parallel over a process pool and records them all in one
+    history write. Files already in the history (or repeated in the batch) are skipped.
+    The outcome of every file is recorded in the batch `manifest` when given.
+    Returns [(filename, analysis_results)] for the files that were analyzed.
+    """
+    known = load_history_index(history_file)
+    pending = []
+    for file_path in file_paths:
+        fname, file_id = os.path.basename(file_path), get_file_id(file_path)
+        if fname in known or file_id in known:
+            print(f"Skipping '{fname}' (already processed with ID: {file_id}).")
+            if manifest is not None: manifest.mark(file_path, DONE)
+            continue
+        known.update((fname, file_id))
+        pending.append((file_path, fname, file_id))
+    if not pending:
+        return []
+
+    workers = max(1, min(jobs or thread_budget.available_cores(), len(pending)))
+    print(f"\nAnalyzing {len(pending)} transcript(s) with {workers} worker(s)...")
+    paths = [file_path for file_path, _, _ in pending]
+    if manifest is not None:
+        for file_path in paths: manifest.mark(file_path, ANALYZING)
+    # Workers inherit the BLAS limits from the environment, so set them before the pool starts;
+    # media files analyzed afterwards get the run's own budget back
+    with thread_budget.configured(workers):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(analyze_text_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+        else:
+            outcomes = [analyze_text_file(file_path) for file_path in paths]
+
+    entries, analyzed = [], []
+    for (file_path, fname, file_id), (analysis_results, summary, syllable_counts) in zip(pending, outcomes):
+        syllable_service.merge_counts(syllable_counts)
+        metrics_exporter.observe_file("speech_analysis", summary, analysis_results is not None)
+        if analysis_results is None:
+            print(f"Error: Could not analyze '{fname}'.", file=sys.stderr)
+            if manifest is not None: manifest.mark(file_path, FAILED, error="analysis failed")
+            continue
+        if timings:
+            timer = PipelineTimer(fname)
+            timer.merge(summary)
+            timer.emit(TIMINGS_LOG_FILE)
+        entries.append((fname, file_id, analysis_results, summary if store_timings else None))
+        analyzed.append((fname, analysis_results))
+
+    append_many_to_metrics(history_file, entries)
+    if manifest is not None:
+        for file_path, _, _ in pending:
+            if manifest.state(file_path) != FAILED: manifest.mark(file_path, DONE)
+    return analyzed
+
+def load_model_or_exit(model_name, quiet, timings=False):
+    """Loads the Whisper model for in-process runs, exiting with an error if it cannot be loaded."""
+    if not quiet: print(f"Loading Whisper model '{model_name}'...")
+    timer = PipelineTimer()
+    try:
+        with timer.stage("model_load"):
+            model = load_whisper_model(model_name)
+        if timings: timer.emit(TIMINGS_LOG_FILE)
+        return model
+    except Exception as e:
+        print(f"Error loading Whisper model: {e}", file=sys.stderr)
+        sys.exit(1)
+
 def main():
 
     """Main function to handle command-line arguments and run the program."""
@@ -504,7 +641,7 @@ def main():
 
     # Positional argument (now optional)
 
-    parser.add_argument('file', nargs='?', help='Video or text file to analyze')
+    parser.add_argument('file', nargs='?', help='Video or text file (or a folder of them) to analyze')
 
     
 
@@ -522,10 +659,39 @@ def main():
     parser.add_argument('--quiet', '-q', action='store_true',
                        help='Disable verbose output (default: False)')
 
+    parser.add_argument('--watch', '-w', action='store_true',
+                       help='Keep running and analyze new files as they land in resources/speech_analysis')
+    parser.add_argument('--workers', type=int, default=WATCH_MAX_WORKERS,
+                       help=f'Concurrent analyses in --watch mode (default: {WATCH_MAX_WORKERS})')
+    parser.add_argument('--timings', action='store_true',
+                       help=f'Append per-stage timing/resource JSON lines to {TIMINGS_LOG_FILE}')
+    parser.add_argument('--store-timings', action='store_true',
+                       help='Also store per-stage timings in each history entry')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                       help='Serve Prometheus metrics on 127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-file', type=str, default=None,
+                       help='Dump Prometheus metrics to this file after every analyzed file')
+    parser.add_argument('--text-only', action='store_true',
+                       help='Only analyze .txt/.md transcripts and never load Whisper (e.g. speech_analysis transcripts/ --text-only)')
+    parser.add_argument('--jobs', '-j', type=int, default=TEXT_BATCH_JOBS,
+                       help='Parallel processes for batches of text files (default: all CPU cores)')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='Always run in-process, even if an analysis daemon is running')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted batch from its manifest (<history>.batch.json), skipping finished files and transcriptions')
+    parser.add_argument('--new-batch', action='store_true',
+                       help='Start over even though the manifest still has unfinished files from an interrupted batch')
+    parser.add_argument('--schedule', choices=POLICIES, default=SCHEDULE_POLICY,
+                       help=f'Batch order (default: {SCHEDULE_POLICY}; shortest = shortest recordings first)')
+    parser.add_argument('--queue', type=str, default=None,
+                       help='Shared queue directory: run the same command on several machines and each file is analyzed once')
+
     parser.add_argument('--llm-prompt', action='store_true',
 
                        help='Print LLM prompt template for speech improvement')
 
+    parser.add_argument('--llm-payload', action='store_true',
+                       help='Print the LLM prompt plus a token-budgeted summary of recent --history sessions')
     parser.add_argument('--version', action='version', version='%(prog)s 0.0.2')
 
     
@@ -542,19 +708,34 @@ def main():
 
         sys.exit(0)
 
+    if args.llm_payload:
+        print(render_payload(build_payload(args.history, instructions=get_llm_prompt_template())))
+        sys.exit(0)
+
     
 
     # Batch Processing
     valid_exts = {'.mp4', '.mov', '.mkv', '.wav', '.mp3', '.m4a', '.txt', '.md', '.text'}
+    if args.text_only:
+        valid_exts = {'.txt', '.md', '.text'}
+    default_dir = os.path.join("resources", "speech_analysis")
     files_to_process = []
-    if args.file:
+    if args.file and os.path.isdir(args.file):
+        default_dir, args.file = args.file, None
+        if not args.watch: print(f"Scanning directory: {default_dir}")
+    elif not args.file and not args.watch:
+        print(f"No explicit file provided. Scanning directory: {default_dir}")
+    if args.watch:
+        pass
+    elif args.file:
         if not os.path.exists(args.file):
             print(f"Error: File '{args.file}' not found", file=sys.stderr)
             sys.exit(1)
+        if args.text_only and not detect_file_type(args.file):
+            print(f"Error: --text-only only accepts transcripts, got '{args.file}'", file=sys.stderr)
+            sys.exit(1)
         files_to_process.append(args.file)
     else:
-        default_dir = os.path.join("resources", "speech_analysis")
-        print(f"No explicit file provided. Scanning directory: {default_dir}")
         if os.path.exists(default_dir) and os.path.isdir(default_dir):
             for f in os.listdir(default_dir):
                 f_path = os.path.join(default_dir, f)
@@ -565,39 +746,168 @@ def main():
             sys.exit(0)
 
     if args.quiet: warnings.filterwarnings('ignore')
+    thread_budget.configure(args.workers if args.watch else 1)
     setup_nltk()
 
-    if not args.quiet: print(f"Loading Whisper model '{args.model}'...")
-    try:
-        model = whisper.load_model(args.model)
-    except Exception as e:
-        print(f"Error loading Whisper model: {e}", file=sys.stderr)
-        sys.exit(1)
+    # Per-file progress and transcript checkpoints, so an interrupted batch can be resumed
+    manifest = None
+    # A shared --queue tracks claims and completion across machines instead of a per-machine manifest,
+    # and a one-off single-file run neither needs nor touches it
+    if not args.watch and not args.queue and len(files_to_process) > 1:
+        try:
+            manifest = BatchManifest.for_history(args.history, resume=args.resume, new_batch=args.new_batch)
+        except UnfinishedBatchError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        manifest.add(files_to_process)
+        if args.resume:
+            finished = [f for f in files_to_process if manifest.state(f) == DONE]
+            if finished: print(f"Resuming batch: {len(finished)} of {len(files_to_process)} file(s) already done.")
+            files_to_process = [f for f in files_to_process if f not in finished]
+
+    if args.metrics_port or args.metrics_file:
+        metrics_exporter.track_queue(default_dir, valid_exts, args.history)
+    if args.metrics_port:
+        metrics_exporter.start_http_server(args.metrics_port)
+
+    # Thin-client mode: a running daemon already holds warm models
+    # Transcripts never need Whisper, so only media inputs load a model (or look for the daemon)
+    text_files = [f for f in files_to_process if detect_file_type(f)]
+    needs_model = (args.watch and not args.text_only) or len(text_files) < len(files_to_process)
+    use_daemon = needs_model and not args.no_daemon and daemon.is_daemon_running()
+    model = None
+    if use_daemon:
+        if not args.quiet: print("Using running analysis daemon (models already warm).")
+    elif needs_model:
+        model = load_model_or_exit(args.model, args.quiet, args.timings)
 
     graphs_to_show = []
-    for current_file in files_to_process:
+    # Watch workers share the one openai-whisper model, which must not be loaded twice or run concurrently
+    model_lock = threading.Lock()
+
+    def analyze_one(current_file, cancel=None):
+        """
+        Analyzes and records one file, feeding the metrics exporter. Returns True if it is now in the history.
+        A `cancel` token (from a queue claim) is checked before recording.
+        """
+        timer = PipelineTimer(os.path.basename(current_file))
+        succeeded = False
+        try:
+            succeeded = record_one(current_file, timer, cancel)
+        finally:
+            if succeeded is not None:
+                metrics_exporter.observe_file("speech_analysis", timer.summary(), bool(succeeded))
+                if args.metrics_file: metrics_exporter.dump_to_file(args.metrics_file)
+        return succeeded is not False
+
+    def record_one(current_file, timer, cancel=None):
+        """Analyzes and records one file. Returns True on success, False on failure, None if already in the history."""
+        nonlocal use_daemon, model
         file_id = get_file_id(current_file)
         fname = os.path.basename(current_file)
+        # The transcript depends on the Whisper model, so each model gets its own checkpoint
+        checkpoint = manifest.checkpoint(current_file, model=args.model) if manifest is not None else None
         if is_file_processed(args.history, fname, file_id):
             print(f"Skipping '{fname}' (already processed with ID: {file_id}).")
-            continue
+            if checkpoint is not None: checkpoint.mark(DONE)
+            return None
             
         print(f"\nProcessing {fname}...")
         is_text = detect_file_type(current_file)
         transcript_path = setup_transcript_path(current_file)
         
-        analysis_results = process_and_analyze_file(
-            current_file, model, transcript_path,
-            is_text, not args.quiet
-        )
-        if analysis_results is None: continue
+        analysis_results = None
+        if use_daemon:
+            payload = {
+                "path": os.path.abspath(current_file),
+                "model": args.model,
+                "transcript_path": os.path.abspath(transcript_path) if transcript_path else None,
+                "is_text": is_text,
+                "verbose": not args.quiet
+            }
+            if checkpoint is not None:
+                # The daemon checkpoints the transcript itself; the manifest only sees the file being analyzed
+                checkpoint.mark(ANALYZING)
+                payload["checkpoint_dir"] = str(checkpoint.directory.resolve())
+            try:
+                analysis_results = daemon.request_analysis("speech_analysis", payload, timer=timer)
+            except RuntimeError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                if checkpoint is not None: checkpoint.mark(FAILED, error=str(e))
+                return False
+            if analysis_results is None:
+                print("Analysis daemon went away, continuing in-process.", file=sys.stderr)
+                use_daemon = False
+
+        if not use_daemon:
+            with (nullcontext() if is_text else model_lock):
+                if model is None and not is_text and not (checkpoint is not None and checkpoint.load("transcript")):
+                    model = load_model_or_exit(args.model, args.quiet, args.timings)
+                analysis_results = process_and_analyze_file(
+                    current_file, model, transcript_path,
+                    is_text, not args.quiet, timer, checkpoint
+                )
+        if analysis_results is None:
+            if checkpoint is not None: checkpoint.mark(FAILED, error="no text to analyze")
+            return False
         
-        append_to_metrics(args.history, fname, file_id, analysis_results)
+        check_cancelled(cancel)
+        if checkpoint is not None: checkpoint.mark(RECORDING)
+        with timer.stage("history_write"):
+            # The entry cannot time its own write: the stored summary stops before history_write
+            append_to_metrics(
+                args.history, fname, file_id, analysis_results,
+                instrumentation=timer.summary() if args.store_timings else None
+            )
+        if checkpoint is not None: checkpoint.mark(DONE)
+        if args.timings: timer.emit(TIMINGS_LOG_FILE)
         
         if not args.quiet: print_verbose_output(analysis_results, fname)
         else: print_minimal_output(fname, args.history)
         
         if args.graph: graphs_to_show.append((analysis_results['word_frequency'], fname))
+        return True
+
+    if args.watch:
+        # Graphs would block the watch loop, so --graph is ignored here
+        args.graph = False
+        print(f"Watching '{default_dir}' for new recordings (Ctrl+C to stop)...")
+        watch_directory(default_dir, valid_exts, analyze_one, args.history, max_workers=args.workers)
+        sys.exit(0)
+
+    if args.queue:
+        # Every file (transcripts included) is claimed one by one, so the process-pool text batch is skipped
+        if len(files_to_process) > 1:
+            plan = BatchSchedule(files_to_process, args.schedule)
+            files_to_process = plan.files
+            print(plan.summary())
+        job_queue = JobQueue(args.queue)
+        print(f"Draining {len(files_to_process)} file(s) through queue '{args.queue}' as {job_queue.node}...")
+        counts = job_queue.drain(files_to_process, analyze_one)
+        print(f"Queue drained: {counts['analyzed']} analyzed here, {counts['by_other_nodes']} by other nodes, {counts['failed']} failed attempt(s).")
+        for freq, fname in graphs_to_show:
+            display_frequency_graph(freq, fname, show=True)
+        sys.exit(0)
+
+    if len(text_files) > 1:
+        for fname, analysis_results in analyze_text_batch(text_files, args.history, args.jobs, args.store_timings, args.timings, manifest):
+            if not args.quiet: print_verbose_output(analysis_results, fname)
+            else: print_minimal_output(fname, args.history)
+            if args.graph: graphs_to_show.append((analysis_results['word_frequency'], fname))
+        if args.metrics_file: metrics_exporter.dump_to_file(args.metrics_file)
+        files_to_process = [f for f in files_to_process if f not in text_files]
+
+    plan = None
+    if len(files_to_process) > 1:
+        # Probe durations up front (cached) and order the batch, e.g. short clips first
+        plan = BatchSchedule(files_to_process, args.schedule)
+        files_to_process = plan.files
+        print(plan.summary())
+        if not args.quiet: print("\n".join(plan.plan_lines()))
+
+    for index, current_file in enumerate(files_to_process):
+        if plan is not None: print(plan.progress_line(index))
+        analyze_one(current_file)
 
     for freq, fname in graphs_to_show:
         display_frequency_graph(freq, fname, show=True)
@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+
+from config import SYLLABLE_CACHE_FILE, HISTORY_LOCK_LEASE_SECONDS
+from file_lease import Lease
+
+logger = logging.getLogger(__name__)
+
+# Two estimators are memoized side by side:
+#   "syllables" - the `syllables` package, used for speech rate (transcription, metrics_timeline)
+#   "textstat"  - textstat's CMUdict/Pyphen counts, used for Flesch-Kincaid readability
+# They disagree on plenty of words, so each keeps its own memo to leave existing scores unchanged.
+ESTIMATORS = ("syllables", "textstat")
+
+_lock = threading.Lock()
+_memo: Dict[str, Dict[str, int]] = {name: {} for name in ESTIMATORS}
+# Words counted in this process since the last take_new_counts(), for process-pool workers
+# (which exit without running atexit) to hand back to the parent
+_new: Dict[str, Dict[str, int]] = {name: {} for name in ESTIMATORS}
+_loaded = False
+_dirty = False
+
+
+def _estimate(word: str, estimator: str) -> int:
+    if estimator == "syllables":
+        import syllables
+        return syllables.estimate(word)
+    if estimator == "textstat":
+        import textstat
+        return textstat.syllable_count(word)
+    raise ValueError(f"Unknown syllable estimator '{estimator}'. Expected one of {ESTIMATORS}.")
+
+
+def load_memo(path: str = SYLLABLE_CACHE_FILE):
+    """Merges the persistent per-word memo from `path` (if any) into the in-process memo."""
+    global _loaded
+    with _lock:
+        _loaded = True
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable syllable cache {path}: {e}")
+            return
+        for estimator, counts in stored.items():
+            if estimator in _memo:
+                _memo[estimator].update(counts)
+        logger.debug(f"Loaded syllable cache with {sum(len(c) for c in stored.values())} words from {path}")
+
+
+def save_memo(path: str = SYLLABLE_CACHE_FILE):
+    """
+    Writes the memo to `path` if new words were counted since the last save. Under a lease on
+    `<path>.lock`, words other processes saved in the meantime are merged in first and the file
+    is replaced atomically from a uniquely named temp file, so concurrent savers lose nothing.
+    """
+    global _dirty
+    if not path:
+        return
+    with _lock:
+        if not _dirty:
+            return
+        snapshot = {name: dict(counts) for name, counts in _memo.items()}
+        _dirty = False
+    # Savers in other processes wait, so none of them drops the words another just saved
+    tmp_path = None
+    try:
+        with Lease(f"{path}.lock", HISTORY_LOCK_LEASE_SECONDS).hold():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                stored = {}
+            for estimator, counts in stored.items():
+                if estimator in snapshot:
+                    snapshot[estimator] = {**counts, **snapshot[estimator]}
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)), prefix=f".{os.path.basename(path)}.", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump(snapshot, f, separators=(",", ":"), sort_keys=True)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save syllable cache to {path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def take_new_counts() -> Dict[str, Dict[str, int]]:
+    """The words counted since the last call (per estimator), for a pool worker to return to its parent."""
+    with _lock:
+        new = {name: dict(counts) for name, counts in _new.items() if counts}
+        for counts in _new.values():
+            counts.clear()
+    return new
+
+
+def merge_counts(counts: Dict[str, Dict[str, int]]):
+    """Adds counts made in another process (see take_new_counts); they are saved with this process's memo."""
+    global _dirty
+    _ensure_loaded()
+    with _lock:
+        for estimator, words in counts.items():
+            if estimator in _memo and words:
+                _memo[estimator].update(words)
+                _dirty = True
+
+
+def _ensure_loaded():
+    if not _loaded:
+        load_memo()
+        atexit.register(save_memo)
+
+
+def count_word(word: str, estimator: str = "syllables") -> int:
+    """Syllable count for a single word, memoized per estimator. Empty words count as 0."""
+    global _dirty
+    if not word:
+        return 0
+    _ensure_loaded()
+    if estimator not in _memo:
+        raise ValueError(f"Unknown syllable estimator '{estimator}'. Expected one of {ESTIMATORS}.")
+    memo = _memo[estimator]
+    count = memo.get(word)
+    if count is None:
+        count = _estimate(word, estimator)
+        with _lock:
+            memo[word] = count
+            _new[estimator][word] = count
+            _dirty = True
+    return count
+
+
+def count_words(words: Iterable[str], estimator: str = "syllables") -> np.ndarray:
+    """
+    Per-word syllable counts aligned with `words` (e.g. a word timeline), as an int32 array.
+    Each distinct word is estimated once; repeats are a dict lookup.
+    """
+    words = list(words)
+    counts = {w: count_word(w, estimator) for w in set(words)}
+    return np.array([counts[w] for w in words], dtype=np.int32)
+
+
+def flesch_kincaid_grade(text: str) -> float:
+    """
+    Flesch-Kincaid grade level, identical to textstat.flesch_kincaid_grade but with the
+    syllable total summed from the per-word memo instead of re-counting the whole text.
+    textstat strips punctuation character by character, so counting each whitespace token
+    on its own gives exactly the same total as counting the full text.
+    """
+    import textstat
+    word_count = textstat.lexicon_count(text)
+    sentence_count = textstat.sentence_count(text)
+    if word_count == 0 or sentence_count == 0:
+        return 0.0
+    syllables_per_word = int(count_words(text.split(), "textstat").sum()) / word_count
+    if syllables_per_word == 0:
+        return 0.0
+    return (0.39 * (word_count / sentence_count)) + (11.8 * syllables_per_word) - 15.59
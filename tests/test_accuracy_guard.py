@@ -0,0 +1,159 @@
+import json
+import wave
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bench import accuracy_guard
+from bench.accuracy_guard import Mode, allowed_drift, drift_rows, tracked_metrics
+
+SPEECH = {"speech_rate_sps": 4.0, "word_count": 120, "weak_words": [{"word": "um"}] * 3, "mean_hnr": 10.0}
+SILENCE = {"speech_rate_sps": 0.0, "word_count": 0, "weak_words": [], "mean_hnr": 10.0}
+
+
+def test_tracked_metrics_counts_lists_and_skips_missing_values():
+    result = {"word_count": 12, "weak_words": [{"word": "a"}, {"word": "b"}], "mean_hnr": None, "transcript": "a b"}
+    assert tracked_metrics(result) == {"word_count": 12.0, "weak_words": 2.0}
+
+
+def test_allowed_drift_is_the_larger_of_absolute_and_relative(monkeypatch):
+    monkeypatch.setitem(accuracy_guard.ACCURACY_TOLERANCES, "word_count", (2, 0.03))
+    assert allowed_drift("word_count", 10) == 2
+    assert allowed_drift("word_count", 1000) == pytest.approx(30)
+    assert allowed_drift("word_count", -1000) == pytest.approx(30)
+
+
+def test_drift_rows_compare_only_shared_fixtures_and_metrics():
+    reference = {
+        "a": {"name": "a.m4a", "metrics": {"word_count": 100.0, "mean_hnr": 10.0}},
+        "b": {"name": "b.m4a", "metrics": {"word_count": 50.0}},
+    }
+    candidate = {"a": {"name": "a.m4a", "metrics": {"word_count": 110.0}}}
+    rows = drift_rows(reference, candidate)
+    assert rows == [{
+        "fixture": "a.m4a", "metric": "word_count", "reference": 100.0, "value": 110.0,
+        "delta": 10.0, "allowed": 3.0, "ok": False,
+    }]
+    candidate["a"]["metrics"]["word_count"] = 102.0
+    assert drift_rows(reference, candidate)[0]["ok"]
+
+
+def write_wav(path: Path, rate: int = 16000):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\0\0" * (rate // 10))
+
+
+def stub_mode(results_by_name, calls=None):
+    """A Mode returning canned pipeline results, looked up by fixture file name."""
+    def run(media_files, models):
+        if calls is not None:
+            calls.append([Path(path).name for path in media_files])
+        return {path: results_by_name[Path(path).name] for path in media_files}
+    return Mode("stub", lambda: {}, run)
+
+
+@pytest.fixture
+def guard(tmp_path, monkeypatch):
+    """The guard CLI on two fixtures with stubbed dependencies: (invoke, golden file, report file)."""
+    fixtures = tmp_path / "recordings"
+    fixtures.mkdir()
+    write_wav(fixtures / "a.wav")
+    write_wav(fixtures / "b.wav", rate=44100)
+    golden, report = tmp_path / "accuracy.json", tmp_path / "report.json"
+    monkeypatch.setattr(accuracy_guard, "missing_dependencies", lambda: None)
+    monkeypatch.setattr(accuracy_guard, "BASELINE", stub_mode({"a.wav": SPEECH, "b.wav": SPEECH}))
+
+    def invoke(*args):
+        return CliRunner().invoke(accuracy_guard.app, [
+            "--fixtures", str(fixtures), "--golden", str(golden), "--output", str(report), *args
+        ])
+
+    return invoke, golden, report
+
+
+def test_missing_dependencies_fail_unless_skipping_is_allowed(guard, monkeypatch):
+    invoke, _, _ = guard
+    monkeypatch.setattr(accuracy_guard, "missing_dependencies", lambda: "ffmpeg binary not on PATH")
+    assert invoke().exit_code == 1
+    assert invoke("--allow-skip").exit_code == 0
+
+
+def test_no_recordings_fail(tmp_path):
+    (tmp_path / "empty").mkdir()
+    result = CliRunner().invoke(accuracy_guard.app, ["--fixtures", str(tmp_path / "empty"), "--allow-skip"])
+    assert result.exit_code == 1
+
+
+def test_golden_outputs_are_required_then_checked(guard, monkeypatch):
+    invoke, golden, _ = guard
+    monkeypatch.setattr(accuracy_guard, "MODES", {"same": stub_mode({"a.wav": SPEECH, "b.wav": SPEECH})})
+    result = invoke("--mode", "same")
+    assert result.exit_code == 1
+    assert "No golden outputs" in result.output
+
+    assert invoke("--mode", "same", "--update-golden").exit_code == 0
+    assert len(json.loads(golden.read_text())["results"]) == 2
+    assert invoke("--mode", "same").exit_code == 0
+
+    # The baseline itself drifting from the golden outputs fails as well
+    monkeypatch.setattr(accuracy_guard, "BASELINE", stub_mode({"a.wav": SPEECH, "b.wav": {**SPEECH, "word_count": 150}}))
+    assert invoke("--mode", "same").exit_code == 1
+
+
+def test_mode_drift_and_errors_fail(guard, monkeypatch):
+    invoke, _, report = guard
+    drifted = stub_mode({"a.wav": SPEECH, "b.wav": {**SPEECH, "speech_rate_sps": 4.5}})
+
+    def broken(media_files, models):
+        raise RuntimeError("model failed to load")
+
+    monkeypatch.setattr(accuracy_guard, "MODES", {"drifted": drifted, "broken": Mode("broken", lambda: {}, broken)})
+    assert invoke("--mode", "drifted", "--update-golden").exit_code == 1
+    rows = json.loads(report.read_text())["modes"]["drifted"]["drift"]
+    assert [(row["fixture"], row["metric"]) for row in rows if not row["ok"]] == [("b.wav", "speech_rate_sps")]
+    assert invoke("--mode", "broken", "--update-golden").exit_code == 1
+
+
+def test_silent_fixtures_fail_and_are_never_recorded(guard, monkeypatch):
+    invoke, golden, _ = guard
+    monkeypatch.setattr(accuracy_guard, "BASELINE", stub_mode({"a.wav": SILENCE, "b.wav": SILENCE}))
+    monkeypatch.setattr(accuracy_guard, "MODES", {"same": stub_mode({"a.wav": SILENCE, "b.wav": SILENCE})})
+    result = invoke("--mode", "same", "--update-golden")
+    assert result.exit_code == 1
+    assert "No fixture has speech" in result.output
+    assert not golden.exists()
+
+    # One fixture with speech is enough to record the outputs
+    monkeypatch.setattr(accuracy_guard, "BASELINE", stub_mode({"a.wav": SPEECH, "b.wav": SILENCE}))
+    monkeypatch.setattr(accuracy_guard, "MODES", {"same": stub_mode({"a.wav": SPEECH, "b.wav": SILENCE})})
+    assert invoke("--mode", "same", "--update-golden").exit_code == 0
+    assert golden.exists()
+
+
+def test_modes_only_run_on_fixtures_they_can_change(guard, monkeypatch):
+    invoke, _, _ = guard
+    calls = []
+    resampled = stub_mode({"a.wav": SPEECH, "b.wav": SPEECH}, calls)._replace(applies_to=accuracy_guard._transcoded)
+    monkeypatch.setattr(accuracy_guard, "MODES", {"fast_resampler": resampled})
+    assert invoke("--mode", "fast_resampler", "--update-golden").exit_code == 0
+    # a.wav is already 16 kHz mono and copied without ffmpeg; only the 44.1 kHz recording is resampled
+    assert calls == [["b.wav"]]
+
+
+def test_mode_without_applicable_fixtures_fails(tmp_path, monkeypatch):
+    fixtures = tmp_path / "recordings"
+    fixtures.mkdir()
+    write_wav(fixtures / "a.wav")
+    monkeypatch.setattr(accuracy_guard, "missing_dependencies", lambda: None)
+    monkeypatch.setattr(accuracy_guard, "BASELINE", stub_mode({"a.wav": SPEECH}))
+    monkeypatch.setattr(accuracy_guard, "MODES", {"fast_resampler": accuracy_guard.MODES["fast_resampler"]._replace(models=lambda: {})})
+    result = CliRunner().invoke(accuracy_guard.app, [
+        "--fixtures", str(fixtures), "--golden", str(tmp_path / "accuracy.json"), "--output", str(tmp_path / "report.json"),
+        "--mode", "fast_resampler", "--update-golden"
+    ])
+    assert result.exit_code == 1
+    assert "cannot change any fixture" in result.output
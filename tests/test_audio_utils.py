@@ -0,0 +1,64 @@
+import os
+import tempfile
+import wave
+
+import pytest
+from typer.testing import CliRunner
+
+import articulation
+from audio_utils import extract_audio_to_wav, get_wav_duration
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A 5 s 16 kHz mono WAV, which extract_audio_to_wav copies without ffmpeg."""
+    path = tmp_path / "talk.wav"
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(b"\0\0" * 16000 * 5)
+    return str(path)
+
+
+@pytest.fixture
+def temp_wavs(tmp_path, monkeypatch):
+    """The directory extract_audio_to_wav writes its temp WAVs to."""
+    directory = tmp_path / "tmp"
+    directory.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(directory))
+    return directory
+
+
+def test_range_inside_the_recording(recording, temp_wavs):
+    wav = extract_audio_to_wav(recording, start=1.0, end=3.5)
+    assert get_wav_duration(wav) == pytest.approx(2.5)
+    # A range running past the end is cut at the end of the recording
+    wav = extract_audio_to_wav(recording, start=4.0, end=20.0)
+    assert get_wav_duration(wav) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("start, end, message", [
+    (-1.0, None, "must not be negative"),
+    (None, -1.0, "after the beginning"),
+    (None, 0.0, "after the beginning"),
+    (3.0, 2.0, "must be after start"),
+])
+def test_invalid_range(recording, temp_wavs, start, end, message):
+    with pytest.raises(ValueError, match=message):
+        extract_audio_to_wav(recording, start=start, end=end)
+
+
+@pytest.mark.parametrize("start, end", [(10.0, 20.0), (5.0, None)])
+def test_range_outside_the_recording(recording, temp_wavs, start, end):
+    with pytest.raises(ValueError, match="outside the recording"):
+        extract_audio_to_wav(recording, start=start, end=end)
+    # No empty WAV is left behind
+    assert os.listdir(temp_wavs) == []
+
+
+@pytest.mark.parametrize("args", [["--start", "-1"], ["--end", "-1"], ["--end", "0"], ["--start", "5", "--end", "2"]])
+def test_cli_rejects_invalid_ranges(recording, args):
+    result = CliRunner().invoke(articulation.app, [recording, "--no-daemon", *args])
+    assert result.exit_code == 1
+    assert "Error:" in result.output
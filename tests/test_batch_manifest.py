@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import articulation
+from batch_manifest import (
+    BatchManifest, UnfinishedBatchError, manifest_path,
+    PENDING, DECODING, TRANSCRIBING, ANALYZING, RECORDING, DONE, FAILED
+)
+
+
+def make_manifest(tmp_path, **kwargs) -> BatchManifest:
+    return BatchManifest(str(tmp_path / "history.batch.json"), str(tmp_path / "checkpoints"), **kwargs)
+
+
+def interrupted_batch(tmp_path, state: str):
+    """A manifest left behind by a batch that stopped with one file done and one in `state`."""
+    manifest = make_manifest(tmp_path)
+    manifest.add([str(tmp_path / "a.m4a"), str(tmp_path / "b.m4a")])
+    manifest.mark(str(tmp_path / "a.m4a"), DONE)
+    manifest.mark(str(tmp_path / "b.m4a"), state)
+    checkpoint = manifest.checkpoint(str(tmp_path / "b.m4a"), model="base")
+    checkpoint.save("transcription", {"text": "hello"})
+    return checkpoint
+
+
+@pytest.mark.parametrize("state", [PENDING, DECODING, TRANSCRIBING, ANALYZING, RECORDING])
+def test_fresh_run_refuses_an_unfinished_batch(tmp_path, state):
+    checkpoint = interrupted_batch(tmp_path, state)
+    with pytest.raises(UnfinishedBatchError, match="1 unfinished file"):
+        make_manifest(tmp_path)
+    # Nothing was discarded: the batch can still be resumed
+    assert checkpoint.load("transcription") == {"text": "hello"}
+    resumed = make_manifest(tmp_path, resume=True)
+    assert resumed.state(str(tmp_path / "a.m4a")) == DONE
+    assert resumed.state(str(tmp_path / "b.m4a")) == state
+
+
+def test_new_batch_discards_the_unfinished_one(tmp_path):
+    checkpoint = interrupted_batch(tmp_path, TRANSCRIBING)
+    manifest = make_manifest(tmp_path, new_batch=True)
+    assert manifest.files == {}
+    assert not (tmp_path / "checkpoints").exists()
+    assert checkpoint.load("transcription") is None
+    # The discarded batch is gone from disk right away, not just after the next transition
+    with open(tmp_path / "history.batch.json", encoding="utf-8") as f:
+        assert json.load(f)["files"] == {}
+    make_manifest(tmp_path)
+
+
+def test_failed_files_do_not_block_a_fresh_run(tmp_path):
+    interrupted_batch(tmp_path, FAILED)
+    manifest = make_manifest(tmp_path)
+    assert manifest.files == {}
+    assert not (tmp_path / "checkpoints").exists()
+
+
+def test_checkpoints_are_keyed_by_path_and_settings(tmp_path):
+    manifest = make_manifest(tmp_path)
+    (tmp_path / "one").mkdir()
+    (tmp_path / "two").mkdir()
+    first, second = str(tmp_path / "one" / "talk.m4a"), str(tmp_path / "two" / "talk.m4a")
+
+    # Same-named files in different folders never share a checkpoint
+    assert manifest.checkpoint_dir(first).parent != manifest.checkpoint_dir(second).parent
+    # Different settings of one file get their own variant, the same settings (in any order) the same one
+    whole = manifest.checkpoint_dir(first, start=None, end=None, cascade=False)
+    ranged = manifest.checkpoint_dir(first, start=30.0, end=90.0, cascade=False)
+    cascade = manifest.checkpoint_dir(first, start=None, end=None, cascade=True)
+    assert len({whole, ranged, cascade}) == 3
+    assert whole.parent == ranged.parent == cascade.parent
+    assert manifest.checkpoint_dir(first, cascade=False, end=None, start=None) == whole
+    assert manifest.checkpoint_dir(first, model="base") != manifest.checkpoint_dir(first, model="small")
+
+
+def test_done_removes_every_variant_of_the_file(tmp_path):
+    manifest = make_manifest(tmp_path)
+    target, other = str(tmp_path / "a.m4a"), str(tmp_path / "b.m4a")
+    manifest.add([target, other])
+    for params in ({"model": "base"}, {"model": "small"}, {"start": 30.0, "end": 90.0}):
+        manifest.checkpoint(target, **params).save("transcription", {"text": "a"})
+    kept = manifest.checkpoint(other, model="base")
+    kept.save("transcription", {"text": "b"})
+
+    manifest.checkpoint(target, model="base").mark(DONE)
+    assert not manifest.checkpoint_dir(target).parent.exists()
+    assert kept.load("transcription") == {"text": "b"}
+    assert manifest.counts() == {DONE: 1, PENDING: 1}
+
+
+def test_single_file_run_ignores_an_unfinished_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    resources = tmp_path / "resources" / "articulations"
+    resources.mkdir(parents=True)
+    clips = []
+    for name in ("a.m4a", "b.m4a"):
+        (resources / name).write_bytes(b"\0")
+        clips.append(resources / name)
+    processed = []
+    monkeypatch.setattr(articulation, "process_file", lambda current_file, *args, **kwargs: processed.append((current_file, kwargs.get("manifest"))))
+
+    manifest = BatchManifest.for_history("history.json")
+    manifest.add(str(clip) for clip in clips)
+    manifest.mark(str(clips[0]), TRANSCRIBING)
+    before = (tmp_path / manifest_path("history.json")).read_text()
+
+    runner = CliRunner()
+    result = runner.invoke(articulation.app, [str(clips[0]), "--history", "history.json", "--no-daemon"])
+    assert result.exit_code == 0, result.output
+    assert processed == [(clips[0], None)]
+    assert (tmp_path / manifest_path("history.json")).read_text() == before
+
+    # The batch itself still refuses to start over
+    result = runner.invoke(articulation.app, ["--history", "history.json", "--no-daemon"])
+    assert result.exit_code == 1
+    assert "--resume" in result.output
@@ -0,0 +1,68 @@
+import sys
+from types import ModuleType, SimpleNamespace
+
+import numpy as np
+import pytest
+
+import transcription
+from bench.fixtures import write_wav
+from config import PAUSE_THRESHOLD_SECONDS, TARGET_SAMPLE_RATE, WEAK_WORD_CONFIDENCE_THRESHOLD
+
+# Clip lengths in samples chosen so every offset after the first rounds *down* to the millisecond
+# (e.g. 16007 samples = 1.0004375 s -> "1.0"), like arbitrary recordings laid end to end
+CLIP_SAMPLES = (16007, 24006, 17605)
+
+
+class StubBatchedPipeline:
+    """
+    Stands in for faster_whisper.BatchedInferencePipeline: one segment and one word per chunk,
+    named after the chunk, with times rounded to the millisecond like the real pipeline's.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        segments = []
+        for i, chunk in enumerate(clip_timestamps):
+            start = round(chunk["start"], 3)
+            end = round(min(chunk["start"] + 0.3, chunk["end"]), 3)
+            word = SimpleNamespace(word=f" chunk{i}", start=start, end=end, probability=0.9)
+            segments.append(SimpleNamespace(start=start, end=end, text=f" chunk{i}", words=[word]))
+        return iter(segments), SimpleNamespace(duration=len(audio) / TARGET_SAMPLE_RATE)
+
+
+@pytest.fixture
+def clips(tmp_path, monkeypatch):
+    faster_whisper = ModuleType("faster_whisper")
+    faster_whisper.BatchedInferencePipeline = StubBatchedPipeline
+    monkeypatch.setitem(sys.modules, "faster_whisper", faster_whisper)
+    paths = []
+    for i, samples in enumerate(CLIP_SAMPLES):
+        path = str(tmp_path / f"clip{i}.wav")
+        write_wav(path, np.full(samples, 0.1, dtype=np.float32))
+        paths.append(path)
+    return paths
+
+
+def transcribe(paths):
+    return transcription.evaluate_transcriptions(
+        paths, WEAK_WORD_CONFIDENCE_THRESHOLD, PAUSE_THRESHOLD_SECONDS, model=object(), keep_words=True
+    )
+
+
+def test_clip_starting_with_speech_keeps_its_words(clips, monkeypatch):
+    # Speech from the very first sample: the chunk starts exactly at the clip offset
+    monkeypatch.setattr(transcription, "speech_chunks", lambda audio: [(0, len(audio))])
+    results = transcribe(clips)
+    assert [[w["word"] for w in r["words"]] for r in results] == [["chunk0"], ["chunk1"], ["chunk2"]]
+    assert all(r["words"][0]["start"] == 0.0 for r in results)
+
+
+def test_several_chunks_per_clip_are_routed_to_their_clip(clips, monkeypatch):
+    monkeypatch.setattr(transcription, "speech_chunks", lambda audio: [(0, 4000), (8000, len(audio))])
+    results = transcribe(clips)
+    assert [[w["word"] for w in r["words"]] for r in results] == [
+        ["chunk0", "chunk1"], ["chunk2", "chunk3"], ["chunk4", "chunk5"]
+    ]
+    assert results[1]["words"][1]["start"] == pytest.approx(0.5, abs=1e-3)
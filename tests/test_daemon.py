@@ -0,0 +1,97 @@
+import threading
+import time
+
+import articulation
+import cancellation
+from daemon import WarmResources
+from instrumentation import PipelineTimer
+
+
+def test_budget_excludes_time_queued_behind_the_lock(monkeypatch):
+    # A 10 s clip gets 0.1 + 0.01 x 10 = 0.2 s, less than it waits for the lock
+    monkeypatch.setattr(cancellation, "JOB_TIMEOUT_BASE_SECONDS", 0.1)
+    monkeypatch.setattr(cancellation, "JOB_TIMEOUT_REALTIME_FACTOR", 0.01)
+
+    def analyze_media(path, cancel=None, **kwargs):
+        cancel.set_budget(10.0)
+        cancel.check()
+        return {"path": path}
+
+    monkeypatch.setattr(articulation, "analyze_media", analyze_media)
+    resources = WarmResources()
+    resources.faster_whisper_model, resources.smile = "whisper", "smile"
+    resources.articulation_lock.acquire()
+    releaser = threading.Timer(0.4, resources.articulation_lock.release)
+    releaser.start()
+    try:
+        started = time.monotonic()
+        result = resources.run_articulation({"path": "clip.wav"}, PipelineTimer("clip.wav"))
+    finally:
+        releaser.join()
+    assert time.monotonic() - started >= 0.4
+    assert result == {"path": "clip.wav"}
+
+
+def test_concurrent_runs_share_one_model_load(monkeypatch):
+    import acoustics
+    import transcription
+
+    loads = {"whisper": 0, "smile": 0}
+    running = {"now": 0, "most": 0}
+
+    def load_whisper(*args, **kwargs):
+        loads["whisper"] += 1
+        return "whisper"
+
+    def create_smile():
+        loads["smile"] += 1
+        return "smile"
+
+    def analyze_media(path, whisper_model=None, smile=None, **kwargs):
+        running["now"] += 1
+        running["most"] = max(running["most"], running["now"])
+        time.sleep(0.02)
+        running["now"] -= 1
+        return {"path": path, "handles": (whisper_model, smile)}
+
+    monkeypatch.setattr(transcription, "load_faster_whisper_model", load_whisper)
+    monkeypatch.setattr(acoustics, "create_smile", create_smile)
+    monkeypatch.setattr(articulation, "analyze_media", analyze_media)
+    resources = WarmResources()
+    results = []
+    workers = [
+        threading.Thread(target=lambda i=i: results.append(resources.analyze_media(f"clip{i}.wav", timer=PipelineTimer(f"clip{i}.wav"))))
+        for i in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert loads == {"whisper": 1, "smile": 1}
+    assert running["most"] == 1
+    assert sorted(result["path"] for result in results) == [f"clip{i}.wav" for i in range(4)]
+    assert all(result["handles"] == ("whisper", "smile") for result in results)
+
+
+def test_watch_workers_share_one_set_of_handles(monkeypatch):
+    from typer.testing import CliRunner
+
+    seen = []
+    monkeypatch.setattr(articulation, "watch_directory", lambda directory, exts, handle, history, max_workers: [handle(f"clip{i}.wav") for i in range(2)])
+    monkeypatch.setattr(articulation, "process_file", lambda current_file, *args, resources=None, **kwargs: seen.append(resources))
+
+    result = CliRunner().invoke(articulation.app, ["--watch", "--workers", "2", "--no-daemon"])
+    assert result.exit_code == 0, result.output
+    assert len(seen) == 2 and isinstance(seen[0], WarmResources) and seen[0] is seen[1]
+
+
+def test_thin_client_skips_the_pipeline_imports():
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    # A fresh interpreter: this test session has long imported everything
+    code = "import sys, articulation; print(sorted({'transcription', 'acoustics', 'opensmile', 'pandas'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
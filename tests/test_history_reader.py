@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+import output_manager
+from history_reader import iter_entries
+from output_manager import append_to_metrics, is_file_processed, stream_append
+
+ENTRIES = [
+    {
+        "date": "2026-01-05T10:00:00",
+        "source_file": "talk.m4a",
+        "file_id": "a1",
+        "metrics": {"speech_rate_sps": 4.2, "weak_words": [{"word": "]\"}", "probability": 0.3}], "nested": {"deep": [1, [2, {}]]}}
+    },
+    {
+        "date": "2026-01-06T10:00:00",
+        "source_file": "notes \"draft\".txt",
+        "file_id": "b2",
+        "metrics": {"transcript": "ends with a backslash \\", "text": "line one\n  }\nline two ]\"}\n    \"source_file\": \"fake\""}
+    },
+    {"source_file": "no-id.wav", "metrics": {}, "file_id": "c3", "extra": None},
+    {"file_id": "d4", "metrics": {"note": "café – \\\"quoted\\\""}},
+]
+
+LAYOUTS = {"compact": None, "indent2": 2, "indent4": 4, "tab": "\t"}
+
+
+def write_history(path, entries, indent):
+    path.write_text(json.dumps(entries, indent=indent), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("indent", LAYOUTS.values(), ids=LAYOUTS.keys())
+def test_iter_entries_matches_json_load(tmp_path, indent):
+    history = write_history(tmp_path / "history.json", ENTRIES, indent)
+    with open(history, encoding="utf-8") as f:
+        expected = json.load(f)
+    assert list(iter_entries(history)) == expected
+
+    fields = ("source_file", "file_id")
+    projected = [{key: entry[key] for key in fields if key in entry} for entry in expected]
+    assert list(iter_entries(history, fields=fields)) == projected
+
+
+@pytest.mark.parametrize("content", ["", "[]", "[ ]", "\n[\n]\n"], ids=["empty-file", "empty-array", "spaced", "newlines"])
+def test_iter_entries_of_empty_history(tmp_path, content):
+    path = tmp_path / "history.json"
+    path.write_text(content)
+    assert list(iter_entries(str(path))) == []
+    assert list(iter_entries(str(tmp_path / "missing.json"))) == []
+
+
+@pytest.mark.parametrize("content", [None, "", "[]", "[\n]"], ids=["missing", "empty-file", "empty-array", "spaced"])
+def test_append_onto_empty_history(tmp_path, content):
+    path = tmp_path / "history.json"
+    if content is not None:
+        path.write_text(content)
+    append_to_metrics(str(path), "talk.m4a", "a1", {"speech_rate_sps": 4.2})
+    append_to_metrics(str(path), "talk2.m4a", "b2", {"speech_rate_sps": 3.9})
+
+    with open(path, encoding="utf-8") as f:
+        history = json.load(f)
+    assert [(entry["source_file"], entry["file_id"], entry["metrics"]) for entry in history] == [
+        ("talk.m4a", "a1", {"speech_rate_sps": 4.2}),
+        ("talk2.m4a", "b2", {"speech_rate_sps": 3.9}),
+    ]
+    assert list(iter_entries(str(path))) == history
+
+
+@pytest.mark.parametrize("indent", LAYOUTS.values(), ids=LAYOUTS.keys())
+def test_append_onto_populated_history(tmp_path, indent):
+    history = write_history(tmp_path / "history.json", ENTRIES, indent)
+    new = {"date": "2026-02-01T09:00:00", "source_file": "new.m4a", "file_id": "e5", "metrics": {"text": "]\n  }"}}
+    stream_append(history, [new])
+
+    with open(history, encoding="utf-8") as f:
+        assert json.load(f) == ENTRIES + [new]
+    assert list(iter_entries(history)) == ENTRIES + [new]
+
+
+@pytest.mark.parametrize("content", ['[{"source_file": "a.m4a"}', '{"source_file": "a.m4a"}', "[1, 2]", "not json"])
+def test_append_onto_corrupt_history(tmp_path, content):
+    path = tmp_path / "history.json"
+    path.write_text(content)
+    with pytest.raises(json.JSONDecodeError):
+        stream_append(str(path), [{"source_file": "b.m4a"}])
+    assert path.read_text() == content
+    assert not (tmp_path / ".history.json.tmp").exists()
+
+    # A regular append backs the corrupt file up and starts a fresh history
+    append_to_metrics(str(path), "b.m4a", "b2", {})
+    assert (tmp_path / "history.json.bak").read_text() == content
+    with open(path, encoding="utf-8") as f:
+        assert [entry["source_file"] for entry in json.load(f)] == ["b.m4a"]
+
+
+def test_is_file_processed_stops_at_first_match(tmp_path):
+    # Everything after the first entry is garbage: a scan past it would raise and report False
+    path = tmp_path / "history.json"
+    path.write_text('[\n  {\n    "source_file": "talk.m4a",\n    "file_id": "a1"\n  },\n  {"source_file": ')
+    assert is_file_processed(str(path), "talk.m4a", "other")
+    assert is_file_processed(str(path), "other.m4a", "a1")
+    assert not is_file_processed(str(path), "other.m4a", "other")
+
+
+def test_is_file_processed_decodes_only_the_dedupe_fields(tmp_path, monkeypatch):
+    history = write_history(tmp_path / "history.json", ENTRIES, 2)
+    requested = []
+    real_iter_history = output_manager.iter_history
+
+    def iter_history(history_file, fields=None):
+        requested.append(fields)
+        return real_iter_history(history_file, fields)
+
+    monkeypatch.setattr(output_manager, "iter_history", iter_history)
+    assert is_file_processed(history, "missing.m4a", "b2")
+    assert not is_file_processed(history, "notes.txt", "zz")
+    assert requested == [("source_file", "file_id")] * 2
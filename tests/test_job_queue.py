@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from config import JOB_MAX_ATTEMPTS
+from file_lease import Lease
+from job_queue import JobQueue
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# One node of a batch: drains the shared queue, recording every job it analyzes in the history
+_NODE = """
+import sys, time
+from pathlib import Path
+from job_queue import JobQueue
+from output_manager import append_to_metrics, get_file_id
+
+queue_dir, history, node, *files = sys.argv[1:]
+
+def handle(path, cancel):
+    time.sleep(0.05)
+    append_to_metrics(history, Path(path).name, get_file_id(path), {"node": node})
+    return True
+
+JobQueue(queue_dir, lease_seconds=5, node=node).drain(files, handle, poll_seconds=0.05)
+"""
+
+
+def make_jobs(directory: Path, count: int):
+    directory.mkdir()
+    paths = []
+    for i in range(count):
+        path = directory / f"job{i:02d}.txt"
+        path.write_text(f"job {i}\n")
+        paths.append(str(path))
+    return paths
+
+
+def test_nodes_drain_every_job_exactly_once(tmp_path):
+    files = make_jobs(tmp_path / "jobs", 12)
+    queue_dir, history = tmp_path / "queue", tmp_path / "history.json"
+    nodes = [
+        subprocess.Popen([sys.executable, "-c", _NODE, str(queue_dir), str(history), f"node{n}", *files], cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+        for n in range(4)
+    ]
+    for node in nodes:
+        assert node.wait(timeout=120) == 0
+
+    with open(history, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    assert sorted(entry["source_file"] for entry in entries) == sorted(Path(f).name for f in files)
+    assert len(list((queue_dir / "done").iterdir())) == 12
+    assert list((queue_dir / "claims").iterdir()) == []
+    assert not os.path.exists(f"{history}.lock")
+
+
+def test_expired_claim_is_taken_over(tmp_path):
+    [job] = make_jobs(tmp_path / "jobs", 1)
+    queue = JobQueue(str(tmp_path / "queue"), lease_seconds=2, node="survivor")
+    dead = Lease(str(tmp_path / "queue" / "claims" / f"{queue.job_key(job)}.lease"), 2, owner="dead-node")
+    assert dead.try_acquire()
+    # While the other node's claim is fresh, the job is not ours to take
+    assert queue.claim(job) is None
+
+    # ... but once it has gone without a heartbeat for longer than the lease, it is
+    stale = time.time() - 60
+    os.utime(dead.path, (stale, stale))
+    handled = []
+    counts = queue.drain([job], lambda path, cancel: handled.append(path) or True, poll_seconds=0.01)
+    assert handled == [job]
+    assert counts["analyzed"] == 1 and queue.is_done(job)
+
+
+def test_failing_job_stops_after_max_attempts(tmp_path):
+    [job] = make_jobs(tmp_path / "jobs", 1)
+    queue = JobQueue(str(tmp_path / "queue"), lease_seconds=2, node="node")
+    calls = []
+
+    def handle(path, cancel):
+        calls.append(path)
+        if len(calls) % 2:
+            raise RuntimeError("decoder crashed")
+        return False
+
+    counts = queue.drain([job], handle, poll_seconds=0.01)
+    assert len(calls) == JOB_MAX_ATTEMPTS
+    assert counts == {"analyzed": 0, "failed": JOB_MAX_ATTEMPTS, "by_other_nodes": 0}
+    assert queue.attempts(job) == JOB_MAX_ATTEMPTS and not queue.is_done(job)
+    # Another node (or a later run) does not pick it up again either
+    assert queue.claim(job) is None
@@ -0,0 +1,53 @@
+import pytest
+
+from llm_payload import build_payload, estimate_tokens, render_payload
+from output_manager import append_to_metrics
+
+LONG_INSTRUCTIONS = "Coach the speaker on pacing, \"fillers\" and articulation.\n" * 110
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = str(tmp_path / "history.json")
+    for i in range(10):
+        append_to_metrics(path, f"session{i}.txt", str(i), {
+            "speech_rate_sps": 3 + i / 10,
+            "transcript": "so today we talk about speaking clearly " * 40,
+            "weak_words": [{"word": f"word{j}", "probability": 0.2 + j / 100} for j in range(12)],
+            "filler_words": {"um": i, "uh": 2, "like": 1},
+        })
+    return path
+
+
+@pytest.mark.parametrize("instructions", [None, "Coach the speaker.", LONG_INSTRUCTIONS], ids=["none", "short", "long"])
+@pytest.mark.parametrize("budget", [30, 60, 200, 800, 3000])
+def test_payload_fits_the_budget(history, instructions, budget):
+    payload = build_payload(history, budget, instructions=instructions)
+    assert estimate_tokens(render_payload(payload)) <= budget
+    assert payload["omitted_sessions"] == 7 - len(payload["sessions"])
+
+
+def test_roomy_budget_keeps_everything(history):
+    payload = build_payload(history, 10000, instructions=LONG_INSTRUCTIONS)
+    assert payload["instructions"] == LONG_INSTRUCTIONS
+    assert "trend" in payload
+    assert len(payload["sessions"]) == 7
+    assert "omitted_trend" not in payload and "truncated_instructions" not in payload
+
+
+def test_fixed_part_over_budget_is_cut_and_reported(history):
+    # The instructions alone are ~1500 tokens: the digest goes first, then the instructions are shortened
+    payload = build_payload(history, 800, instructions=LONG_INSTRUCTIONS)
+    assert payload["omitted_trend"] and payload["truncated_instructions"]
+    assert "trend" not in payload
+    assert payload["instructions"].endswith(" ...")
+    assert LONG_INSTRUCTIONS.startswith(payload["instructions"][:-4])
+    assert estimate_tokens(render_payload(payload)) == 800
+
+    # A smaller budget gets a shorter cut, not the same oversized payload
+    assert len(build_payload(history, 200, instructions=LONG_INSTRUCTIONS)["instructions"]) < len(payload["instructions"])
+
+
+def test_budget_too_small_for_an_empty_payload(history):
+    with pytest.raises(ValueError):
+        build_payload(history, 3)
@@ -0,0 +1,62 @@
+import os
+import sys
+import types
+
+import pytest
+
+import thread_budget
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """The threadpoolctl limits configure() applies, with a fake threadpoolctl and a clean environment."""
+    applied = []
+    fake = types.ModuleType("threadpoolctl")
+    fake.threadpool_limits = lambda limits=None, user_api=None: applied.append(limits)
+    monkeypatch.setitem(sys.modules, "threadpoolctl", fake)
+    monkeypatch.setattr(thread_budget, "THREADS_PER_JOB", None)
+    monkeypatch.setattr(thread_budget, "CPU_CORES", 8)
+    monkeypatch.setattr(thread_budget, "_parallel_jobs", 1)
+    for var in thread_budget.BLAS_ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+    return applied
+
+
+def export(monkeypatch, **variables):
+    """Variables the user exported before start-up."""
+    for var, value in variables.items():
+        monkeypatch.setenv(var, value)
+    monkeypatch.setattr(thread_budget, "_user_env", set(variables))
+
+
+def test_limits_every_pool_without_user_variables(limits, monkeypatch):
+    export(monkeypatch)
+    thread_budget.configure(2)
+    assert limits == [{"openmp": 4, "blas": 4}]
+    assert all(os.environ[var] == "4" for var in thread_budget.BLAS_ENV_VARS)
+
+
+def test_exported_omp_num_threads_wins(limits, monkeypatch):
+    export(monkeypatch, OMP_NUM_THREADS="1")
+    thread_budget.configure(2)
+    # OpenBLAS and MKL honor OMP_NUM_THREADS as well, so neither pool is touched
+    assert limits == []
+    assert os.environ["OMP_NUM_THREADS"] == "1"
+    assert os.environ["OPENBLAS_NUM_THREADS"] == "4"
+
+
+def test_exported_blas_variable_leaves_only_openmp_limited(limits, monkeypatch):
+    export(monkeypatch, MKL_NUM_THREADS="6")
+    thread_budget.configure(4)
+    assert limits == [{"openmp": 2}]
+    assert os.environ["MKL_NUM_THREADS"] == "6"
+
+
+def test_configured_restores_the_previous_budget(limits, monkeypatch):
+    export(monkeypatch)
+    thread_budget.configure(1)
+    with thread_budget.configured(4) as budget:
+        assert budget["threads_per_job"] == 2
+        assert thread_budget.whisper_threads() == 2
+    assert thread_budget.whisper_threads() == 8
+    assert limits[-1] == {"openmp": 8, "blas": 8}
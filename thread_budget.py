@@ -0,0 +1,90 @@
+import logging
+import os
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from config import CPU_CORES, THREADS_PER_JOB
+
+logger = logging.getLogger(__name__)
+
+# Environment variables read by the BLAS / OpenMP runtimes behind NumPy, pandas and CTranslate2
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# threadpoolctl's pool APIs and the variables that size them (OpenBLAS and MKL also honor OMP_NUM_THREADS)
+THREADPOOL_API_VARS = {
+    "openmp": ("OMP_NUM_THREADS",),
+    "blas": ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"),
+}
+
+_parallel_jobs = 1
+# Limits exported by the user before start-up always win over the computed budget
+_user_env = {var for var in BLAS_ENV_VARS if var in os.environ}
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects CPU affinity / container limits), or CPU_CORES from config."""
+    if CPU_CORES:
+        return CPU_CORES
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def threads_per_job(parallel_jobs: Optional[int] = None) -> int:
+    """Even split of the available cores over the jobs that run at the same time (at least 1)."""
+    if THREADS_PER_JOB:
+        return THREADS_PER_JOB
+    jobs = parallel_jobs or _parallel_jobs
+    return max(1, available_cores() // max(1, jobs))
+
+
+def configure(parallel_jobs: int) -> Dict[str, int]:
+    """
+    Declares how many analyses will run concurrently in this process (watch workers, daemon
+    pipelines, process-pool size) and caps the BLAS/OpenMP pools to match. Variables the user
+    exported before start-up are left alone. The env vars only reach runtimes loaded after this call
+    (and child processes), so a running pool is also limited through threadpoolctl when it is
+    installed - except for the APIs whose variables the user exported. The limits hold for the
+    whole process until the next call.
+    """
+    global _parallel_jobs
+    _parallel_jobs = max(1, parallel_jobs)
+    threads = threads_per_job()
+    for var in BLAS_ENV_VARS:
+        if var not in _user_env:
+            os.environ[var] = str(threads)
+    apis = [api for api, variables in THREADPOOL_API_VARS.items() if not _user_env.intersection(variables)]
+    if apis:
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits={api: threads for api in apis})
+        except ImportError:
+            pass
+    budget = {"cores": available_cores(), "parallel_jobs": _parallel_jobs, "threads_per_job": threads}
+    logger.info(f"Thread budget: {budget}")
+    return budget
+
+
+@contextmanager
+def configured(parallel_jobs: int):
+    """`configure(parallel_jobs)` for the duration of a block (e.g. a process pool), then the previous budget again."""
+    previous = _parallel_jobs
+    try:
+        yield configure(parallel_jobs)
+    finally:
+        configure(previous)
+
+
+def whisper_threads() -> int:
+    """cpu_threads for faster-whisper's WhisperModel (CTranslate2 intra-op threads)."""
+    return threads_per_job()
+
+
+def ffmpeg_threads() -> int:
+    """-threads for the ffmpeg decoder."""
+    return threads_per_job()
+
+
+def torch_threads() -> int:
+    """torch.set_num_threads for openai-whisper."""
+    return threads_per_job()
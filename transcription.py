@@ -1,59 +1,178 @@
 import logging
+import numpy as np
 import syllables
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
 
-try:
-    from faster_whisper import WhisperModel
-except ImportError:
-    logging.error("faster-whisper is not installed. Please install it.")
+import thread_budget
+from audio_utils import read_wav_samples
+from cancellation import check_cancelled
+from instrumentation import report_progress
+from config import (
+    PAUSE_SENSITIVITY_THRESHOLDS, PAUSE_HISTOGRAM_EDGES, TARGET_SAMPLE_RATE,
+    WHISPER_BATCH_CHUNK_SECONDS, WHISPER_BATCH_GROUP_SECONDS,
+    CASCADE_DRAFT_MODEL, CASCADE_REFINE_MODEL, CASCADE_CONTEXT_WORDS, CASCADE_MERGE_GAP_SECONDS, CASCADE_MAX_SPAN_SECONDS
+)
+from word_timeline import word_gaps, pause_mask, weak_mask, pause_counts_at, pause_distribution
 
 logger = logging.getLogger(__name__)
 
-def evaluate_transcription(audio_path: str, conf_threshold: float, pause_threshold: float) -> Dict[str, Any]:
+def load_faster_whisper_model(model_size: str = "base", cpu_threads: int = None, compute_type: str = "int8"):
     """
-    Runs faster-whisper on the audio to get text, word confidences, and timestamps.
-    Calculates weak words, pause counts, average pause duration, and speech rate.
+    Loads a faster-whisper model on the CPU (int8) to prevent CUDA errors.
+    Imported lazily so thin clients talking to the daemon never pay the CTranslate2 import.
+    `cpu_threads` defaults to this job's share of the cores (see thread_budget).
+    `compute_type` "float32" loads the unquantized weights (the accuracy guard's reference).
     """
-    logger.info("Loading faster-whisper model ('base' via CPU to prevent CUDA errors)...")
     try:
-        model = WhisperModel("base", device="cpu", compute_type="int8")
+        from faster_whisper import WhisperModel
+    except ImportError:
+        logging.error("faster-whisper is not installed. Please install it.")
+        raise
+
+    logger.info(f"Loading faster-whisper model ('{model_size}', {compute_type}, via CPU to prevent CUDA errors)...")
+    try:
+        return WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads or thread_budget.whisper_threads())
     except Exception as e:
         logger.warning(f"Failed to load Whisper on CPU: {e}")
         raise e
 
+def evaluate_transcription(audio_path: str, conf_threshold: float, pause_threshold: float, model=None, keep_words: bool = False, progress=None, cancel=None) -> Dict[str, Any]:
+    """
+    Runs faster-whisper on the audio to get text, word confidences, and timestamps.
+    Calculates weak words, pause counts, average pause duration, and speech rate.
+    Pass a pre-loaded `model` to skip loading a fresh 'base' model on every call.
+    With `keep_words` the full word list is returned under "words" (for the timeline sidecar).
+    A `progress` callback receives the transcribed seconds and the transcript so far after
+    every segment; a `cancel` token (cancellation.CancelToken) is checked between segments.
+    """
+    if model is None:
+        model = load_faster_whisper_model()
+
     logger.info(f"Transcribing {audio_path}...")
-    segments_generator, info = model.transcribe(audio_path, word_timestamps=True, language="en")
+    words_data, full_text = _transcribe_words(model, audio_path, progress=progress, cancel=cancel)
+    result = transcription_metrics(words_data, full_text, conf_threshold, pause_threshold, keep_words)
+    logger.info("Transcription analysis complete.")
+    return result
+
+def _transcribe_words(model, audio, offset: float = 0.0, progress=None, cancel=None, **transcribe_kwargs) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    One faster-whisper pass: (word dicts with timestamps shifted by `offset`, full text).
+    Segments are decoded lazily, so `progress` hears about each one as soon as it is done and
+    a cancelled `cancel` token stops the decoding before the next one.
+    """
+    segments_generator, info = model.transcribe(audio, word_timestamps=True, language="en", **transcribe_kwargs)
     
     words_data = []
     full_text = ""
     
+    check_cancelled(cancel)
     for segment in segments_generator:
+        check_cancelled(cancel)
         full_text += segment.text + " "
+        report_progress(progress, "transcription", segment.end, info.duration, full_text.strip())
         for word in segment.words:
             words_data.append({
                 "word": word.word.strip(),
-                "start": word.start,
-                "end": word.end,
+                "start": round(word.start + offset, 3) if offset else word.start,
+                "end": round(word.end + offset, 3) if offset else word.end,
                 "probability": word.probability
             })
+    return words_data, full_text.strip()
+
+def refinement_spans(words_data: List[Dict[str, Any]], conf_threshold: float, duration: float) -> List[Tuple[float, float, int, int]]:
+    """
+    Audio spans to re-transcribe around the weak words of a draft: each weak word plus
+    CASCADE_CONTEXT_WORDS draft words either side, cut at the midpoints of the surrounding gaps
+    so no word is split. Spans closer than CASCADE_MERGE_GAP_SECONDS are merged while they stay
+    within CASCADE_MAX_SPAN_SECONDS (each span costs one decoder window).
+    Returns (start_sec, end_sec, first_word, last_word) with inclusive word indices.
+    """
+    probabilities = np.array([w["probability"] for w in words_data], dtype=np.float64)
+    spans: List[List[float]] = []
+    last = len(words_data) - 1
+    for i in np.flatnonzero(weak_mask(probabilities, conf_threshold)).tolist():
+        first_word, last_word = max(0, i - CASCADE_CONTEXT_WORDS), min(last, i + CASCADE_CONTEXT_WORDS)
+        start = 0.0 if first_word == 0 else (words_data[first_word - 1]["end"] + words_data[first_word]["start"]) / 2
+        end = duration if last_word == last else (words_data[last_word]["end"] + words_data[last_word + 1]["start"]) / 2
+        if spans and (first_word <= spans[-1][3] or start - spans[-1][1] <= CASCADE_MERGE_GAP_SECONDS):
+            if end - spans[-1][0] <= CASCADE_MAX_SPAN_SECONDS:
+                spans[-1][1], spans[-1][3] = end, last_word
+                continue
+            if i <= spans[-1][3]:
+                continue  # already inside the previous span
+            # Too long to merge: start right where the previous span ends so no word is refined twice
+            first_word = max(first_word, spans[-1][3] + 1)
+            start = max(start, spans[-1][1])
+        spans.append([start, end, first_word, last_word])
+    return [(start, end, int(first_word), int(last_word)) for start, end, first_word, last_word in spans]
+
+def evaluate_transcription_cascade(audio_path: str, conf_threshold: float, pause_threshold: float, draft_model=None, refine_model=None, keep_words: bool = False, progress=None, cancel=None) -> Dict[str, Any]:
+    """
+    Two-tier variant of evaluate_transcription: a small draft model (CASCADE_DRAFT_MODEL)
+    transcribes everything, then only the spans around words below `conf_threshold` are
+    re-transcribed by a large model (CASCADE_REFINE_MODEL), which replaces the draft's words
+    there. The metrics are then computed on the merged word list as usual, and a "cascade"
+    entry records how much audio was refined. `progress` follows the draft segment by segment
+    and then the refinement span by span (as refined vs. total span seconds); `cancel` is
+    checked between draft segments and between spans.
+    """
+    if draft_model is None:
+        draft_model = load_faster_whisper_model(CASCADE_DRAFT_MODEL)
+
+    logger.info(f"Drafting {audio_path} with the '{CASCADE_DRAFT_MODEL}' model...")
+    draft_words, _ = _transcribe_words(draft_model, audio_path, progress=progress, cancel=cancel)
+    audio = read_wav_samples(audio_path)
+    spans = refinement_spans(draft_words, conf_threshold, len(audio) / TARGET_SAMPLE_RATE)
+
+    words_data: List[Dict[str, Any]] = []
+    next_word = 0
+    refined_seconds, span_seconds = 0.0, sum(end - start for start, end, _, _ in spans)
+    if spans:
+        if refine_model is None:
+            refine_model = load_faster_whisper_model(CASCADE_REFINE_MODEL)
+        logger.info(f"Refining {len(spans)} low-confidence span(s) with the '{CASCADE_REFINE_MODEL}' model...")
+    for start, end, first_word, last_word in spans:
+        check_cancelled(cancel)
+        words_data.extend(draft_words[next_word:first_word])
+        # The draft text just before the span keeps the refinement in context
+        prompt = " ".join(w["word"] for w in draft_words[max(0, first_word - 20):first_word]) or None
+        refined, _ = _transcribe_words(
+            refine_model, audio[int(start * TARGET_SAMPLE_RATE):int(end * TARGET_SAMPLE_RATE)],
+            offset=start, initial_prompt=prompt, condition_on_previous_text=False
+        )
+        words_data.extend(refined)
+        next_word = last_word + 1
+        refined_seconds += end - start
+        report_progress(progress, "refinement", refined_seconds, span_seconds)
+    words_data.extend(draft_words[next_word:])
+
+    result = transcription_metrics(words_data, " ".join(w["word"] for w in words_data), conf_threshold, pause_threshold, keep_words)
+    result["cascade"] = {
+        "draft_model": CASCADE_DRAFT_MODEL,
+        "refine_model": CASCADE_REFINE_MODEL,
+        "refined_spans": len(spans),
+        "refined_seconds": round(span_seconds, 2),
+        "draft_weak_words": int(np.count_nonzero(weak_mask(np.array([w["probability"] for w in draft_words], dtype=np.float64), conf_threshold))),
+    }
+    logger.info("Cascade transcription analysis complete.")
+    return result
 
-    full_text = full_text.strip()
+def transcription_metrics(words_data: List[Dict[str, Any]], full_text: str, conf_threshold: float, pause_threshold: float, keep_words: bool = False) -> Dict[str, Any]:
+    """Weak words, pauses and speech rate of one recording's word list (shared by single and batched transcription)."""
+    # Word timeline as float64 arrays for the vectorized metrics below
+    starts = np.array([w["start"] for w in words_data], dtype=np.float64)
+    ends = np.array([w["end"] for w in words_data], dtype=np.float64)
+    probabilities = np.array([w["probability"] for w in words_data], dtype=np.float64)
     
     # 1. Weak Words
-    weak_words = [w for w in words_data if w["probability"] < conf_threshold]
+    weak_words = [words_data[i] for i in np.flatnonzero(weak_mask(probabilities, conf_threshold))]
     
     # 2. Pauses
-    pause_count = 0
-    total_pause_duration = 0.0
-    
-    for i in range(1, len(words_data)):
-        prev_word = words_data[i-1]
-        curr_word = words_data[i]
-        
-        gap = curr_word["start"] - prev_word["end"]
-        if gap >= pause_threshold:
-            pause_count += 1
-            total_pause_duration += gap
+    gaps = word_gaps(starts, ends)
+    pauses = gaps[pause_mask(gaps, pause_threshold)]
+    pause_count = int(len(pauses))
+    # Sequential sum (not np.sum's pairwise sum) keeps totals identical to the historical loop
+    total_pause_duration = float(sum(pauses.tolist()))
             
     avg_pause_duration = (total_pause_duration / pause_count) if pause_count > 0 else 0.0
 
@@ -76,12 +195,102 @@ def evaluate_transcription(audio_path: str, conf_threshold: float, pause_thresho
         "weak_words": weak_words,
         "pause_count": pause_count,
         "avg_pause_duration_sec": round(avg_pause_duration, 3),
-        "speech_rate_sps": round(sps, 2)
+        "speech_rate_sps": round(sps, 2),
+        "pause_counts_by_threshold": pause_counts_at(gaps, PAUSE_SENSITIVITY_THRESHOLDS),
+        "pause_distribution": pause_distribution(gaps, PAUSE_HISTOGRAM_EDGES)
     }
     
-    logger.info("Transcription analysis complete.")
+    if keep_words:
+        result["words"] = words_data
     return result
 
+def speech_chunks(audio: np.ndarray, max_seconds: float = WHISPER_BATCH_CHUNK_SECONDS) -> List[Tuple[int, int]]:
+    """
+    Silero VAD speech regions of one clip merged greedily into chunks of at most `max_seconds`
+    (sample offsets). Chunks never cross a silence boundary the VAD did not report.
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    max_samples = int(max_seconds * TARGET_SAMPLE_RATE)
+    chunks: List[List[int]] = []
+    for ts in get_speech_timestamps(audio, VadOptions(max_speech_duration_s=max_seconds)):
+        if chunks and ts["end"] - chunks[-1][0] <= max_samples:
+            chunks[-1][1] = ts["end"]
+        else:
+            chunks.append([ts["start"], ts["end"]])
+    return [(start, end) for start, end in chunks]
+
+def _audio_groups(audio_paths: Sequence[str], max_seconds: float) -> Iterator[List[Tuple[int, np.ndarray]]]:
+    """Loads the clips in order and yields (index, samples) groups of at most ~max_seconds of audio."""
+    group: List[Tuple[int, np.ndarray]] = []
+    total = 0
+    for index, path in enumerate(audio_paths):
+        audio = read_wav_samples(path)
+        if group and total + len(audio) > max_seconds * TARGET_SAMPLE_RATE:
+            yield group
+            group, total = [], 0
+        group.append((index, audio))
+        total += len(audio)
+    if group:
+        yield group
+
+def evaluate_transcriptions(audio_paths: Sequence[str], conf_threshold: float, pause_threshold: float, model=None, keep_words: bool = False, batch_size: int = 8) -> List[Dict[str, Any]]:
+    """
+    Batched counterpart of evaluate_transcription for many short 16 kHz mono WAVs: the clips
+    are laid end to end, the VAD chunks of every clip go through faster-whisper's
+    BatchedInferencePipeline `batch_size` at a time, and the words are routed back to their clip
+    with clip-relative timestamps. Returns one result per path, in order, with the same keys
+    as evaluate_transcription.
+    """
+    from faster_whisper import BatchedInferencePipeline
+
+    if model is None:
+        model = load_faster_whisper_model()
+    pipeline = BatchedInferencePipeline(model=model)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(audio_paths)
+    for group in _audio_groups(audio_paths, WHISPER_BATCH_GROUP_SECONDS):
+        lengths = [len(audio) for _, audio in group]
+        offsets = [0, *np.cumsum(lengths)[:-1].tolist()]
+        offsets_sec = np.array(offsets) / TARGET_SAMPLE_RATE
+        # One entry per VAD chunk, with the clip each chunk was cut from
+        clips, chunk_clip = [], []
+        for clip, ((_, audio), offset) in enumerate(zip(group, offsets)):
+            for start, end in speech_chunks(audio):
+                clips.append({"start": (offset + start) / TARGET_SAMPLE_RATE, "end": (offset + end) / TARGET_SAMPLE_RATE})
+                chunk_clip.append(clip)
+        # faster-whisper rounds segment times to the millisecond, so a chunk starting on a clip's
+        # first sample can report a start just below the clip offset; segments are matched to
+        # chunks by their midpoint against the equally rounded chunk starts instead
+        chunk_starts = np.round([c["start"] for c in clips], 3)
+        words_per_clip: List[List[Dict[str, Any]]] = [[] for _ in group]
+        text_per_clip = ["" for _ in group]
+        logger.info(f"Transcribing {len(group)} clip(s) as {len(clips)} chunk(s) in batches of {batch_size}...")
+        if clips:
+            segments, _ = pipeline.transcribe(
+                np.concatenate([audio for _, audio in group]), language="en", word_timestamps=True,
+                vad_filter=False, clip_timestamps=clips, batch_size=batch_size
+            )
+            for segment in segments:
+                # Every chunk lies inside one clip, so a segment's chunk identifies its clip
+                chunk = max(0, int(np.searchsorted(chunk_starts, (segment.start + segment.end) / 2, side="right")) - 1)
+                clip = chunk_clip[chunk]
+                shift = float(offsets_sec[clip])
+                text_per_clip[clip] += segment.text + " "
+                for word in segment.words:
+                    words_per_clip[clip].append({
+                        "word": word.word.strip(),
+                        "start": max(0.0, round(word.start - shift, 3)),
+                        "end": max(0.0, round(word.end - shift, 3)),
+                        "probability": word.probability
+                    })
+        for clip, (index, _) in enumerate(group):
+            results[index] = transcription_metrics(
+                words_per_clip[clip], text_per_clip[clip].strip(), conf_threshold, pause_threshold, keep_words
+            )
+    logger.info("Batched transcription analysis complete.")
+    return results
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     print("Transcription Module - Ready")
@@ -0,0 +1,251 @@
+import collections
+import json
+import logging
+import os
+import string
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import typer
+
+from config import TREND_METRICS, TREND_TOP_N
+from history_blobs import hydrate_entry
+from history_reader import iter_history
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+_strip_punctuation = str.maketrans("", "", string.punctuation)
+
+
+def trends_path(history_file: str) -> str:
+    """Rolling statistics live next to their history: metrics_history.json -> metrics_history.trends.json"""
+    path = Path(history_file)
+    return str(path.with_name(f"{path.stem}.trends.json"))
+
+
+def week_key(entry_date: str) -> str:
+    year, week, _ = datetime.fromisoformat(entry_date).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _metric_value(metrics: Dict[str, Any], name: str) -> Optional[float]:
+    """Looks up a (possibly dotted, e.g. "readability.score") numeric metric."""
+    value: Any = metrics
+    for part in name.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _entry_counters(metrics: Dict[str, Any]) -> Dict[str, collections.Counter]:
+    """Filler words, word frequencies (speech_analysis) and weak words (articulation) of one entry."""
+    weak = collections.Counter()
+    for w in metrics.get("weak_words") or []:
+        word = str(w.get("word", "")).lower().translate(_strip_punctuation).strip()
+        if word:
+            weak[word] += 1
+    return {
+        "filler_words": collections.Counter(metrics.get("filler_words") or {}),
+        "word_frequency": collections.Counter(dict(metrics.get("word_frequency") or [])),
+        "weak_words": weak,
+    }
+
+
+def empty_state() -> Dict[str, Any]:
+    return {
+        "version": STATE_VERSION,
+        "entries": 0,
+        "totals": {"metrics": {}, "filler_words": {}, "word_frequency": {}, "weak_words": {}},
+        "weeks": {},
+    }
+
+
+def _fold_running(stats: Optional[Dict[str, float]], x: float) -> Dict[str, float]:
+    """Welford update of count/mean/M2 plus min/max."""
+    if stats is None:
+        return {"count": 1, "mean": x, "m2": 0.0, "min": x, "max": x}
+    count = stats["count"] + 1
+    delta = x - stats["mean"]
+    mean = stats["mean"] + delta / count
+    return {
+        "count": count,
+        "mean": mean,
+        "m2": stats["m2"] + delta * (x - mean),
+        "min": min(stats["min"], x),
+        "max": max(stats["max"], x),
+    }
+
+
+def _add_counts(target: Dict[str, int], counts: collections.Counter):
+    for key, value in counts.items():
+        target[key] = target.get(key, 0) + value
+
+
+def fold_entry(state: Dict[str, Any], entry: Dict[str, Any]):
+    """Adds one history entry to the rolling state in place."""
+    metrics = entry.get("metrics", {})
+    week = state["weeks"].setdefault(week_key(entry["date"]), {
+        "sessions": 0, "metrics": {}, "filler_words": {}, "word_frequency": {}, "weak_words": {}
+    })
+    week["sessions"] += 1
+    for name in TREND_METRICS:
+        value = _metric_value(metrics, name)
+        if value is None:
+            continue
+        # A week holds a handful of sessions, so its raw values are kept for exact percentiles
+        week["metrics"].setdefault(name, []).append(value)
+        state["totals"]["metrics"][name] = _fold_running(state["totals"]["metrics"].get(name), value)
+    for name, counts in _entry_counters(metrics).items():
+        _add_counts(week[name], counts)
+        _add_counts(state["totals"][name], counts)
+    state["entries"] += 1
+
+
+def iter_full_history(history_file: str) -> Iterator[Dict[str, Any]]:
+    """Archived and live entries, with the blob-backed fields the counters need loaded back in."""
+    for entry in iter_history(history_file):
+        yield hydrate_entry(history_file, entry, fields=("weak_words", "word_frequency", "filler_words"))
+
+
+def build_state(history: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    state = empty_state()
+    for entry in history:
+        fold_entry(state, entry)
+    return state
+
+
+def load_state(history_file: str) -> Optional[Dict[str, Any]]:
+    path = trends_path(history_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def save_state(history_file: str, state: Dict[str, Any]):
+    # The size of the history the state matches; a different size on the next append means
+    # the history changed behind our back and the state is rebuilt
+    state["history_bytes"] = os.path.getsize(history_file) if os.path.exists(history_file) else 0
+    path = trends_path(history_file)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def record_entries(history_file: str, new_entries: List[Dict[str, Any]], previous_bytes: int):
+    """
+    Folds `new_entries`, just appended to a history that was `previous_bytes` long, into the
+    rolling state. If the state is missing or was not built from exactly that file (edited by
+    hand, older version), it is rebuilt by streaming the history file.
+    """
+    state = load_state(history_file)
+    if state is None or state.get("history_bytes") != previous_bytes:
+        state = build_state(iter_full_history(history_file))
+    else:
+        for entry in new_entries:
+            fold_entry(state, entry)
+    save_state(history_file, state)
+
+
+def _top(counts: Dict[str, int], n: int = TREND_TOP_N) -> List[List[Any]]:
+    return [[k, v] for k, v in collections.Counter(counts).most_common(n)]
+
+
+def _week_metrics(week: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for name, values in week["metrics"].items():
+        arr = np.asarray(values, dtype=np.float64)
+        p50, p90 = np.percentile(arr, [50, 90])
+        summary[name] = {
+            "n": len(values),
+            "mean": round(float(arr.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p90": round(float(p90), 3),
+            "min": round(float(arr.min()), 3),
+            "max": round(float(arr.max()), 3),
+        }
+    return summary
+
+
+def weekly_summary(state: Dict[str, Any], week: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Summary of one ISO week (default: the latest with data) with week-over-week deltas of
+    the means against the previous week that has data. Reads only the rolling state.
+    """
+    weeks = sorted(state["weeks"])
+    if not weeks:
+        return {}
+    week = week or weeks[-1]
+    if week not in state["weeks"]:
+        raise ValueError(f"No sessions recorded in week {week}.")
+    previous = [w for w in weeks if w < week]
+    current = state["weeks"][week]
+    metrics = _week_metrics(current)
+    if previous:
+        prior = _week_metrics(state["weeks"][previous[-1]])
+        for name, stats in metrics.items():
+            if name in prior:
+                stats["delta_mean"] = round(stats["mean"] - prior[name]["mean"], 3)
+    totals = {}
+    for name, stats in state["totals"]["metrics"].items():
+        sd = (stats["m2"] / (stats["count"] - 1)) ** 0.5 if stats["count"] > 1 else 0.0
+        totals[name] = {"n": stats["count"], "mean": round(stats["mean"], 3), "sd": round(sd, 3)}
+    return {
+        "week": week,
+        "previous_week": previous[-1] if previous else None,
+        "sessions": current["sessions"],
+        "metrics": metrics,
+        "top_weak_words": _top(current["weak_words"]),
+        "top_filler_words": _top(current["filler_words"]),
+        "top_words": _top(current["word_frequency"]),
+        "all_time": {
+            "sessions": state["entries"],
+            "metrics": totals,
+            "top_weak_words": _top(state["totals"]["weak_words"]),
+            "top_filler_words": _top(state["totals"]["filler_words"]),
+        },
+    }
+
+
+cli = typer.Typer(help="Rolling trend statistics over the history files")
+
+@cli.command()
+def rebuild(history: str = typer.Option("metrics_history.json", "--history", "-h", help="History JSON file")):
+    """
+    Rebuild the rolling statistics from scratch (only needed once for histories written before trends existed).
+    """
+    state = build_state(iter_full_history(history))
+    save_state(history, state)
+    typer.secho(f"Aggregated {state['entries']} entries into {trends_path(history)}", fg=typer.colors.GREEN)
+
+@cli.command()
+def weekly(
+    history: str = typer.Option("metrics_history.json", "--history", "-h", help="History JSON file"),
+    week: Optional[str] = typer.Option(None, "--week", help="ISO week like 2026-W08 (default: latest)")
+):
+    """
+    Print the weekly trend summary as JSON, ready to paste into the weekly prompt.
+    """
+    state = load_state(history)
+    if state is None:
+        typer.secho(f"No trend statistics for {history} yet. Run: python trends.py rebuild --history {history}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    try:
+        typer.echo(json.dumps(weekly_summary(state, week), indent=2))
+    except ValueError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    cli()
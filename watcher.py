@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from cancellation import cancel_all
+from config import WATCH_SETTLE_SECONDS, WATCH_POLL_INTERVAL_SECONDS, WATCH_MAX_WORKERS
+from output_manager import get_file_id, load_history_index
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class FolderWatcher:
+    """
+    Watches a resources directory for new media files and feeds them to `handle_file`.
+
+    A file is enqueued once its size and mtime have been stable for `settle_seconds`
+    (so half-copied uploads are never analyzed). Files already present in the history
+    index are skipped without touching the handler. Uses inotify when `inotify_simple`
+    is installed, otherwise falls back to polling the directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        valid_exts: Iterable[str],
+        handle_file: Callable[[str], bool],
+        history_file: str,
+        settle_seconds: float = WATCH_SETTLE_SECONDS,
+        poll_interval: float = WATCH_POLL_INTERVAL_SECONDS,
+        max_workers: int = WATCH_MAX_WORKERS,
+        use_inotify: bool = True
+    ):
+        self.directory = Path(directory)
+        self.valid_exts = {e.lower() for e in valid_exts}
+        self.handle_file = handle_file
+        self.history_file = history_file
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.use_inotify = use_inotify and INotify is not None
+
+        self.processed: Set[str] = load_history_index(history_file)
+        # path -> (size, mtime, time the signature last changed)
+        self.pending: Dict[str, Tuple[int, float, float]] = {}
+        self.in_flight: Set[str] = set()
+        # path -> (size, mtime) of attempts that failed; retried only once the file changes
+        self.failed: Dict[str, Tuple[int, float]] = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def _is_candidate(self, path: Path) -> bool:
+        return path.suffix.lower() in self.valid_exts and not path.name.startswith(".")
+
+    def _is_known(self, path: Path) -> bool:
+        if path.name in self.processed:
+            return True
+        return get_file_id(str(path)) in self.processed
+
+    def _touch(self, path: Path):
+        """Records (or refreshes) a change on `path`, restarting its settle timer."""
+        key = str(path)
+        with self.lock:
+            if key in self.in_flight:
+                return
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self.pending.pop(key, None)
+            return
+        signature = (st.st_size, st.st_mtime)
+        previous = self.pending.get(key)
+        if previous is None or previous[:2] != signature:
+            self.pending[key] = (st.st_size, st.st_mtime, time.monotonic())
+
+    def _ready_paths(self):
+        """Yields pending paths whose size/mtime have not changed for `settle_seconds`."""
+        now = time.monotonic()
+        for key, (size, mtime, changed_at) in list(self.pending.items()):
+            path = Path(key)
+            self._touch(path)
+            current = self.pending.get(key)
+            if current is None:
+                continue
+            if current[2] == changed_at and now - changed_at >= self.settle_seconds and size > 0:
+                del self.pending[key]
+                yield path
+
+    def _scan(self):
+        """Registers every candidate file currently in the directory that is not yet known."""
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                path = Path(entry.path)
+                if str(path) in self.pending or not self._is_candidate(path):
+                    continue
+                if self._is_known(path):
+                    continue
+                st = entry.stat()
+                if self.failed.get(str(path)) == (st.st_size, st.st_mtime):
+                    continue
+                self._touch(path)
+
+    def _run_job(self, path: Path):
+        succeeded = False
+        if self.stop_event.is_set():
+            # Still queued when the watcher stopped; picked up by the initial scan next time
+            return
+        try:
+            succeeded = self.handle_file(str(path))
+        except Exception as e:
+            logger.error(f"Watch job failed for {path.name}: {e}")
+        try:
+            if succeeded:
+                with self.lock:
+                    self.processed.add(path.name)
+                    self.processed.add(get_file_id(str(path)))
+            else:
+                st = path.stat()
+                self.failed[str(path)] = (st.st_size, st.st_mtime)
+        except FileNotFoundError:
+            pass
+        finally:
+            with self.lock:
+                self.in_flight.discard(str(path))
+
+    def _dispatch_ready(self, pool: ThreadPoolExecutor):
+        for path in self._ready_paths():
+            if self._is_known(path):
+                continue
+            with self.lock:
+                self.in_flight.add(str(path))
+            logger.info(f"Enqueued {path.name} for analysis.")
+            pool.submit(self._run_job, path)
+
+    def _wait_for_changes(self, inotify) -> Optional[Iterable[Path]]:
+        """Blocks for up to one poll interval and returns the paths that changed (None = rescan)."""
+        if inotify is None:
+            self.stop_event.wait(self.poll_interval)
+            return None
+        events = inotify.read(timeout=int(self.poll_interval * 1000))
+        return [self.directory / e.name for e in events if e.name]
+
+    def run(self):
+        """Blocks, watching the directory until `stop()` is called or Ctrl+C is pressed."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        inotify = None
+        if self.use_inotify:
+            inotify = INotify()
+            inotify.add_watch(
+                str(self.directory),
+                inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE | inotify_flags.MODIFY
+            )
+        logger.info(f"Watching {self.directory} ({'inotify' if inotify else 'polling'}, settle {self.settle_seconds}s, {self.max_workers} worker(s))...")
+
+        # One initial scan picks up anything dropped in while we were not running
+        self._scan()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                while not self.stop_event.is_set():
+                    self._dispatch_ready(pool)
+                    changed = self._wait_for_changes(inotify)
+                    if changed is None:
+                        self._scan()
+                    else:
+                        for path in changed:
+                            if self._is_candidate(path) and not self._is_known(path):
+                                self._touch(path)
+            except KeyboardInterrupt:
+                logger.info("Stopping watcher...")
+            finally:
+                self.stop_event.set()
+                # Leaving the pool waits for running jobs, so stop them rather than finish them
+                cancel_all("stopped: watcher shutting down")
+                if inotify is not None:
+                    inotify.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def watch_directory(directory: str, valid_exts: Iterable[str], handle_file: Callable[[str], bool], history_file: str, **kwargs):
+    """
+    Convenience wrapper: builds a FolderWatcher and blocks until interrupted.
+    `handle_file` receives the file path and returns True when it was analyzed and recorded.
+    """
+    FolderWatcher(directory, valid_exts, handle_file, history_file, **kwargs).run()
@@ -0,0 +1,177 @@
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import WORD_TIMELINE_DIR
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("start", "end", "probability", "word_index", "vocab")
+
+
+class WordTimeline:
+    """
+    Column-oriented word timeline: parallel float32 arrays for start/end/probability plus
+    a string table (`vocab`) and per-word indices into it. Stored as a compressed .npz
+    sidecar, so any single column can be loaded without parsing transcripts or JSON.
+    """
+
+    def __init__(self, vocab: List[str], word_index: np.ndarray, start: np.ndarray, end: np.ndarray, probability: np.ndarray):
+        self.vocab = list(vocab)
+        self.word_index = np.asarray(word_index, dtype=np.uint32)
+        self.start = np.asarray(start, dtype=np.float32)
+        self.end = np.asarray(end, dtype=np.float32)
+        self.probability = np.asarray(probability, dtype=np.float32)
+
+    @classmethod
+    def from_words(cls, words_data: Iterable[Dict[str, Any]]) -> "WordTimeline":
+        """Builds a timeline from faster-whisper style dicts (word/start/end/probability)."""
+        vocab: List[str] = []
+        lookup: Dict[str, int] = {}
+        indices, starts, ends, probs = [], [], [], []
+        for w in words_data:
+            idx = lookup.get(w["word"])
+            if idx is None:
+                idx = lookup[w["word"]] = len(vocab)
+                vocab.append(w["word"])
+            indices.append(idx)
+            starts.append(w["start"])
+            ends.append(w["end"])
+            probs.append(w["probability"])
+        return cls(vocab, np.array(indices), np.array(starts), np.array(ends), np.array(probs))
+
+    def __len__(self) -> int:
+        return len(self.word_index)
+
+    @property
+    def words(self) -> List[str]:
+        return [self.vocab[i] for i in self.word_index]
+
+    def to_dicts(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Converts (optionally a boolean-masked subset of) the timeline back to word dicts."""
+        positions = np.nonzero(mask)[0] if mask is not None else range(len(self))
+        return [
+            {
+                "word": self.vocab[self.word_index[i]],
+                "start": float(self.start[i]),
+                "end": float(self.end[i]),
+                "probability": float(self.probability[i]),
+            }
+            for i in positions
+        ]
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            start=self.start,
+            end=self.end,
+            probability=self.probability,
+            word_index=self.word_index,
+            vocab=np.array(self.vocab, dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "WordTimeline":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["vocab"].tolist(), data["word_index"], data["start"], data["end"], data["probability"])
+
+
+def load_column(path: str, column: str) -> np.ndarray:
+    """Loads a single column (e.g. "probability") from a timeline sidecar without touching the others."""
+    if column not in COLUMNS:
+        raise ValueError(f"Unknown timeline column '{column}'. Expected one of {COLUMNS}.")
+    with np.load(path, allow_pickle=False) as data:
+        return data[column]
+
+
+def timeline_path(file_id: str) -> str:
+    """Sidecar location for a history entry, relative to the history file's directory."""
+    # Forward slashes keep history files portable between the macOS and Windows setups
+    return f"{WORD_TIMELINE_DIR}/{file_id}.npz"
+
+
+def resolve_timeline_path(history_file: str, relative_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(history_file)), relative_path)
+
+
+def store_timeline(history_file: str, file_id: str, words_data: List[Dict[str, Any]]) -> str:
+    """
+    Writes the full word list as an .npz sidecar next to history_file and returns the
+    relative path to record in the history entry under "word_timeline".
+    """
+    relative_path = timeline_path(file_id)
+    WordTimeline.from_words(words_data).save(resolve_timeline_path(history_file, relative_path))
+    logger.info(f"Stored {len(words_data)}-word timeline at {relative_path}")
+    return relative_path
+
+
+def load_entry_timeline(history_file: str, entry: Dict[str, Any]) -> Optional[WordTimeline]:
+    """Loads the timeline referenced by a history entry, or None if it has none."""
+    relative_path = entry.get("metrics", {}).get("word_timeline")
+    if not relative_path:
+        return None
+    return WordTimeline.load(resolve_timeline_path(history_file, relative_path))
+
+
+# --- Vectorized timeline metrics ---
+# These operate on plain float64 arrays (start/end/probability) so headline metrics stay
+# bit-for-bit identical to the original per-dict loops; WordTimeline's float32 columns are
+# for storage.
+
+def word_gaps(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Silence between consecutive words: gaps[i] = start[i+1] - end[i] (length n-1)."""
+    if len(start) < 2:
+        return np.zeros(0, dtype=np.float64)
+    return start[1:] - end[:-1]
+
+
+def pause_mask(gaps: np.ndarray, threshold: float) -> np.ndarray:
+    return gaps >= threshold
+
+
+def weak_mask(probability: np.ndarray, threshold: float) -> np.ndarray:
+    return probability < threshold
+
+
+def pause_counts_at(gaps: np.ndarray, thresholds: Iterable[float]) -> Dict[str, int]:
+    """Pause counts for many thresholds at once via one broadcast comparison."""
+    thresholds = np.asarray(list(thresholds), dtype=np.float64)
+    counts = (gaps[None, :] >= thresholds[:, None]).sum(axis=1)
+    return {f"{t:g}": int(c) for t, c in zip(thresholds, counts)}
+
+
+def pause_distribution(gaps: np.ndarray, edges: Iterable[float], percentiles: Iterable[float] = (50, 75, 90, 95)) -> Dict[str, Any]:
+    """
+    Percentiles of all inter-word gaps plus a histogram over `edges`.
+    counts[0] holds gaps below edges[0], counts[-1] gaps at or above edges[-1].
+    """
+    edges = np.asarray(list(edges), dtype=np.float64)
+    percentiles = list(percentiles)
+    if len(gaps) == 0:
+        return {
+            **{f"p{p:g}": 0.0 for p in percentiles},
+            "max": 0.0,
+            "histogram": {"edges": edges.tolist(), "counts": [0] * (len(edges) + 1)},
+        }
+    values = np.percentile(gaps, percentiles)
+    counts = np.bincount(np.searchsorted(edges, gaps, side="right"), minlength=len(edges) + 1)
+    return {
+        **{f"p{p:g}": round(float(v), 3) for p, v in zip(percentiles, values)},
+        "max": round(float(gaps.max()), 3),
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def windowed_sum(times: np.ndarray, values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Sum of `values` whose (sorted) `times` fall in each [start, end) window. Uses a cumulative
+    sum and searchsorted, so the cost is O(n + windows) regardless of window overlap.
+    """
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    lo = np.searchsorted(times, starts, side="left")
+    hi = np.searchsorted(times, ends, side="left")
+    return cumulative[hi] - cumulative[lo]